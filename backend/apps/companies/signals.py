@@ -1,7 +1,9 @@
 """
 Company signals.
-- When a new Company is created, seed default ComplianceCategories and
-  ComplianceRequirements so every tenant starts with a pre-populated checklist.
+- When a new Company is created, seed its ComplianceRecords so every tenant
+  starts with a pre-populated checklist: the current and upcoming periods of
+  recurring requirements (apps.compliance.schedule), plus one calendar-year
+  record for each one-time / as-needed requirement.
 """
 import logging
 
@@ -24,9 +26,15 @@ def seed_compliance_requirements(sender, instance, created, **kwargs):
         from django.utils import timezone
 
         from apps.compliance.models import ComplianceRecord, ComplianceRequirement
+        from apps.compliance.schedule import materialise_schedule
+
+        materialise_schedule(type(instance).objects.filter(pk=instance.pk))
 
         today = timezone.now().date()
-        requirements = ComplianceRequirement.objects.filter(is_mandatory=True)
+        requirements = ComplianceRequirement.objects.filter(
+            is_mandatory=True,
+            frequency__in=[ComplianceRequirement.Frequency.ONE_TIME, ComplianceRequirement.Frequency.AS_NEEDED],
+        )
 
         records = []
         for req in requirements:
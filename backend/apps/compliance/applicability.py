@@ -0,0 +1,67 @@
+"""
+Requirement applicability index.
+
+A requirement applies to companies in its authority's country (any country
+when the authority is global or missing) and in the industries listed in its
+industry_applicability (any industry when the list is empty). The index in
+compliance_requirement_applicability spells that out as one row per
+(country, industry) pair, so "requirements applicable to this company" is a
+single indexed join instead of a scan of the whole library in Python.
+
+Requirement, category and authority signals rebuild the rows of the
+requirements they affect; `rebuild_applicability()` rebuilds everything.
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+
+def applicability_rows(requirement_id, country_id, industries) -> list[tuple]:
+    """(requirement_id, country_id, industry) rows for one requirement."""
+    normalized = sorted({str(industry).strip().lower()[:50] for industry in industries or []} - {""})
+    return [(requirement_id, country_id, industry) for industry in normalized or [""]]
+
+
+def rebuild_applicability(requirements=None) -> int:
+    """Rebuild the index for a queryset of requirements (default: all). Returns rows written."""
+    from .models import ComplianceRequirement, RequirementApplicability
+
+    if requirements is None:
+        requirements = ComplianceRequirement.objects.all()
+    rows = []
+    for requirement_id, country_id, industries in requirements.values_list(
+        "pk", "category__authority__country_id", "industry_applicability",
+    ):
+        rows.extend(applicability_rows(requirement_id, country_id, industries))
+
+    with transaction.atomic():
+        RequirementApplicability.objects.filter(requirement__in=requirements.values("pk")).delete()
+        RequirementApplicability.objects.bulk_create(
+            [RequirementApplicability(requirement_id=r, country_id=c, industry=i) for r, c, i in rows],
+            batch_size=1000,
+        )
+    return len(rows)
+
+
+def requirements_for(country_id, industry: str | None):
+    """Requirements applicable to companies in `country_id` (may be None) and `industry`."""
+    from .models import ComplianceRequirement
+
+    industry = (industry or "").strip().lower()
+    countries = Q(applicability__country__isnull=True)
+    if country_id:
+        countries |= Q(applicability__country=country_id)
+    return ComplianceRequirement.objects.filter(countries, applicability__industry__in={industry, ""})
+
+
+def applicable_requirements(company):
+    """
+    Requirements that apply to the company, each annotated with `tracked`
+    (the company already has a record for it).
+    """
+    from .models import ComplianceRecord
+
+    return (
+        requirements_for(company.country_id, company.industry)
+        .annotate(tracked=Exists(ComplianceRecord.objects.filter(company=company, requirement=OuterRef("pk"))))
+        .select_related("category", "category__authority")
+    )
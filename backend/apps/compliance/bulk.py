@@ -0,0 +1,254 @@
+"""
+Bulk operations over compliance records.
+
+An operation is an action — change status, attach evidence documents, or
+reassign — applied to a selection of a company's records: explicit ids, or
+filters (BULK_FILTERS). Large selections run as a ComplianceBulkJob in a
+Celery task; run_job walks the selection in primary-key order, BULK_CHUNK_SIZE
+records at a time, and each chunk is one transaction that:
+
+    1. locks the chunk's records and applies the action with one UPDATE
+       (one bulk_create of evidence links), skipping records already as asked
+    2. writes one AuditLog entry per changed record in a single bulk_create
+    3. recounts the score snapshots of the months whose records changed status
+    4. stores the job's cursor and progress counters
+
+Once a chunk commits, every active webhook endpoint of the company is sent
+one "compliance.records.bulk_updated" event listing that chunk's changes. A
+job that stopped part-way (worker restart, error) resumes from its cursor
+when run again.
+"""
+import bisect
+import logging
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ComplianceBulkJob, ComplianceRecord
+from .snapshots import month_start, refresh_snapshots
+from .utils import invalidate_company_compliance_score
+
+logger = logging.getLogger("auditshield")
+
+BULK_CHUNK_SIZE = 500
+WEBHOOK_EVENT = "compliance.records.bulk_updated"
+
+# Selection filter -> ComplianceRecord lookup
+BULK_FILTERS = {
+    "status": "status__in",
+    "requirement": "requirement_id",
+    "category": "requirement__category_id",
+    "authority_type": "requirement__category__authority__authority_type",
+    "assigned_to": "assigned_to_id",
+    "due_from": "due_date__gte",
+    "due_to": "due_date__lte",
+    "period_end_from": "period_end__gte",
+    "period_end_to": "period_end__lte",
+}
+
+
+def selection_queryset(company_id, selection: dict):
+    """The company's records a selection ({"ids": [...]} or {"filters": {...}}) covers."""
+    records = ComplianceRecord.objects.filter(company_id=company_id)
+    if "ids" in selection:
+        return records.filter(pk__in=selection["ids"])
+    return records.filter(**{BULK_FILTERS[name]: value for name, value in selection["filters"].items()})
+
+
+def _chunks(company_id, selection: dict, cursor: str):
+    """Lists of at most BULK_CHUNK_SIZE selected ids, in primary-key order, after `cursor`."""
+    if "ids" in selection:
+        ids = sorted({uuid.UUID(str(pk)) for pk in selection["ids"]})
+        start = bisect.bisect_right(ids, uuid.UUID(cursor)) if cursor else 0
+        for i in range(start, len(ids), BULK_CHUNK_SIZE):
+            yield ids[i:i + BULK_CHUNK_SIZE]
+        return
+
+    records = selection_queryset(company_id, selection).order_by("pk")
+    while True:
+        page = records.filter(pk__gt=cursor) if cursor else records
+        ids = list(page.values_list("pk", flat=True)[:BULK_CHUNK_SIZE])
+        if not ids:
+            return
+        yield ids
+        cursor = ids[-1]
+
+
+def _str(value):
+    return str(value) if value is not None else None
+
+
+# ─── Actions ──────────────────────────────────────────────────────────────────
+# Each takes the chunk's locked records and returns {record_id: {field: [before, after]}}
+# for the records it changed.
+
+def _set_status(company_id, records, params, user_id):
+    new_status, notes = params["status"], params.get("notes")
+    status_changed = [r["pk"] for r in records if r["status"] != new_status]
+    notes_changed = [
+        r["pk"] for r in records
+        if r["status"] == new_status and notes is not None and r["notes"] != notes
+    ]
+
+    fields = {"status": new_status}
+    if notes is not None:
+        fields["notes"] = notes
+    if new_status == ComplianceRecord.ComplianceStatus.COMPLIANT:
+        fields.update(completed_date=timezone.now().date(), completed_by_id=user_id)
+    if status_changed:
+        ComplianceRecord.objects.filter(pk__in=status_changed).update(**fields)
+        # .update() sends no signals; recount the score snapshots of the months touched
+        by_pk = {r["pk"]: r for r in records}
+        refresh_snapshots([company_id], sorted({month_start(by_pk[pk]["period_end"]) for pk in status_changed}))
+    if notes_changed:
+        ComplianceRecord.objects.filter(pk__in=notes_changed).update(notes=notes)
+
+    changes = {}
+    for r in records:
+        change = {}
+        if r["status"] != new_status:
+            change["status"] = [r["status"], new_status]
+        if notes is not None and r["notes"] != notes:
+            change["notes"] = [r["notes"], notes]
+        if change:
+            changes[r["pk"]] = change
+    return changes
+
+
+def _attach_evidence(company_id, records, params, user_id):
+    from apps.documents.models import Document
+
+    Link = ComplianceRecord.evidence_documents.through
+    document_ids = list(
+        Document.objects.filter(company_id=company_id, pk__in=params["document_ids"]).values_list("pk", flat=True)
+    )
+    record_ids = [r["pk"] for r in records]
+    linked = set(
+        Link.objects.filter(compliancerecord_id__in=record_ids, document_id__in=document_ids)
+        .values_list("compliancerecord_id", "document_id")
+    )
+    changes, links = {}, []
+    for record_id in record_ids:
+        added = [d for d in document_ids if (record_id, d) not in linked]
+        if added:
+            links += [Link(compliancerecord_id=record_id, document_id=d) for d in added]
+            changes[record_id] = {"evidence_documents": {"added": [str(d) for d in added]}}
+    Link.objects.bulk_create(links, ignore_conflicts=True)
+    return changes
+
+
+def _reassign(company_id, records, params, user_id):
+    assignee = params.get("assigned_to")
+    assignee = uuid.UUID(str(assignee)) if assignee else None
+    changed = [r for r in records if r["assigned_to_id"] != assignee]
+    if changed:
+        ComplianceRecord.objects.filter(pk__in=[r["pk"] for r in changed]).update(assigned_to_id=assignee)
+    return {r["pk"]: {"assigned_to": [_str(r["assigned_to_id"]), _str(assignee)]} for r in changed}
+
+
+_ACTIONS = {
+    ComplianceBulkJob.Action.SET_STATUS: _set_status,
+    ComplianceBulkJob.Action.ATTACH_EVIDENCE: _attach_evidence,
+    ComplianceBulkJob.Action.REASSIGN: _reassign,
+}
+
+
+def _audit(company_id, user_id, action: str, changes: dict, job_id=None) -> None:
+    """One audit entry per changed record, as if it had been PATCHed on its own."""
+    from apps.audit_logs.models import AuditLog
+
+    AuditLog.objects.bulk_create([
+        AuditLog(
+            user_id=user_id,
+            company_id=company_id,
+            method="PATCH",
+            path=f"/api/v1/compliance/records/{record_id}/",
+            status_code=200,
+            request_body={"bulk_job": _str(job_id), "action": action, "changes": change},
+        )
+        for record_id, change in changes.items()
+    ], batch_size=BULK_CHUNK_SIZE)
+
+
+def _notify(company_id, job_id, action: str, changes: dict) -> None:
+    from apps.webhooks.models import WebhookEndpoint
+    from apps.webhooks.tasks import deliver_webhook
+
+    payload = {
+        "bulk_job": _str(job_id),
+        "action": action,
+        "records": [{"id": str(pk), "changes": change} for pk, change in changes.items()],
+    }
+    for endpoint_id in WebhookEndpoint.objects.filter(company_id=company_id, is_active=True).values_list(
+        "pk", flat=True,
+    ):
+        deliver_webhook.delay(str(endpoint_id), WEBHOOK_EVENT, payload)
+
+
+def apply_chunk(company_id, action: str, params: dict, ids, user_id, job_id=None) -> tuple[set, dict]:
+    """
+    Apply an action to up to BULK_CHUNK_SIZE records of a company, with audit
+    entries and (after commit) webhooks. Call inside a transaction. Returns
+    (ids of the records found, {record_id: changes}).
+    """
+    records = list(
+        ComplianceRecord.objects.select_for_update()
+        .filter(company_id=company_id, pk__in=ids)
+        .order_by("pk")
+        .values("pk", "status", "notes", "period_end", "assigned_to_id")
+    )
+    changes = _ACTIONS[action](company_id, records, params, user_id) if records else {}
+    if changes:
+        _audit(company_id, user_id, action, changes, job_id)
+        invalidate_company_compliance_score(company_id)
+        transaction.on_commit(lambda: _notify(company_id, job_id, action, changes))
+    return {r["pk"] for r in records}, changes
+
+
+# ─── Jobs ─────────────────────────────────────────────────────────────────────
+
+def run_job(job_id) -> ComplianceBulkJob | None:
+    """Run (or resume) a bulk job to completion."""
+    job = ComplianceBulkJob.objects.filter(pk=job_id).first()
+    if job is None or job.status == ComplianceBulkJob.Status.COMPLETED:
+        return job
+
+    if job.started_at is None:
+        job.started_at = timezone.now()
+        job.total = (
+            len(set(map(str, job.selection["ids"]))) if "ids" in job.selection
+            else selection_queryset(job.company_id, job.selection).count()
+        )
+    job.status = ComplianceBulkJob.Status.RUNNING
+    job.error = ""
+    job.save(update_fields=["started_at", "total", "status", "error", "updated_at"])
+
+    try:
+        for ids in _chunks(job.company_id, job.selection, job.cursor):
+            with transaction.atomic():
+                found, changes = apply_chunk(
+                    job.company_id, job.action, job.params, ids, job.requested_by_id, job.pk,
+                )
+                if "ids" in job.selection:
+                    job.skipped += [str(pk) for pk in ids if pk not in found]
+                job.cursor = str(ids[-1])
+                job.processed += len(ids)
+                job.changed += len(changes)
+                job.save(update_fields=["cursor", "processed", "changed", "skipped", "updated_at"])
+    except Exception as exc:
+        logger.exception("Compliance bulk job %s failed at cursor %r", job.pk, job.cursor)
+        job.status = ComplianceBulkJob.Status.FAILED
+        job.error = str(exc)[:1000]
+        job.save(update_fields=["status", "error", "updated_at"])
+        raise
+
+    job.status = ComplianceBulkJob.Status.COMPLETED
+    job.total = max(job.total, job.processed)
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "total", "finished_at", "updated_at"])
+    logger.info(
+        "Compliance bulk job %s (%s): %d records processed, %d changed, %d skipped",
+        job.pk, job.action, job.processed, job.changed, len(job.skipped),
+    )
+    return job
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("companies", "0003_company_industry_company_fiscal_year_start"),
+        ("compliance", "0002_compliancerecord_risk_score_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ComplianceScoreSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(help_text="First day of the month")),
+                ("total", models.IntegerField(default=0)),
+                ("compliant", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="compliance_snapshots",
+                        to="companies.company",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "compliance_score_snapshots",
+                "ordering": ["month"],
+                "unique_together": {("company", "month")},
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_index(apps, schema_editor):
+    from apps.compliance.applicability import applicability_rows
+
+    ComplianceRequirement = apps.get_model("compliance", "ComplianceRequirement")
+    RequirementApplicability = apps.get_model("compliance", "RequirementApplicability")
+    rows = []
+    for requirement_id, country_id, industries in ComplianceRequirement.objects.values_list(
+        "pk", "category__authority__country_id", "industry_applicability",
+    ):
+        rows.extend(applicability_rows(requirement_id, country_id, industries))
+    RequirementApplicability.objects.bulk_create(
+        [RequirementApplicability(requirement_id=r, country_id=c, industry=i) for r, c, i in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("compliance", "0003_compliance_score_snapshots"),
+        ("geography", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RequirementApplicability",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "industry",
+                    models.CharField(
+                        blank=True,
+                        help_text="Lower-case industry code; blank = all",
+                        max_length=50,
+                    ),
+                ),
+                (
+                    "country",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="geography.country",
+                    ),
+                ),
+                (
+                    "requirement",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="applicability",
+                        to="compliance.compliancerequirement",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "compliance_requirement_applicability",
+                "indexes": [
+                    models.Index(
+                        fields=["country", "industry"],
+                        name="requirement_applicability_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
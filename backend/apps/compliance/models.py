@@ -1,6 +1,7 @@
 """
 Compliance tracking — country-agnostic authority → requirement → company record.
 """
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 from core.models import TenantModel
@@ -101,6 +102,30 @@ class ComplianceRequirement(models.Model):
         return self.title
 
 
+class RequirementApplicability(models.Model):
+    """
+    Index of who a requirement applies to: one row per (country, industry)
+    pair, where a null country or empty industry means "any". Rebuilt from
+    the requirement library by applicability.py; never edited directly.
+    """
+    requirement = models.ForeignKey(
+        ComplianceRequirement, on_delete=models.CASCADE, related_name="applicability",
+    )
+    country = models.ForeignKey(
+        "geography.Country", on_delete=models.CASCADE, null=True, blank=True, related_name="+",
+    )
+    industry = models.CharField(max_length=50, blank=True, help_text="Lower-case industry code; blank = all")
+
+    class Meta:
+        db_table = "compliance_requirement_applicability"
+        indexes = [
+            models.Index(fields=["country", "industry"], name="requirement_applicability_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.requirement_id}: {self.country_id or 'any country'} / {self.industry or 'any industry'}"
+
+
 class ComplianceRecord(TenantModel):
     """Tracks whether a company has fulfilled a requirement in a given period."""
     class ComplianceStatus(models.TextChoices):
@@ -123,6 +148,9 @@ class ComplianceRecord(TenantModel):
     completed_by = models.ForeignKey(
         "accounts.User", on_delete=models.SET_NULL, null=True, blank=True
     )
+    assigned_to = models.ForeignKey(
+        "accounts.User", on_delete=models.SET_NULL, null=True, blank=True, related_name="assigned_compliance_records",
+    )
     risk_score = models.PositiveSmallIntegerField(
         default=0, help_text="0-100 risk score; higher = more risk"
     )
@@ -139,3 +167,69 @@ class ComplianceRecord(TenantModel):
     def is_overdue(self):
         from django.utils import timezone
         return self.due_date < timezone.now().date() and self.status == self.ComplianceStatus.PENDING
+
+
+class ComplianceScoreSnapshot(models.Model):
+    """
+    A company's compliance score for one month: records whose period ends in
+    that month, and how many of them are compliant (see snapshots.py).
+    """
+    company = models.ForeignKey(
+        "companies.Company", on_delete=models.CASCADE, related_name="compliance_snapshots",
+    )
+    month = models.DateField(help_text="First day of the month")
+    total = models.IntegerField(default=0)
+    compliant = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "compliance_score_snapshots"
+        unique_together = ["company", "month"]
+        ordering = ["month"]
+
+    def __str__(self):
+        return f"{self.company_id} {self.month:%Y-%m}: {self.score}"
+
+    @property
+    def score(self) -> int:
+        return int((self.compliant / self.total) * 100) if self.total > 0 else 0
+
+
+class ComplianceBulkJob(TenantModel):
+    """
+    An asynchronous bulk operation over a selection of a company's records
+    (see bulk.py). The task walks the selection in primary-key order and
+    stores the last record it finished in `cursor` with each chunk, so the
+    job reports progress while it runs and resumes where it stopped.
+    """
+    class Action(models.TextChoices):
+        SET_STATUS = "set_status", "Change status"
+        ATTACH_EVIDENCE = "attach_evidence", "Attach evidence"
+        REASSIGN = "reassign", "Reassign"
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        COMPLETED = "completed", "Completed"
+        FAILED = "failed", "Failed"
+
+    action = models.CharField(max_length=20, choices=Action.choices)
+    params = models.JSONField(default=dict, encoder=DjangoJSONEncoder, help_text="Action arguments (status, notes, document_ids, assigned_to)")
+    selection = models.JSONField(default=dict, encoder=DjangoJSONEncoder, help_text="Record ids, or filters over the company's records")
+    requested_by = models.ForeignKey("accounts.User", on_delete=models.SET_NULL, null=True, related_name="+")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    changed = models.PositiveIntegerField(default=0)
+    skipped = models.JSONField(default=list, blank=True, help_text="Selected ids that are not this company's records")
+    cursor = models.CharField(max_length=36, blank=True, help_text="Last record processed")
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "compliance_bulk_jobs"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.get_action_display()} ({self.status}, {self.processed}/{self.total})"
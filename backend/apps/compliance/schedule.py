@@ -0,0 +1,170 @@
+"""
+Recurring compliance schedule — expands requirements into dated periods.
+
+Every mandatory requirement that applies to a company (applicability.py)
+and recurs (monthly, quarterly or annually) gets a pending ComplianceRecord
+for its current period and for every period starting within the horizon:
+
+    monthly     calendar months
+    quarterly   quarters of the reporting year
+    annually    the reporting year
+
+The reporting year starts on the country's tax-year start for requirements
+of tax authorities, and on the company's fiscal-year start otherwise. A
+period's due date is the requirement's deadline_day (default
+DEFAULT_DEADLINE_DAY) of the month after it ends.
+
+Companies are processed in groups that share country, industry and fiscal
+year, so applicable requirements and periods are worked out once per group.
+Records are written with chunked bulk_create(ignore_conflicts=True) against
+the (company, requirement, period_start) unique key, so runs are idempotent.
+"""
+import calendar
+import logging
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from .applicability import requirements_for
+from .snapshots import add_months, month_start
+
+logger = logging.getLogger("auditshield")
+
+DEFAULT_DEADLINE_DAY = 15
+# Upcoming periods starting within this many days are created ahead of time.
+SCHEDULE_HORIZON_DAYS = 90
+CHUNK_SIZE = 2000
+
+_STEP_MONTHS = {"monthly": 1, "quarterly": 3, "annually": 12}
+
+
+def _on_day(year: int, month: int, day: int) -> date:
+    return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+def due_date(period_end: date, deadline_day: int | None) -> date:
+    following = add_months(month_start(period_end), 1)
+    return _on_day(following.year, following.month, deadline_day or DEFAULT_DEADLINE_DAY)
+
+
+def periods(frequency: str, deadline_day: int | None, year_start: tuple[int, int],
+            today: date, horizon_days: int = SCHEDULE_HORIZON_DAYS) -> list[tuple[date, date, date]]:
+    """
+    (period_start, period_end, due_date) for the period containing `today` and
+    those starting within the horizon. `year_start` is the reporting year's
+    (month, day). Non-recurring frequencies have none.
+    """
+    step = _STEP_MONTHS.get(frequency)
+    if step is None:
+        return []
+    month, day = (1, 1) if step == 1 else year_start
+
+    # Latest period start on or before today, on the (month, day) grid every `step` months.
+    anchor = date(today.year, month, 1)
+    while anchor > month_start(today):
+        anchor = add_months(anchor, -12)
+    while add_months(anchor, step) <= month_start(today):
+        anchor = add_months(anchor, step)
+    start = _on_day(anchor.year, anchor.month, day)
+    if start > today:
+        anchor = add_months(anchor, -step)
+        start = _on_day(anchor.year, anchor.month, day)
+
+    result = []
+    horizon = today + timedelta(days=horizon_days)
+    while start <= horizon:
+        anchor = add_months(anchor, step)
+        following = _on_day(anchor.year, anchor.month, day)
+        end = following - timedelta(days=1)
+        result.append((start, end, due_date(end, deadline_day)))
+        start = following
+    return result
+
+
+def _group_schedule(country_id, industry, fiscal_start: int, tax_year_start, today, horizon_days):
+    """[(requirement_id, periods)] shared by every company in one group."""
+    from .models import Authority
+
+    schedule = []
+    for requirement_id, frequency, deadline_day, authority_type in (
+        requirements_for(country_id, industry)
+        .filter(is_mandatory=True, frequency__in=_STEP_MONTHS)
+        .values_list("pk", "frequency", "deadline_day", "category__authority__authority_type")
+    ):
+        year_start = (
+            tax_year_start if authority_type == Authority.AuthorityType.TAX and tax_year_start else (fiscal_start, 1)
+        )
+        schedule.append((requirement_id, periods(frequency, deadline_day, year_start, today, horizon_days)))
+    return schedule
+
+
+def materialise_schedule(companies=None, today: date | None = None,
+                         horizon_days: int = SCHEDULE_HORIZON_DAYS) -> int:
+    """
+    Create the current and upcoming period records for the given companies
+    (a queryset; default: all). Returns the number of records offered to the
+    database; existing periods are skipped by the unique key. Each chunk
+    commits on its own, so an interrupted run is simply completed by the next.
+    """
+    from django.utils import timezone
+
+    from apps.companies.models import Company
+
+    from .models import ComplianceRecord
+    from .snapshots import refresh_snapshots
+    from .utils import invalidate_compliance_scores
+
+    today = today or timezone.now().date()
+    all_companies = companies is None
+    if all_companies:
+        companies = Company.objects.all()
+
+    groups: dict = {}
+    buffer: list = []
+    company_ids: list = []
+    months: set[date] = set()
+    offered = 0
+
+    def flush():
+        nonlocal offered
+        if buffer:
+            ComplianceRecord.objects.bulk_create(buffer, batch_size=CHUNK_SIZE, ignore_conflicts=True)
+            offered += len(buffer)
+            buffer.clear()
+
+    rows = companies.values_list(
+        "pk", "country_id", "industry", "fiscal_year_start",
+        "country__tax_year_start_month", "country__tax_year_start_day",
+    ).order_by("pk")
+    for company_id, country_id, industry, fiscal_start, tax_month, tax_day in rows.iterator(chunk_size=CHUNK_SIZE):
+        tax_year_start = (tax_month, tax_day or 1) if tax_month else None
+        key = (country_id, (industry or "").strip().lower(), fiscal_start or 1, tax_year_start)
+        if key not in groups:
+            groups[key] = _group_schedule(*key, today, horizon_days)
+        company_ids.append(company_id)
+        for requirement_id, requirement_periods in groups[key]:
+            for period_start, period_end, due in requirement_periods:
+                buffer.append(ComplianceRecord(
+                    company_id=company_id,
+                    requirement_id=requirement_id,
+                    status=ComplianceRecord.ComplianceStatus.PENDING,
+                    period_start=period_start,
+                    period_end=period_end,
+                    due_date=due,
+                ))
+                months.add(month_start(period_end))
+        if len(buffer) >= CHUNK_SIZE:
+            flush()
+    flush()
+
+    # bulk_create sends no signals: recount the months touched and drop cached scores.
+    if months:
+        with transaction.atomic():
+            refresh_snapshots(None if all_companies else company_ids, sorted(months))
+    invalidate_compliance_scores(company_ids)
+
+    logger.info(
+        "Compliance schedule: %d companies in %d groups, %d period records offered",
+        len(company_ids), len(groups), offered,
+    )
+    return offered
@@ -1,6 +1,7 @@
+from django.conf import settings
 from rest_framework import serializers
 
-from .models import ComplianceCategory, ComplianceRecord, ComplianceRequirement
+from .models import Authority, ComplianceBulkJob, ComplianceCategory, ComplianceRecord, ComplianceRequirement
 
 
 class ComplianceCategorySerializer(serializers.ModelSerializer):
@@ -48,3 +49,91 @@ class ComplianceRecordSerializer(serializers.ModelSerializer):
             return type_labels.get(auth.authority_type, auth.name)
         except AttributeError:
             return "Other"
+
+
+class BulkSelectionFilterSerializer(serializers.Serializer):
+    """Filters over the company's records for a bulk job; combined with AND (see bulk.BULK_FILTERS)."""
+    status = serializers.ListField(child=serializers.ChoiceField(choices=ComplianceRecord.ComplianceStatus.choices),
+                                   required=False, allow_empty=False)
+    requirement = serializers.IntegerField(required=False)
+    category = serializers.IntegerField(required=False)
+    authority_type = serializers.ChoiceField(choices=Authority.AuthorityType.choices, required=False)
+    assigned_to = serializers.UUIDField(required=False)
+    due_from = serializers.DateField(required=False)
+    due_to = serializers.DateField(required=False)
+    period_end_from = serializers.DateField(required=False)
+    period_end_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("Select records by at least one filter.")
+        return attrs
+
+
+class ComplianceBulkJobCreateSerializer(serializers.Serializer):
+    """An action plus a selection of records: `ids`, or `filters`."""
+    action = serializers.ChoiceField(choices=ComplianceBulkJob.Action.choices)
+    ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False)
+    filters = BulkSelectionFilterSerializer(required=False)
+    status = serializers.ChoiceField(choices=ComplianceRecord.ComplianceStatus.choices, required=False,
+                                     help_text="set_status: the new status")
+    notes = serializers.CharField(required=False, allow_blank=True, help_text="set_status: replaces the notes")
+    document_ids = serializers.ListField(child=serializers.UUIDField(), required=False, allow_empty=False,
+                                         help_text="attach_evidence: documents to attach")
+    assigned_to = serializers.UUIDField(required=False, allow_null=True,
+                                        help_text="reassign: the new assignee, or null to unassign")
+
+    def validate_ids(self, value):
+        if len(value) > settings.COMPLIANCE_BULK_MAX_RECORDS:
+            raise serializers.ValidationError(f"At most {settings.COMPLIANCE_BULK_MAX_RECORDS} records per job.")
+        return value
+
+    def validate(self, attrs):
+        from apps.accounts.models import User
+        from apps.documents.models import Document
+
+        company = self.context["request"].user.company
+        if ("ids" in attrs) == ("filters" in attrs):
+            raise serializers.ValidationError("Select records by either `ids` or `filters`.")
+
+        action = attrs["action"]
+        if action == ComplianceBulkJob.Action.SET_STATUS:
+            if "status" not in attrs:
+                raise serializers.ValidationError({"status": "Required for set_status."})
+            params = {"status": attrs["status"]}
+            if "notes" in attrs:
+                params["notes"] = attrs["notes"]
+        elif action == ComplianceBulkJob.Action.ATTACH_EVIDENCE:
+            document_ids = set(attrs.get("document_ids", []))
+            if not document_ids:
+                raise serializers.ValidationError({"document_ids": "Required for attach_evidence."})
+            found = set(Document.objects.filter(company=company, pk__in=document_ids).values_list("pk", flat=True))
+            if found != document_ids:
+                raise serializers.ValidationError(
+                    {"document_ids": [f"Document {pk} not found." for pk in sorted(map(str, document_ids - found))]}
+                )
+            params = {"document_ids": sorted(map(str, document_ids))}
+        else:
+            if "assigned_to" not in attrs:
+                raise serializers.ValidationError({"assigned_to": "Required for reassign (null to unassign)."})
+            assignee = attrs["assigned_to"]
+            if assignee is not None and not User.objects.filter(pk=assignee, company=company, is_active=True).exists():
+                raise serializers.ValidationError({"assigned_to": "User not found."})
+            params = {"assigned_to": assignee}
+
+        selection = {"ids": attrs["ids"]} if "ids" in attrs else {"filters": attrs["filters"]}
+        return {"action": action, "params": params, "selection": selection}
+
+
+class ComplianceBulkJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField(help_text="Percentage of the selection processed")
+
+    class Meta:
+        model = ComplianceBulkJob
+        exclude = ["company", "cursor"]
+        read_only_fields = [f.name for f in ComplianceBulkJob._meta.fields]
+
+    def get_progress(self, obj) -> int:
+        if obj.status == ComplianceBulkJob.Status.COMPLETED:
+            return 100
+        return min(99, int(obj.processed * 100 / obj.total)) if obj.total else 0
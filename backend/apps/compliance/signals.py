@@ -0,0 +1,72 @@
+"""
+Compliance record signals.
+- Keep the monthly score snapshots (snapshots.py) in step with records.
+- Invalidate the company's cached dashboard score when a record changes.
+- Rebuild the requirement applicability index when the library changes.
+"""
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .applicability import rebuild_applicability
+from .models import Authority, ComplianceCategory, ComplianceRecord, ComplianceRequirement
+from .snapshots import apply_record_change
+from .utils import invalidate_company_compliance_score
+
+SNAPSHOT_FIELDS = {"status", "period_end"}
+
+
+def _snapshot_state(instance):
+    """The (period_end, status) the snapshots hold for this instance, or None if unknown."""
+    if not SNAPSHOT_FIELDS.issubset(instance.__dict__) or instance.period_end is None:
+        return None
+    return instance.period_end, instance.status
+
+
+@receiver(post_init, sender=ComplianceRecord)
+def remember_snapshot_state(sender, instance, **kwargs):
+    instance._snapshot_state = _snapshot_state(instance)
+
+
+@receiver(post_save, sender=ComplianceRecord)
+def update_score_snapshots(sender, instance, created, update_fields=None, **kwargs):
+    if not created and update_fields is not None and not SNAPSHOT_FIELDS.intersection(update_fields):
+        return
+    before = None if created else getattr(instance, "_snapshot_state", None)
+    after = _snapshot_state(instance)
+    if after is None or (before is None and not created):
+        return  # loaded with deferred fields; the nightly recount corrects any drift
+    apply_record_change(instance.company_id, before, after)
+    instance._snapshot_state = after
+
+
+@receiver(post_delete, sender=ComplianceRecord)
+def remove_from_score_snapshots(sender, instance, **kwargs):
+    state = _snapshot_state(instance)
+    if state is not None:
+        apply_record_change(instance.company_id, state, None)
+
+
+@receiver(post_save, sender=ComplianceRecord)
+@receiver(post_delete, sender=ComplianceRecord)
+def invalidate_compliance_score(sender, instance, **kwargs):
+    invalidate_company_compliance_score(instance.company_id)
+
+
+# ─── Applicability index ──────────────────────────────────────────────────────
+
+@receiver(post_save, sender=ComplianceRequirement)
+def index_requirement_applicability(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {"category", "industry_applicability"}.intersection(update_fields):
+        rebuild_applicability(ComplianceRequirement.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=ComplianceCategory)
+def reindex_category_applicability(sender, instance, created, **kwargs):
+    if not created:
+        rebuild_applicability(ComplianceRequirement.objects.filter(category=instance))
+
+
+@receiver(post_save, sender=Authority)
+def reindex_authority_applicability(sender, instance, created, **kwargs):
+    if not created:
+        rebuild_applicability(ComplianceRequirement.objects.filter(category__authority=instance))
@@ -0,0 +1,115 @@
+"""
+Monthly compliance score snapshots.
+
+The health pulse charts a company's score month by month: of the records
+whose period ends in a month, the share that are compliant. Counting that per
+month on every dashboard load cost two queries a month, so the counts live in
+compliance_score_snapshots, one row per company and month:
+
+    - The nightly refresh_compliance_snapshots task recounts the last
+      SNAPSHOT_MONTHS months and the current one for every company in one grouped query,
+      writing zero rows for empty months too.
+    - ComplianceRecord signals move a record's contribution when it is
+      created, deleted, or its status or period end changes; bulk status
+      updates recount the months they touched.
+    - A reader missing rows for its window recounts that company first.
+"""
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+# Complete months kept (the longest history the health pulse can show); the
+# current month is kept as well.
+SNAPSHOT_MONTHS = 36
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def recent_months(count: int, end: date | None = None) -> list[date]:
+    """The `count` months up to and including `end`'s month (default: this month), oldest first."""
+    last = month_start(end or timezone.now().date())
+    return [add_months(last, -i) for i in range(count - 1, -1, -1)]
+
+
+def refresh_snapshots(company_ids=None, months: list[date] | None = None) -> int:
+    """Recount the given companies (default: all) for the given months. Returns rows written."""
+    from apps.companies.models import Company
+
+    from .models import ComplianceRecord, ComplianceScoreSnapshot
+
+    months = sorted(set(months or recent_months(SNAPSHOT_MONTHS + 1)))
+    if company_ids is None:
+        company_ids = list(Company.objects.values_list("pk", flat=True))
+
+    records = ComplianceRecord.objects.filter(
+        company_id__in=company_ids,
+        period_end__gte=months[0],
+        period_end__lt=add_months(months[-1], 1),
+    )
+    counts = {
+        (company_id, month): (total, compliant)
+        for company_id, month, total, compliant in records
+        .annotate(month=TruncMonth("period_end"))
+        .values("company_id", "month")
+        .annotate(total=Count("pk"), compliant=Count("pk", filter=Q(status=ComplianceRecord.ComplianceStatus.COMPLIANT)))
+        .values_list("company_id", "month", "total", "compliant")
+    }
+
+    rows = []
+    for company_id in company_ids:
+        for month in months:
+            total, compliant = counts.get((company_id, month), (0, 0))
+            rows.append(ComplianceScoreSnapshot(company_id=company_id, month=month, total=total, compliant=compliant))
+    ComplianceScoreSnapshot.objects.bulk_create(
+        rows, batch_size=1000, update_conflicts=True, unique_fields=["company", "month"],
+        update_fields=["total", "compliant", "updated_at"],
+    )
+    return len(rows)
+
+
+def apply_record_change(company_id, before: tuple | None, after: tuple | None) -> None:
+    """
+    Move one record's contribution from `before` to `after`, each a
+    (period_end, status) pair or None. Months without a row are recounted.
+    """
+    from .models import ComplianceRecord, ComplianceScoreSnapshot
+
+    compliant = ComplianceRecord.ComplianceStatus.COMPLIANT
+    deltas: dict[date, list[int]] = {}
+    for state, sign in ((before, -1), (after, 1)):
+        if state is not None:
+            delta = deltas.setdefault(month_start(state[0]), [0, 0])
+            delta[0] += sign
+            delta[1] += sign * (state[1] == compliant)
+
+    for month, (total, compliant_delta) in deltas.items():
+        if not total and not compliant_delta:
+            continue
+        updated = ComplianceScoreSnapshot.objects.filter(company_id=company_id, month=month).update(
+            total=F("total") + total, compliant=F("compliant") + compliant_delta,
+        )
+        if not updated:
+            refresh_snapshots([company_id], [month])
+
+
+def score_history(company_id, months: list[date]) -> list:
+    """Snapshots for the given months, oldest first; the company is recounted if any are missing."""
+    from .models import ComplianceScoreSnapshot
+
+    snapshots = list(ComplianceScoreSnapshot.objects.filter(company_id=company_id, month__in=months))
+    if len(snapshots) < len(set(months)):
+        with transaction.atomic():
+            refresh_snapshots([company_id], recent_months(SNAPSHOT_MONTHS + 1) + list(months))
+        snapshots = list(ComplianceScoreSnapshot.objects.filter(company_id=company_id, month__in=months))
+    by_month = {snapshot.month: snapshot for snapshot in snapshots}
+    return [by_month[month] for month in months]
@@ -0,0 +1,36 @@
+"""
+Celery tasks for compliance tracking:
+- Nightly recount of the monthly compliance score snapshots
+- Nightly roll-forward of recurring requirements into period records
+- Bulk operations over selected records (bulk.py)
+"""
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger("auditshield")
+
+
+@shared_task(name="apps.compliance.tasks.refresh_compliance_snapshots")
+def refresh_compliance_snapshots():
+    """Recount every company's monthly score snapshots (corrects drift, adds the new month)."""
+    from .snapshots import refresh_snapshots
+
+    rows = refresh_snapshots()
+    logger.info("Refreshed %d compliance score snapshots", rows)
+
+
+@shared_task(name="apps.compliance.tasks.materialise_compliance_schedule")
+def materialise_compliance_schedule():
+    """Create every company's current and upcoming period records for recurring requirements."""
+    from .schedule import materialise_schedule
+
+    materialise_schedule()
+
+
+@shared_task(name="apps.compliance.tasks.run_compliance_bulk_job")
+def run_compliance_bulk_job(job_id: str):
+    """Run (or resume from its cursor) a compliance bulk job."""
+    from .bulk import run_job
+
+    run_job(job_id)
@@ -0,0 +1,29 @@
+"""
+Fixtures shared by the compliance tests.
+"""
+import pytest
+
+
+@pytest.fixture
+def requirement(db):
+    from apps.compliance.models import ComplianceCategory, ComplianceRequirement
+
+    category = ComplianceCategory.objects.create(name="Tax Filings")
+    return ComplianceRequirement.objects.create(
+        category=category, title="Monthly PAYE return", description="File PAYE.", frequency="monthly", deadline_day=15,
+    )
+
+
+@pytest.fixture
+def make_record(company, requirement):
+    """`_make(period_end, status="pending")` creates a record for the period ending on `period_end`."""
+    from apps.compliance.models import ComplianceRecord
+
+    def _make(period_end, status="pending", company=company, requirement=requirement, **fields):
+        fields.setdefault("period_start", period_end)
+        fields.setdefault("due_date", period_end)
+        return ComplianceRecord.objects.create(
+            company=company, requirement=requirement, status=status, period_end=period_end, **fields,
+        )
+
+    return _make
@@ -0,0 +1,4 @@
+"""
+Helpers shared by the compliance tests.
+"""
+COMPLIANCE_URL = "/api/v1/compliance/"
@@ -0,0 +1,139 @@
+"""
+Requirement applicability tests: the index spells out which countries and
+industries each requirement applies to, and library signals keep it current.
+"""
+import pytest
+
+from apps.compliance.applicability import (
+    applicability_rows,
+    applicable_requirements,
+    rebuild_applicability,
+    requirements_for,
+)
+
+from .helpers import COMPLIANCE_URL
+
+
+@pytest.fixture
+def countries(db):
+    from apps.geography.models import Country, Currency
+
+    currency = Currency.objects.create(code="USD", name="US Dollar", symbol="$")
+    return {
+        code: Country.objects.create(name=name, iso_code=code, iso_code_3=code3, default_currency=currency)
+        for code, code3, name in [("KE", "KEN", "Kenya"), ("RW", "RWA", "Rwanda")]
+    }
+
+
+@pytest.fixture
+def library(countries):
+    """Requirements by title: global, Kenyan, Kenyan healthcare-only and global retail-or-healthcare."""
+    from apps.compliance.models import Authority, ComplianceCategory, ComplianceRequirement
+
+    kra = Authority.objects.create(country=countries["KE"], name="Kenya Revenue Authority", short_name="KRA",
+                                   authority_type="tax")
+    kenyan = ComplianceCategory.objects.create(name="Kenyan tax", authority=kra)
+    general = ComplianceCategory.objects.create(name="General")
+
+    def requirement(title, category, industries=()):
+        return ComplianceRequirement.objects.create(
+            category=category, title=title, description=title, frequency="annually",
+            industry_applicability=list(industries),
+        )
+
+    return {
+        "global": requirement("Annual return", general),
+        "kenya": requirement("PAYE", kenyan),
+        "kenya_health": requirement("Clinic licence", kenyan, ["Healthcare "]),
+        "sector": requirement("Trading permit", general, ["retail", "HEALTHCARE"]),
+    }
+
+
+def _titles(requirements) -> set[str]:
+    return set(requirements.values_list("title", flat=True))
+
+
+@pytest.mark.parametrize("industries,expected", [
+    ([], [""]),
+    (None, [""]),
+    (["Retail", " retail", ""], ["retail"]),
+    (["b", "A"], ["a", "b"]),
+])
+def test_applicability_rows(industries, expected):
+    assert applicability_rows(1, 2, industries) == [(1, 2, industry) for industry in expected]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("country,industry,expected", [
+    ("KE", "healthcare", {"Annual return", "PAYE", "Clinic licence", "Trading permit"}),
+    ("KE", " Technology", {"Annual return", "PAYE"}),
+    ("KE", "", {"Annual return", "PAYE"}),
+    ("RW", "Retail", {"Annual return", "Trading permit"}),
+    (None, None, {"Annual return"}),
+])
+def test_requirements_for(countries, library, country, industry, expected):
+    country_id = countries[country].pk if country else None
+    assert _titles(requirements_for(country_id, industry)) == expected
+    assert requirements_for(country_id, industry).count() == len(expected)
+
+
+@pytest.mark.django_db
+def test_signals_follow_library_edits(countries, library):
+    kenyan = library["kenya"]
+
+    kenyan.industry_applicability = ["mining"]
+    kenyan.save(update_fields=["industry_applicability"])
+    assert "PAYE" not in _titles(requirements_for(countries["KE"].pk, "retail"))
+    assert "PAYE" in _titles(requirements_for(countries["KE"].pk, "mining"))
+
+    authority = kenyan.category.authority
+    authority.country = countries["RW"]
+    authority.save()
+    assert "PAYE" in _titles(requirements_for(countries["RW"].pk, "mining"))
+    assert "PAYE" not in _titles(requirements_for(countries["KE"].pk, "mining"))
+
+    category = kenyan.category
+    category.authority = None
+    category.save()
+    assert "Clinic licence" in _titles(requirements_for(None, "healthcare"))
+
+    kenyan.delete()
+    assert "PAYE" not in _titles(requirements_for(countries["RW"].pk, "mining"))
+
+
+@pytest.mark.django_db
+def test_rebuild_everything(countries, library):
+    from apps.compliance.models import RequirementApplicability
+
+    RequirementApplicability.objects.all().delete()
+    assert rebuild_applicability() == 5
+    assert _titles(requirements_for(countries["KE"].pk, "retail")) == {"Annual return", "PAYE", "Trading permit"}
+
+
+@pytest.mark.django_db
+def test_applicable_requirements_flags_tracked(company, countries, library, make_record):
+    from datetime import date
+
+    company.country = countries["KE"]
+    company.industry = "retail"
+    company.save()
+    make_record(date(2024, 12, 31), requirement=library["kenya"])
+
+    tracked = {req.title: req.tracked for req in applicable_requirements(company)}
+    # "Monthly PAYE return" is make_record's global requirement.
+    assert tracked == {"Annual return": False, "Monthly PAYE return": False, "PAYE": True, "Trading permit": False}
+
+
+@pytest.mark.django_db
+def test_gap_analysis(auth_client, company, countries, library, make_record):
+    from datetime import date
+
+    company.country = countries["KE"]
+    company.industry = "technology"
+    company.save()
+    make_record(date(2024, 12, 31), requirement=library["kenya"])
+
+    response = auth_client.get(f"{COMPLIANCE_URL}gap-analysis/")
+    assert response.status_code == 200
+    assert sorted(gap["title"] for gap in response.data["gaps"]) == ["Annual return", "Monthly PAYE return"]
+    assert response.data["coverage_percent"] == 33
@@ -0,0 +1,242 @@
+"""
+Bulk job tests: chunked, audited updates over a selection of records that
+resume from their cursor after a failure.
+"""
+import uuid
+from datetime import date
+
+import pytest
+
+from apps.compliance import bulk
+from apps.compliance.bulk import run_job
+
+from .helpers import COMPLIANCE_URL
+
+JOBS_URL = f"{COMPLIANCE_URL}records/bulk-jobs/"
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(bulk, "BULK_CHUNK_SIZE", 2)
+
+
+@pytest.fixture
+def webhooks(monkeypatch):
+    """The (job_id, action, changes) of each chunk's webhook event."""
+    sent = []
+    monkeypatch.setattr(bulk, "_notify", lambda company_id, job_id, action, changes: sent.append(
+        (job_id, action, changes),
+    ))
+    return sent
+
+
+@pytest.fixture
+def records(make_record):
+    """Five pending records in primary-key order, with period ends in January to May 2024."""
+    created = [make_record(date(2024, month, 28)) for month in range(1, 6)]
+    return sorted(created, key=lambda record: record.pk)
+
+
+@pytest.fixture
+def make_job(company, admin_user):
+    from apps.compliance.models import ComplianceBulkJob
+
+    def _make(selection, action="set_status", **params):
+        return ComplianceBulkJob.objects.create(
+            company=company, requested_by=admin_user, action=action, selection=selection,
+            params=params or {"status": "compliant"},
+        )
+
+    return _make
+
+
+def _ids(records) -> list[str]:
+    return [str(record.pk) for record in records]
+
+
+def _statuses(records) -> list[str]:
+    for record in records:
+        record.refresh_from_db()
+    return [record.status for record in records]
+
+
+def _audited(job) -> list[str]:
+    from apps.audit_logs.models import AuditLog
+
+    return sorted(
+        path.split("/")[-2] for path in AuditLog.objects.filter(request_body__bulk_job=str(job.pk))
+        .values_list("path", flat=True)
+    )
+
+
+@pytest.mark.django_db
+def test_chunks_of_ids_are_sorted_and_start_after_the_cursor(company, small_chunks):
+    ids = sorted(uuid.uuid4() for _ in range(5))
+    selection = {"ids": [str(pk) for pk in reversed(ids)] + [str(ids[0])]}
+    assert list(bulk._chunks(company.pk, selection, "")) == [ids[0:2], ids[2:4], ids[4:]]
+    assert list(bulk._chunks(company.pk, selection, str(ids[2]))) == [ids[3:5]]
+
+
+@pytest.mark.django_db
+def test_chunks_of_filters_page_by_primary_key(company, records, small_chunks):
+    selected = [record.pk for record in records if record.period_end >= date(2024, 2, 1)]
+    selection = {"filters": {"period_end_from": "2024-02-01"}}
+    assert list(bulk._chunks(company.pk, selection, "")) == [selected[:2], selected[2:]]
+    assert list(bulk._chunks(company.pk, selection, str(selected[2]))) == [[selected[3]]]
+
+
+@pytest.mark.django_db
+def test_set_status_job(company, records, make_job, webhooks, small_chunks, django_capture_on_commit_callbacks):
+    from apps.companies.models import Company
+    from apps.compliance.models import ComplianceBulkJob, ComplianceRecord, ComplianceScoreSnapshot
+
+    records[0].status = "compliant"
+    records[0].save()
+    other = Company.objects.create(name="Other Ltd", company_type="sme", email="o@other.com", phone="1")
+    foreign = ComplianceRecord.objects.create(
+        company=other, requirement=records[0].requirement, period_start=date(2024, 1, 1),
+        period_end=date(2024, 1, 28), due_date=date(2024, 2, 15),
+    )
+    missing = str(uuid.uuid4())
+    job = make_job({"ids": [*_ids(records), str(foreign.pk), missing]}, status="compliant", notes="Filed")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        job = run_job(job.pk)
+
+    assert job.status == ComplianceBulkJob.Status.COMPLETED
+    assert (job.total, job.processed, job.changed) == (7, 7, 5)
+    assert sorted(job.skipped) == sorted([str(foreign.pk), missing])
+    assert _statuses(records) == ["compliant"] * 5
+    assert all(record.notes == "Filed" and record.completed_by_id for record in records[1:])
+    assert _statuses([foreign]) == ["pending"]
+
+    assert _audited(job) == sorted(_ids(records))
+    assert sum(len(changes) for _, _, changes in webhooks) == 5
+    assert {job_id for job_id, _, _ in webhooks} == {job.pk}
+    assert ComplianceScoreSnapshot.objects.get(company=company, month=date(2024, 3, 1)).compliant == 1
+
+
+@pytest.mark.django_db
+def test_unchanged_records_are_not_audited(records, make_job, webhooks):
+    job = run_job(make_job({"ids": _ids(records)}, status="pending").pk)
+    assert job.changed == 0
+    assert _audited(job) == []
+
+
+@pytest.mark.django_db
+def test_failed_job_resumes_from_its_cursor(records, make_job, webhooks, small_chunks, monkeypatch):
+    from apps.compliance.models import ComplianceBulkJob
+
+    apply_chunk, calls = bulk.apply_chunk, []
+
+    def flaky(company_id, action, params, ids, *args):
+        calls.append(list(ids))
+        if len(calls) == 2:
+            raise ConnectionError("database went away")
+        return apply_chunk(company_id, action, params, ids, *args)
+
+    monkeypatch.setattr(bulk, "apply_chunk", flaky)
+    job = make_job({"filters": {"status": ["pending"]}})
+    with pytest.raises(ConnectionError):
+        run_job(job.pk)
+
+    job.refresh_from_db()
+    assert job.status == ComplianceBulkJob.Status.FAILED
+    assert job.error == "database went away"
+    assert (job.cursor, job.processed, job.changed) == (str(records[1].pk), 2, 2)
+    assert _statuses(records) == ["compliant"] * 2 + ["pending"] * 3
+
+    job = run_job(job.pk)
+    assert calls[2:] == [[r.pk for r in records[2:4]], [records[4].pk]]
+    assert job.status == ComplianceBulkJob.Status.COMPLETED
+    assert (job.total, job.processed, job.changed, job.error) == (5, 5, 5, "")
+    assert _audited(job) == sorted(_ids(records))
+
+    # A completed job is not run again.
+    assert run_job(job.pk).processed == 5
+    assert len(calls) == 4
+
+
+@pytest.mark.django_db
+def test_attach_evidence_job(company, records, make_job, webhooks):
+    from apps.documents.models import Document
+
+    document = Document.objects.create(
+        company=company, title="Receipt", document_type="other", file="documents/x.pdf",
+        file_name="x.pdf", file_size=1, mime_type="application/pdf",
+    )
+    records[0].evidence_documents.add(document)
+    job = run_job(make_job({"ids": _ids(records[:3])}, "attach_evidence", document_ids=[str(document.pk)]).pk)
+
+    assert job.changed == 2
+    assert all(list(record.evidence_documents.all()) == [document] for record in records[:3])
+    assert not records[3].evidence_documents.exists()
+
+
+@pytest.mark.django_db
+def test_reassign_job(records, make_job, hr_user, webhooks):
+    from apps.compliance.models import ComplianceRecord
+
+    job = run_job(make_job({"ids": _ids(records[:2])}, "reassign", assigned_to=str(hr_user.pk)).pk)
+    assert job.changed == 2
+    assignees = dict(ComplianceRecord.objects.values_list("pk", "assigned_to_id"))
+    assert [assignees[record.pk] for record in records] == [hr_user.pk] * 2 + [None] * 3
+
+    job = run_job(make_job({"ids": _ids(records)}, "reassign", assigned_to=None).pk)
+    assert job.changed == 2
+    assert not ComplianceRecord.objects.filter(assigned_to__isnull=False).exists()
+
+
+@pytest.mark.django_db
+def test_start_job_endpoint(auth_client, records, webhooks, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        response = auth_client.post(JOBS_URL, {
+            "action": "set_status", "status": "overdue", "filters": {"period_end_to": "2024-02-28"},
+        }, format="json")
+    assert response.status_code == 202, response.data
+    assert response.data["status"] == "queued"
+    assert "cursor" not in response.data
+
+    progress = auth_client.get(f"{JOBS_URL}{response.data['id']}/").data
+    assert (progress["status"], progress["progress"], progress["processed"], progress["changed"]) == (
+        "completed", 100, 2, 2,
+    )
+    assert _statuses(records) == ["overdue" if r.period_end < date(2024, 3, 1) else "pending" for r in records]
+    assert [job["id"] for job in auth_client.get(JOBS_URL).data["results"]] == [response.data["id"]]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("body", [
+    {"action": "set_status", "status": "compliant"},                                    # no selection
+    {"action": "set_status", "status": "compliant", "ids": [str(uuid.uuid4())], "filters": {"status": ["pending"]}},
+    {"action": "set_status", "ids": [str(uuid.uuid4())]},                                # no status
+    {"action": "set_status", "status": "compliant", "filters": {}},
+    {"action": "attach_evidence", "ids": [str(uuid.uuid4())], "document_ids": [str(uuid.uuid4())]},
+    {"action": "reassign", "ids": [str(uuid.uuid4())]},
+    {"action": "reassign", "ids": [str(uuid.uuid4())], "assigned_to": str(uuid.uuid4())},
+])
+def test_start_job_validation(auth_client, body):
+    assert auth_client.post(JOBS_URL, body, format="json").status_code == 400
+
+
+@pytest.mark.django_db
+def test_filters_are_capped(auth_client, records, settings):
+    settings.COMPLIANCE_BULK_MAX_RECORDS = 4
+    response = auth_client.post(JOBS_URL, {
+        "action": "set_status", "status": "compliant", "filters": {"status": ["pending"]},
+    }, format="json")
+    assert response.status_code == 400
+    assert "5 records" in str(response.data)
+
+
+@pytest.mark.django_db
+def test_bulk_update_endpoint(auth_client, records, webhooks):
+    url = f"{COMPLIANCE_URL}records/bulk-update/"
+    response = auth_client.post(url, {"ids": _ids(records[:2]) + [str(uuid.uuid4())], "status": "exempt"},
+                                format="json")
+    assert response.status_code == 200
+    assert response.data == {"updated": 2}
+    assert _statuses(records) == ["exempt"] * 2 + ["pending"] * 3
+
+    assert auth_client.post(url, {"ids": ["nope"], "status": "exempt"}, format="json").status_code == 400
+    assert auth_client.post(url, {"ids": _ids(records), "status": "done"}, format="json").status_code == 400
@@ -0,0 +1,189 @@
+"""
+Recurring schedule tests: periods() lays each frequency on its reporting-year
+grid, and materialise_schedule() writes the current and upcoming records once.
+"""
+from datetime import date
+
+import pytest
+
+from apps.compliance.schedule import due_date, materialise_schedule, periods
+
+TODAY = date(2024, 6, 15)
+
+
+@pytest.mark.parametrize("period_end,deadline_day,expected", [
+    (date(2024, 6, 30), None, date(2024, 7, 15)),
+    (date(2024, 1, 31), 31, date(2024, 2, 29)),     # clamped to the month
+    (date(2024, 12, 31), 10, date(2025, 1, 10)),
+])
+def test_due_date(period_end, deadline_day, expected):
+    assert due_date(period_end, deadline_day) == expected
+
+
+def test_monthly_periods_are_calendar_months():
+    assert periods("monthly", 20, (4, 6), TODAY) == [
+        (date(2024, 6, 1), date(2024, 6, 30), date(2024, 7, 20)),
+        (date(2024, 7, 1), date(2024, 7, 31), date(2024, 8, 20)),
+        (date(2024, 8, 1), date(2024, 8, 31), date(2024, 9, 20)),
+        (date(2024, 9, 1), date(2024, 9, 30), date(2024, 10, 20)),
+    ]
+
+
+def test_quarterly_periods_follow_the_reporting_year():
+    # A 6 April tax year: quarters start 6 Apr, 6 Jul, 6 Oct and 6 Jan.
+    assert periods("quarterly", None, (4, 6), TODAY) == [
+        (date(2024, 4, 6), date(2024, 7, 5), date(2024, 8, 15)),
+        (date(2024, 7, 6), date(2024, 10, 5), date(2024, 11, 15)),
+    ]
+
+
+def test_period_starting_later_in_todays_month_is_not_current():
+    (current,) = periods("quarterly", None, (4, 6), date(2024, 4, 3), horizon_days=0)
+    assert current[:2] == (date(2024, 1, 6), date(2024, 4, 5))
+
+
+@pytest.mark.parametrize("year_start,today,expected", [
+    ((7, 1), TODAY, [(date(2023, 7, 1), date(2024, 6, 30)), (date(2024, 7, 1), date(2025, 6, 30))]),
+    ((10, 1), date(2024, 2, 10), [(date(2023, 10, 1), date(2024, 9, 30))]),
+    ((1, 1), date(2024, 12, 31), [(date(2024, 1, 1), date(2024, 12, 31)), (date(2025, 1, 1), date(2025, 12, 31))]),
+])
+def test_annual_periods(year_start, today, expected):
+    assert [period[:2] for period in periods("annually", None, year_start, today)] == expected
+
+
+def test_horizon_bounds_upcoming_periods():
+    assert len(periods("monthly", None, (1, 1), TODAY, horizon_days=0)) == 1
+    assert len(periods("monthly", None, (1, 1), TODAY, horizon_days=365)) == 13
+
+
+@pytest.mark.parametrize("frequency", ["one_time", "as_needed"])
+def test_non_recurring_frequencies_have_no_periods(frequency):
+    assert periods(frequency, None, (1, 1), TODAY) == []
+
+
+def test_periods_are_contiguous():
+    result = periods("quarterly", None, (2, 29), date(2023, 11, 20), horizon_days=800)
+    for (_, end, _), (start, _, _) in zip(result, result[1:]):
+        assert (start - end).days == 1
+
+
+# ─── materialise_schedule ─────────────────────────────────────────────────────
+
+@pytest.fixture
+def library(db):
+    """A UK-style tax authority (6 April tax year) with quarterly filings, plus a monthly labour report."""
+    from apps.compliance.models import Authority, ComplianceCategory, ComplianceRequirement
+    from apps.geography.models import Country, Currency
+
+    currency = Currency.objects.create(code="GBP", name="Pound Sterling", symbol="£")
+    country = Country.objects.create(
+        name="United Kingdom", iso_code="GB", iso_code_3="GBR", default_currency=currency,
+        tax_year_start_month=4, tax_year_start_day=6,
+    )
+    hmrc = Authority.objects.create(country=country, name="HMRC", short_name="HMRC", authority_type="tax")
+    labour = Authority.objects.create(country=country, name="Labour Office", short_name="LO", authority_type="labor")
+
+    def requirement(title, authority, frequency, **fields):
+        category = ComplianceCategory.objects.create(name=title, authority=authority)
+        return ComplianceRequirement.objects.create(
+            category=category, title=title, description=title, frequency=frequency, **fields,
+        )
+
+    return {
+        "country": country,
+        "vat": requirement("VAT return", hmrc, "quarterly"),
+        "headcount": requirement("Headcount report", labour, "quarterly", deadline_day=5),
+        "optional": requirement("Voluntary survey", labour, "monthly", is_mandatory=False),
+        "once": requirement("Registration", labour, "one_time"),
+    }
+
+
+@pytest.fixture
+def uk_company(library):
+    from apps.companies.models import Company
+
+    return Company.objects.create(
+        name="Brit Ltd", company_type="sme", email="b@brit.co.uk", phone="1", country=library["country"],
+        fiscal_year_start=1,
+    )
+
+
+def _periods(company, requirement) -> list[tuple]:
+    from apps.compliance.models import ComplianceRecord
+
+    return list(
+        ComplianceRecord.objects.filter(company=company, requirement=requirement)
+        .order_by("period_start").values_list("period_start", "period_end", "due_date")
+    )
+
+
+@pytest.mark.django_db
+def test_materialise_uses_the_right_reporting_year(uk_company, library):
+    from apps.compliance.models import ComplianceRecord
+
+    ComplianceRecord.objects.all().delete()
+    materialise_schedule(today=TODAY)
+
+    # Tax authority: the country's tax year; others: the company's fiscal year.
+    assert _periods(uk_company, library["vat"]) == [
+        (date(2024, 4, 6), date(2024, 7, 5), date(2024, 8, 15)),
+        (date(2024, 7, 6), date(2024, 10, 5), date(2024, 11, 15)),
+    ]
+    assert _periods(uk_company, library["headcount"]) == [
+        (date(2024, 4, 1), date(2024, 6, 30), date(2024, 7, 5)),
+        (date(2024, 7, 1), date(2024, 9, 30), date(2024, 10, 5)),
+    ]
+    assert not _periods(uk_company, library["optional"])
+    assert not _periods(uk_company, library["once"])
+    assert set(ComplianceRecord.objects.values_list("status", flat=True)) == {"pending"}
+
+
+@pytest.mark.django_db
+def test_materialise_is_idempotent(uk_company, library):
+    from apps.compliance.models import ComplianceRecord
+
+    materialise_schedule(today=TODAY)
+    count = ComplianceRecord.objects.count()
+    ComplianceRecord.objects.filter(requirement=library["vat"]).update(status="compliant")
+
+    assert materialise_schedule(today=TODAY) > 0
+    assert ComplianceRecord.objects.count() == count
+    assert set(ComplianceRecord.objects.filter(requirement=library["vat"]).values_list("status", flat=True)) == {
+        "compliant",
+    }
+
+
+@pytest.mark.django_db
+def test_materialise_scopes_to_given_companies(uk_company, company, library):
+    from apps.companies.models import Company
+    from apps.compliance.models import ComplianceRecord
+
+    ComplianceRecord.objects.all().delete()
+    materialise_schedule(Company.objects.filter(pk=company.pk), today=TODAY)
+    assert not ComplianceRecord.objects.filter(company=uk_company).exists()
+
+
+@pytest.mark.django_db
+def test_materialise_refreshes_snapshots_and_scores(uk_company, library):
+    from apps.compliance.models import ComplianceRecord, ComplianceScoreSnapshot
+    from apps.compliance.utils import get_company_compliance_score
+
+    ComplianceRecord.objects.all().delete()
+    assert get_company_compliance_score(uk_company)["total"] == 0
+
+    materialise_schedule(today=TODAY)
+    assert get_company_compliance_score(uk_company)["total"] == 4
+    snapshot = ComplianceScoreSnapshot.objects.get(company=uk_company, month=date(2024, 7, 1))
+    assert (snapshot.total, snapshot.compliant) == (1, 0)
+
+
+@pytest.mark.django_db
+def test_new_company_is_seeded(library):
+    from apps.companies.models import Company
+    from apps.compliance.models import ComplianceRecord
+
+    company = Company.objects.create(
+        name="New Ltd", company_type="sme", email="n@new.co.uk", phone="1", country=library["country"],
+    )
+    seeded = set(ComplianceRecord.objects.filter(company=company).values_list("requirement__title", flat=True))
+    assert seeded == {"VAT return", "Headcount report", "Registration"}
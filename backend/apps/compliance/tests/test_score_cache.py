@@ -0,0 +1,94 @@
+"""
+Cached dashboard score tests: the score is computed once and served from
+the cache until one of the company's records changes and commits.
+"""
+from datetime import date
+
+import pytest
+
+from apps.compliance.utils import get_company_compliance_score, invalidate_compliance_scores
+
+from .helpers import COMPLIANCE_URL
+
+
+@pytest.mark.django_db
+def test_score_counts_statuses(company, make_record):
+    for day, status in [(1, "compliant"), (2, "compliant"), (3, "pending"), (4, "overdue"), (5, "exempt")]:
+        make_record(date(2024, 1, day), status)
+    assert get_company_compliance_score(company) == {
+        "score": 40, "compliant": 2, "pending": 1, "overdue": 1, "total": 5,
+    }
+
+
+@pytest.mark.django_db
+def test_no_records_scores_zero(company):
+    assert get_company_compliance_score(company)["score"] == 0
+
+
+@pytest.mark.django_db
+def test_score_is_cached(company, make_record, django_assert_num_queries):
+    make_record(date(2024, 1, 1), "compliant")
+    first = get_company_compliance_score(company)
+    with django_assert_num_queries(0):
+        assert get_company_compliance_score(company) == first
+
+
+@pytest.mark.django_db
+def test_record_changes_invalidate_on_commit(company, make_record, django_capture_on_commit_callbacks):
+    record = make_record(date(2024, 1, 1))
+    assert get_company_compliance_score(company)["score"] == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        record.status = "compliant"
+        record.save()
+        # Not dropped before the change commits, so no reader caches the old count again.
+        assert get_company_compliance_score(company)["score"] == 0
+    assert get_company_compliance_score(company)["score"] == 100
+
+    with django_capture_on_commit_callbacks(execute=True):
+        make_record(date(2024, 2, 1))
+    assert get_company_compliance_score(company)["total"] == 2
+
+    with django_capture_on_commit_callbacks(execute=True):
+        record.delete()
+    assert get_company_compliance_score(company) == {
+        "score": 0, "compliant": 0, "pending": 1, "overdue": 0, "total": 1,
+    }
+
+
+@pytest.mark.django_db
+def test_other_companies_keep_their_cached_scores(company, make_record, django_capture_on_commit_callbacks,
+                                                  django_assert_num_queries):
+    from apps.companies.models import Company
+
+    other = Company.objects.create(name="Other Ltd", company_type="sme", email="o@other.com", phone="1")
+    get_company_compliance_score(other)
+    with django_capture_on_commit_callbacks(execute=True):
+        make_record(date(2024, 1, 1))
+    with django_assert_num_queries(0):
+        get_company_compliance_score(other)
+
+
+@pytest.mark.django_db
+def test_bulk_invalidation(company, make_record):
+    from apps.compliance.models import ComplianceRecord
+
+    make_record(date(2024, 1, 1))
+    get_company_compliance_score(company)
+    ComplianceRecord.objects.update(status="compliant")    # no signals
+    assert get_company_compliance_score(company)["score"] == 0
+
+    invalidate_compliance_scores([company.pk])
+    assert get_company_compliance_score(company)["score"] == 100
+
+
+@pytest.mark.django_db
+def test_dashboard_endpoint(auth_client, make_record, django_capture_on_commit_callbacks):
+    record = make_record(date(2024, 1, 1))
+    url = f"{COMPLIANCE_URL}dashboard/"
+    assert auth_client.get(url).data["score"] == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = auth_client.patch(f"{COMPLIANCE_URL}records/{record.pk}/", {"status": "compliant"}, format="json")
+    assert response.status_code == 200, response.data
+    assert auth_client.get(url).data["score"] == 100
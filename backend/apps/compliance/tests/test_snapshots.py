@@ -0,0 +1,130 @@
+"""
+Monthly score snapshot tests: record signals move each record's
+contribution between months, and missing months are recounted on read.
+"""
+from datetime import date
+
+import pytest
+from django.utils import timezone
+from freezegun import freeze_time
+
+from apps.compliance.snapshots import add_months, month_start, recent_months, refresh_snapshots, score_history
+
+from .helpers import COMPLIANCE_URL
+
+
+def _months(company) -> dict:
+    from apps.compliance.models import ComplianceScoreSnapshot
+
+    return {
+        month: (total, compliant)
+        for month, total, compliant in ComplianceScoreSnapshot.objects.filter(company=company)
+        .exclude(total=0).values_list("month", "total", "compliant")
+    }
+
+
+def _recounted(company) -> dict:
+    from apps.compliance.models import ComplianceScoreSnapshot
+
+    ComplianceScoreSnapshot.objects.filter(company=company).delete()
+    refresh_snapshots([company.pk])
+    return _months(company)
+
+
+@pytest.mark.parametrize("month,count,expected", [
+    (date(2024, 1, 1), 1, date(2024, 2, 1)),
+    (date(2024, 12, 1), 1, date(2025, 1, 1)),
+    (date(2024, 1, 1), -1, date(2023, 12, 1)),
+    (date(2024, 3, 1), -27, date(2021, 12, 1)),
+])
+def test_add_months(month, count, expected):
+    assert add_months(month, count) == expected
+
+
+def test_recent_months():
+    assert recent_months(3, date(2024, 2, 17)) == [date(2023, 12, 1), date(2024, 1, 1), date(2024, 2, 1)]
+
+
+@pytest.mark.django_db
+@freeze_time("2024-06-15")
+def test_refresh_counts_every_month(company, make_record):
+    from apps.compliance.models import ComplianceScoreSnapshot
+
+    make_record(date(2024, 4, 30), "compliant")
+    make_record(date(2024, 4, 10), "overdue")
+    make_record(date(2024, 5, 31), "compliant")
+    make_record(date(2019, 1, 31), "compliant")    # older than the kept history
+
+    ComplianceScoreSnapshot.objects.all().delete()
+    assert refresh_snapshots() == 37
+    assert _months(company) == {date(2024, 4, 1): (2, 1), date(2024, 5, 1): (1, 1)}
+    assert ComplianceScoreSnapshot.objects.get(company=company, month=date(2024, 4, 1)).score == 50
+    assert ComplianceScoreSnapshot.objects.get(company=company, month=date(2024, 6, 1)).total == 0
+
+
+@pytest.mark.django_db
+@freeze_time("2024-06-15")
+def test_signals_move_contributions(company, make_record):
+    refresh_snapshots([company.pk])
+    record = make_record(date(2024, 4, 30))
+    assert _months(company) == {date(2024, 4, 1): (1, 0)}
+
+    record.status = "compliant"
+    record.save(update_fields=["status"])
+    assert _months(company) == {date(2024, 4, 1): (1, 1)}
+
+    record.period_end = date(2024, 5, 31)
+    record.save()
+    assert _months(company) == {date(2024, 5, 1): (1, 1)} == _recounted(company)
+
+    record.delete()
+    assert _months(company) == {}
+
+
+@pytest.mark.django_db
+@freeze_time("2024-06-15")
+def test_change_in_a_month_without_a_row_recounts_it(company, make_record):
+    """A record outside the kept window still gets a correct row for its month."""
+    make_record(date(2020, 1, 31), "compliant")
+    make_record(date(2020, 1, 15))
+    assert _months(company) == {date(2020, 1, 1): (2, 1)}
+
+
+@pytest.mark.django_db
+@freeze_time("2024-06-15")
+def test_score_history_recounts_missing_months(company, make_record):
+    from apps.compliance.models import ComplianceRecord, ComplianceScoreSnapshot
+
+    make_record(date(2024, 4, 30), "compliant")
+    make_record(date(2024, 5, 31))
+    # Bypasses the signals, as a bulk update does; the next read repairs the rows.
+    ComplianceScoreSnapshot.objects.all().delete()
+    ComplianceRecord.objects.update(status="compliant")
+
+    history = score_history(company.pk, [date(2024, 4, 1), date(2024, 5, 1)])
+    assert [(s.month, s.total, s.compliant) for s in history] == [
+        (date(2024, 4, 1), 1, 1), (date(2024, 5, 1), 1, 1),
+    ]
+    assert ComplianceScoreSnapshot.objects.filter(company=company).count() == 37
+
+
+@pytest.mark.django_db
+def test_health_pulse_reads_complete_months(auth_client, make_record):
+    # Not frozen: DRF's throttle timer doesn't work under freezegun.
+    this_month = month_start(timezone.now().date())
+    three_ago, two_ago, last_month = (add_months(this_month, -i) for i in (3, 2, 1))
+    make_record(three_ago, "compliant")
+    make_record(two_ago, "compliant")
+    make_record(last_month, "compliant")
+    make_record(last_month.replace(day=15))
+    make_record(this_month)    # current month: not shown
+
+    response = auth_client.get(f"{COMPLIANCE_URL}health-pulse/", {"months": 3})
+    assert response.status_code == 200
+    assert response.data["history"] == [
+        {"month": f"{three_ago:%Y-%m}", "score": 100},
+        {"month": f"{two_ago:%Y-%m}", "score": 100},
+        {"month": f"{last_month:%Y-%m}", "score": 50},
+    ]
+    assert response.data["current_score"] == 50
+    assert response.data["trend"] == "declining"
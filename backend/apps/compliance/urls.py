@@ -8,6 +8,8 @@ urlpatterns = [
     path("gap-analysis/",           views.ComplianceGapAnalysisView.as_view(),     name="compliance-gap-analysis"),
     path("records/",                views.ComplianceRecordListView.as_view(),      name="compliance-records"),
     path("records/bulk-update/",    views.ComplianceRecordBulkUpdateView.as_view(),name="compliance-bulk-update"),
+    path("records/bulk-jobs/",      views.ComplianceBulkJobListView.as_view(),     name="compliance-bulk-jobs"),
+    path("records/bulk-jobs/<uuid:pk>/", views.ComplianceBulkJobDetailView.as_view(), name="compliance-bulk-job-detail"),
     path("records/<uuid:pk>/",      views.ComplianceRecordDetailView.as_view(),    name="compliance-record-detail"),
     path("requirements/",           views.RequirementListView.as_view(),           name="compliance-requirements"),
     path("categories/",             views.ComplianceCategoryListView.as_view(),    name="compliance-categories"),
@@ -25,17 +25,58 @@ def get_employee_compliance_score(employee) -> int:
     return score
 
 
+# Company scores are cached until one of its records changes, and at most this long (seconds).
+COMPLIANCE_SCORE_CACHE_TTL = 15 * 60
+
+
+def _compliance_score_key(company_id) -> str:
+    return f"compliance-score:{company_id}"
+
+
 def get_company_compliance_score(company) -> dict:
-    """Returns overall compliance dashboard data for a company."""
+    """
+    Returns overall compliance dashboard data for a company.
+
+    All status counts come from one conditional-aggregation query, and the
+    result is cached per company until invalidate_company_compliance_score.
+    """
+    from django.core.cache import cache
+    from django.db.models import Count, Q
+
     from .models import ComplianceRecord
-    records = ComplianceRecord.objects.filter(company=company)
-    total = records.count()
-    if total == 0:
-        return {"score": 0, "compliant": 0, "pending": 0, "overdue": 0, "total": 0}
 
-    compliant = records.filter(status=ComplianceRecord.ComplianceStatus.COMPLIANT).count()
-    overdue = records.filter(status=ComplianceRecord.ComplianceStatus.OVERDUE).count()
-    pending = records.filter(status=ComplianceRecord.ComplianceStatus.PENDING).count()
-    score = int((compliant / total) * 100)
+    key = _compliance_score_key(company.pk)
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    status = ComplianceRecord.ComplianceStatus
+    counts = ComplianceRecord.objects.filter(company=company).aggregate(
+        total=Count("pk"),
+        compliant=Count("pk", filter=Q(status=status.COMPLIANT)),
+        pending=Count("pk", filter=Q(status=status.PENDING)),
+        overdue=Count("pk", filter=Q(status=status.OVERDUE)),
+    )
+    total = counts["total"]
+    score = int((counts["compliant"] / total) * 100) if total else 0
+    data = {"score": score, "compliant": counts["compliant"], "pending": counts["pending"],
+            "overdue": counts["overdue"], "total": total}
+    cache.set(key, data, COMPLIANCE_SCORE_CACHE_TTL)
+    return data
+
+
+def invalidate_compliance_scores(company_ids) -> None:
+    """Drop the cached scores of many companies at once (e.g. after a bulk insert)."""
+    from django.core.cache import cache
+
+    keys = [_compliance_score_key(company_id) for company_id in company_ids]
+    if keys:
+        cache.delete_many(keys)
+
+
+def invalidate_company_compliance_score(company_id) -> None:
+    """Drop the cached score once the current transaction (if any) commits."""
+    from django.core.cache import cache
+    from django.db import transaction
 
-    return {"score": score, "compliant": compliant, "pending": pending, "overdue": overdue, "total": total}
+    transaction.on_commit(lambda: cache.delete(_compliance_score_key(company_id)))
@@ -1,17 +1,29 @@
-from datetime import timedelta
-
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema, extend_schema_view
 from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import OrderingFilter, SearchFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .models import ComplianceCategory, ComplianceRecord, ComplianceRequirement
-from .serializers import ComplianceCategorySerializer, ComplianceRecordSerializer, RequirementSerializer
+from .applicability import applicable_requirements
+from .bulk import BULK_CHUNK_SIZE, apply_chunk, selection_queryset
+from .models import ComplianceBulkJob, ComplianceCategory, ComplianceRecord, ComplianceRequirement
+from .serializers import (
+    ComplianceBulkJobCreateSerializer,
+    ComplianceBulkJobSerializer,
+    ComplianceCategorySerializer,
+    ComplianceRecordSerializer,
+    RequirementSerializer,
+)
+from .snapshots import SNAPSHOT_MONTHS, add_months, month_start, recent_months, score_history
+from .tasks import run_compliance_bulk_job
 from .utils import get_company_compliance_score
 
 
@@ -170,43 +182,35 @@ def _linear_regression_predict(x_vals, y_vals, x_pred):
     tags=["compliance"],
     summary="Compliance health pulse",
     description=(
-        "Returns a rolling 6-month compliance score history plus trend analysis.\n\n"
+        "Returns a rolling compliance score history (the last `months` complete months, "
+        "default 6, at most 36) plus trend analysis. Scores come from monthly snapshots.\n\n"
         "- **history**: Month-by-month score (YYYY-MM)\n"
         "- **trend**: improving / declining / stable\n"
         "- **predicted_30d**: Linear-regression forecast for next 30 days\n"
         "- **risk_level**: critical (<50) / at_risk (50–69) / moderate (70–84) / low (85+)\n"
         "- **days_to_threshold**: If declining, estimated days until score hits 70"
     ),
+    parameters=[
+        OpenApiParameter("months", OpenApiTypes.INT, description="Months of history (1-36, default 6)"),
+    ],
     responses={200: OpenApiResponse(description="Health pulse data")},
 )
 class ComplianceHealthPulseView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        company = request.user.company
-        today = timezone.now().date()
-
-        history = []
-        for months_ago in range(5, -1, -1):
-            # Compute the first and last day of that calendar month
-            first_of_current = today.replace(day=1)
-            target = (first_of_current - timedelta(days=1)).replace(day=1)
-            for _ in range(months_ago):
-                target = (target - timedelta(days=1)).replace(day=1)
-            last_of_target = (
-                (target.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
-            )
-            label = target.strftime("%Y-%m")
-
-            records = ComplianceRecord.objects.filter(
-                company=company,
-                period_end__year=target.year,
-                period_end__month=target.month,
-            )
-            total = records.count()
-            compliant = records.filter(status=ComplianceRecord.ComplianceStatus.COMPLIANT).count()
-            score = int((compliant / total) * 100) if total > 0 else 0
-            history.append({"month": label, "score": score})
+        try:
+            months = int(request.query_params.get("months", 6))
+        except ValueError:
+            months = 6
+        months = max(1, min(months, SNAPSHOT_MONTHS))
+
+        # Complete months only: the window ends with last month
+        last_month = add_months(month_start(timezone.now().date()), -1)
+        history = [
+            {"month": snapshot.month.strftime("%Y-%m"), "score": snapshot.score}
+            for snapshot in score_history(request.user.company_id, recent_months(months, last_month))
+        ]
 
         current_score = history[-1]["score"] if history else 0
 
@@ -266,9 +270,10 @@ class ComplianceHealthPulseView(APIView):
     tags=["compliance"],
     summary="Compliance gap analysis",
     description=(
-        "Returns compliance requirements that exist globally but have NO record for "
-        "this company. Filtered by industry_applicability — only gaps relevant to "
-        "the company's industry are included.\n\n"
+        "Returns compliance requirements that apply to this company but have NO record "
+        "for it. A requirement applies when its authority is in the company's country "
+        "(or is global) and its industry_applicability is empty or lists the company's "
+        "industry.\n\n"
         "**priority**: critical (mandatory + overdue deadline) / high (mandatory) / medium (optional)"
     ),
     responses={200: OpenApiResponse(description="Gap analysis result")},
@@ -280,22 +285,13 @@ class ComplianceGapAnalysisView(APIView):
         company = request.user.company
         today = timezone.now().date()
 
-        # Requirements already tracked by this company
-        tracked_req_ids = ComplianceRecord.objects.filter(
-            company=company
-        ).values_list("requirement_id", flat=True).distinct()
-
-        # All requirements not tracked
-        all_reqs = ComplianceRequirement.objects.select_related(
-            "category", "category__authority"
-        ).exclude(id__in=tracked_req_ids)
-
-        # Filter by industry applicability
-        company_industry = (company.industry or "").lower()
+        # One query: applicable requirements (via the applicability index), flagged if tracked
         gaps = []
-        for req in all_reqs:
-            applicability = req.industry_applicability or []
-            if applicability and company_industry not in [a.lower() for a in applicability]:
+        applicable_count = tracked_count = 0
+        for req in applicable_requirements(company):
+            applicable_count += 1
+            if req.tracked:
+                tracked_count += 1
                 continue
 
             # Priority logic
@@ -319,9 +315,7 @@ class ComplianceGapAnalysisView(APIView):
                 "priority": priority,
             })
 
-        total_reqs = ComplianceRequirement.objects.count()
-        tracked_count = len(tracked_req_ids)
-        coverage_percent = int((tracked_count / total_reqs) * 100) if total_reqs > 0 else 0
+        coverage_percent = int((tracked_count / applicable_count) * 100) if applicable_count > 0 else 0
 
         return Response({
             "total_gaps": len(gaps),
@@ -336,8 +330,10 @@ class ComplianceGapAnalysisView(APIView):
     tags=["compliance"],
     summary="Bulk update compliance records",
     description=(
-        "Updates status (and optionally notes) for multiple compliance records "
-        "belonging to the authenticated company.\n\n"
+        "Updates status (and optionally notes) for up to "
+        f"{BULK_CHUNK_SIZE} compliance records belonging to the authenticated company, "
+        "writing an audit entry per changed record. Use `records/bulk-jobs/` for larger "
+        "selections.\n\n"
         "Body: `{\"ids\": [\"uuid1\", \"uuid2\"], \"status\": \"compliant\", \"notes\": \"...\"}`"
     ),
     request={"application/json": {"type": "object", "properties": {
@@ -360,6 +356,11 @@ class ComplianceRecordBulkUpdateView(APIView):
                 {"detail": "Both 'ids' and 'status' are required."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        if len(ids) > BULK_CHUNK_SIZE:
+            return Response(
+                {"detail": f"At most {BULK_CHUNK_SIZE} records; use records/bulk-jobs/ for larger selections."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         valid_statuses = [s[0] for s in ComplianceRecord.ComplianceStatus.choices]
         if new_status not in valid_statuses:
@@ -368,17 +369,86 @@ class ComplianceRecordBulkUpdateView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        qs = ComplianceRecord.objects.filter(
-            company=request.user.company,
-            id__in=ids,
-        )
-
-        update_fields = {"status": new_status}
+        params = {"status": new_status}
         if notes is not None:
-            update_fields["notes"] = notes
-        if new_status == ComplianceRecord.ComplianceStatus.COMPLIANT:
-            update_fields["completed_date"] = timezone.now().date()
+            params["notes"] = notes
+        try:
+            with transaction.atomic():
+                found, _ = apply_chunk(
+                    request.user.company_id, ComplianceBulkJob.Action.SET_STATUS, params, ids, request.user.pk,
+                )
+        except DjangoValidationError:
+            return Response({"detail": "'ids' must be record UUIDs."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"updated": len(found)})
+
+
+# ─── Bulk Jobs ────────────────────────────────────────────────────────────────
+
+@extend_schema_view(
+    get=extend_schema(
+        tags=["compliance"],
+        summary="List compliance bulk jobs",
+        description="Returns the company's bulk jobs, newest first.",
+    ),
+    post=extend_schema(
+        tags=["compliance"],
+        summary="Start a compliance bulk job",
+        description=(
+            "Queues an action over many compliance records and returns **202 Accepted** with the job. "
+            "Records are processed in chunks by a background task, with an audit entry per changed "
+            "record and a `compliance.records.bulk_updated` webhook per chunk.\n\n"
+            "**Actions**: `set_status` (`status`, optional `notes`), `attach_evidence` (`document_ids`), "
+            "`reassign` (`assigned_to`, null to unassign)\n\n"
+            "**Selection**: `ids`, or `filters` — `status` (list), `requirement`, `category`, "
+            "`authority_type`, `assigned_to`, `due_from`, `due_to`, `period_end_from`, `period_end_to`\n\n"
+            "Poll `records/bulk-jobs/{id}/` until `status` is `completed` or `failed`."
+        ),
+        request=ComplianceBulkJobCreateSerializer,
+        responses={
+            202: ComplianceBulkJobSerializer,
+            400: OpenApiResponse(description="Invalid action, parameters or selection"),
+        },
+    ),
+)
+class ComplianceBulkJobListView(generics.ListCreateAPIView):
+    serializer_class = ComplianceBulkJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return ComplianceBulkJob.objects.filter(company=self.request.user.company)
+
+    def create(self, request, *args, **kwargs):
+        serializer = ComplianceBulkJobCreateSerializer(data=request.data, context={"request": request})
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        company = request.user.company
+        if "filters" in data["selection"]:
+            count = selection_queryset(company.pk, data["selection"]).count()
+            if count > settings.COMPLIANCE_BULK_MAX_RECORDS:
+                raise ValidationError(
+                    f"The filters select {count} records; at most {settings.COMPLIANCE_BULK_MAX_RECORDS} per job."
+                )
+
+        with transaction.atomic():
+            job = ComplianceBulkJob.objects.create(company=company, requested_by=request.user, **data)
+            transaction.on_commit(lambda: run_compliance_bulk_job.delay(str(job.pk)))
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
 
-        updated = qs.update(**update_fields)
 
-        return Response({"updated": updated})
+@extend_schema(
+    tags=["compliance"],
+    summary="Get compliance bulk job progress",
+    description=(
+        "Returns the job's `status` (queued / running / completed / failed), `progress` (%), "
+        "`processed` and `changed` record counts, and `skipped` — selected ids that are not "
+        "records of this company."
+    ),
+)
+class ComplianceBulkJobDetailView(generics.RetrieveAPIView):
+    serializer_class = ComplianceBulkJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return ComplianceBulkJob.objects.filter(company=self.request.user.company)
@@ -19,7 +19,8 @@ class DocumentAdmin(admin.ModelAdmin):
     ordering = ("-created_at",)
     readonly_fields = (
         "id", "is_encrypted", "checksum", "file_size", "mime_type",
-        "file_name", "extracted_text", "ocr_processed", "created_at", "updated_at",
+        "file_name", "extracted_text", "ocr_processed", "ocr_pages_total", "ocr_pages_done",
+        "created_at", "updated_at",
     )
     date_hierarchy = "created_at"
 
@@ -34,7 +35,9 @@ class DocumentAdmin(admin.ModelAdmin):
             "fields": ("file", "file_name", "file_size", "mime_type", "is_encrypted", "checksum"),
         }),
         ("Dates", {"fields": ("issue_date", "expiry_date", "period_start", "period_end")}),
-        ("Content", {"fields": ("description", "tags", "extracted_text", "ocr_processed")}),
+        ("Content", {"fields": (
+            "description", "tags", "extracted_text", "ocr_processed", "ocr_pages_total", "ocr_pages_done",
+        )}),
         ("Metadata", {"fields": ("created_at", "updated_at"), "classes": ("collapse",)}),
     )
 
@@ -0,0 +1,141 @@
+"""
+Batch uploads — many files, or one ZIP of them, in a single request.
+
+Each file's metadata comes from a manifest keyed by file name (ZIP members by
+their path in the archive); files it does not mention are titled after their
+name and filed as "other". Files are validated and encrypted by
+ingest_upload in a bounded thread pool (hashing, compression and AES-GCM
+release the GIL), then stored together by store_documents: one transaction,
+one bulk_create, and one grouped OCR job.
+
+A file that fails validation, or a ZIP member that cannot be read (corrupt,
+encrypted, unsupported compression), is reported and skipped; it does not
+fail the rest of the batch. The batch as a whole is capped at
+BATCH_UPLOAD_MAX_FILES files and BATCH_UPLOAD_MAX_TOTAL_MB of (uncompressed)
+content, checked before anything is read.
+"""
+import logging
+import os
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connections
+from rest_framework.exceptions import ValidationError
+
+from core.utils.encryption import get_stream_key
+from core.utils.keyring import active_key_id
+
+from .models import Document
+from .serializers import DocumentMetadataSerializer
+from .vault import ingest_upload, store_documents
+
+logger = logging.getLogger("auditshield")
+
+# Raised while reading a ZIP member that is corrupt (bad CRC / data), password
+# protected (RuntimeError) or compressed with an unsupported method.
+ARCHIVE_MEMBER_ERRORS = (zipfile.BadZipFile, zlib.error, RuntimeError, NotImplementedError, EOFError)
+
+
+class BatchFile(NamedTuple):
+    name: str       # manifest key: upload file name, or path inside the ZIP
+    size: int       # bytes (uncompressed for ZIP members)
+    open: object    # () -> file with .size and .chunks(), opened in the worker
+
+
+def request_files(uploads) -> list[BatchFile]:
+    return [BatchFile(upload.name, upload.size, lambda upload=upload: upload) for upload in uploads]
+
+
+def zip_members(archive) -> list[BatchFile]:
+    """The files in an uploaded ZIP, skipping directories and OS metadata."""
+    try:
+        zf = zipfile.ZipFile(archive)
+    except zipfile.BadZipFile:
+        raise ValidationError({"archive": "Not a valid ZIP file."})
+
+    def opener(info):
+        member = File(zf.open(info), name=os.path.basename(info.filename))
+        member.size = info.file_size   # ZipExtFile never reads past it, so the declared size can be trusted
+        return member
+
+    return [
+        BatchFile(info.filename, info.file_size, lambda info=info: opener(info))
+        for info in zf.infolist()
+        if not info.is_dir()
+        and not info.filename.startswith("__MACOSX/")
+        and not os.path.basename(info.filename).startswith(".")
+    ]
+
+
+def check_batch_size(files: list[BatchFile]) -> None:
+    """Reject a batch with too many files or too much content before reading any of it."""
+    if len(files) > settings.BATCH_UPLOAD_MAX_FILES:
+        raise ValidationError(f"At most {settings.BATCH_UPLOAD_MAX_FILES} files per batch; got {len(files)}.")
+    total_mb = sum(f.size for f in files) / (1024 * 1024)
+    if total_mb > settings.BATCH_UPLOAD_MAX_TOTAL_MB:
+        raise ValidationError(
+            f"At most {settings.BATCH_UPLOAD_MAX_TOTAL_MB} MB per batch; these files hold {total_mb:.0f} MB."
+        )
+
+
+def _metadata(name: str, manifest: dict) -> dict:
+    base = os.path.basename(name)
+    entry = manifest.get(name, manifest.get(base, {}))
+    return {"title": os.path.splitext(base)[0][:200], "document_type": Document.DocumentType.OTHER, **entry}
+
+
+def _ingest(batch_file: BatchFile, company):
+    try:
+        return ingest_upload(batch_file.open(), company)
+    finally:
+        connections.close_all()
+
+
+def ingest_batch(files: list[BatchFile], manifest: dict, *, company, uploaded_by) -> list[dict]:
+    """Validate, encrypt and store a batch. Returns one result per file, in order."""
+    results = [{"file": f.name, "status": "failed", "document_id": None} for f in files]
+    accepted = []
+    for i, batch_file in enumerate(files):
+        metadata = DocumentMetadataSerializer(data=_metadata(batch_file.name, manifest))
+        if not metadata.is_valid():
+            results[i]["errors"] = metadata.errors
+            continue
+        employee = metadata.validated_data.get("employee")
+        if employee is not None and employee.company_id != company.pk:
+            results[i]["errors"] = {"employee": ["Employee not found."]}
+            continue
+        accepted.append((i, metadata))
+
+    # Resolve the data key here so workers never touch the database for it.
+    get_stream_key(active_key_id(company.pk))
+
+    encrypted = {}
+    with ThreadPoolExecutor(max_workers=settings.BATCH_UPLOAD_WORKERS) as pool:
+        futures = {i: pool.submit(_ingest, files[i], company) for i, _ in accepted}
+        for i, future in futures.items():
+            try:
+                encrypted[i] = future.result()
+            except ValidationError as exc:
+                results[i]["errors"] = exc.detail
+            except ARCHIVE_MEMBER_ERRORS as exc:
+                logger.warning("Batch upload for %s: unreadable archive member %s: %s", company.pk, files[i].name, exc)
+                reason = "is password protected" if isinstance(exc, RuntimeError) else "is corrupt or uses an unsupported compression method"
+                results[i]["errors"] = {"file": [f"The file in the archive {reason}."]}
+
+    stored = [(i, metadata) for i, metadata in accepted if i in encrypted]
+    docs = store_documents(
+        [(metadata, encrypted[i], os.path.basename(files[i].name)) for i, metadata in stored],
+        company=company,
+        uploaded_by=uploaded_by,
+    )
+    for (i, _), doc in zip(stored, docs):
+        results[i].update(status="created", document_id=str(doc.pk))
+
+    logger.info(
+        "Batch upload for %s: %d of %d files stored", company.pk, len(docs), len(files),
+    )
+    return results
@@ -0,0 +1,263 @@
+"""
+Field extraction rule engine — pulls structured fields out of OCR text.
+
+A rule pairs a label pattern ("Gross Salary") with a value pattern and a
+confidence. Rule sets are assembled from the base rules plus any rules for
+the company's country and the document type, and each set is compiled once
+per process into a single alternation regex, so extraction is one pass over
+the text however many rules apply. A value never runs on into the next
+field: when a known label followed by a colon ("Start Date:") turns up inside
+a matched value, the value is cut short there and scanning resumes at that
+label.
+
+For every field the highest-confidence match wins (the earliest on ties).
+Results carry the value, confidence and the value's character span:
+
+    result = extract_fields(text, country="KE", document_type="payslip")
+    result.as_dict()       # {"name": "Jane Roe", "salary": 5000.0, ...}
+    result.to_metadata()   # values + confidence + spans, tagged with RULESET_VERSION
+
+Bump RULESET_VERSION whenever rules change, so stored results can be told
+apart from fresh ones (see the reextract_documents command).
+"""
+import functools
+import re
+from collections.abc import Callable, Iterable
+from typing import Any, NamedTuple
+
+RULESET_VERSION = 2
+
+
+class Rule(NamedTuple):
+    field: str
+    value: str                      # regex for the value; must not contain capturing groups
+    label: str | None = None        # regex for the label that precedes the value
+    confidence: float = 0.9
+    convert: Callable[[str], Any] | None = None
+
+
+class FieldMatch(NamedTuple):
+    value: Any
+    confidence: float
+    start: int
+    end: int
+
+
+def _amount(raw: str) -> float:
+    return float(re.sub(r"[^\d.]", "", raw))
+
+
+def _clean(raw: str) -> str:
+    return " ".join(raw.split())
+
+
+_DATE = (
+    r"\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4}|\d{4}[\/\-\.]\d{1,2}[\/\-\.]\d{1,2}"
+    r"|(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|"
+    r"Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)"
+    r"\.?\s+\d{1,2},?\s+\d{4}"
+)
+_MONEY = r"(?:USD|GBP|EUR|KES|RWF|NGN|ZAR|[$£€])?\s*[\d,]+(?:\.\d{1,2})?"
+_DURATION = r"\d{1,2}\s+(?:days?|weeks?|months?|years?)"
+
+# ─── Rules ────────────────────────────────────────────────────────────────────
+
+BASE_RULES = [
+    Rule("name", r"[A-Z][a-zA-Z'\-]+(?:[ \t]+[A-Z][a-zA-Z'\-]+){1,4}",
+         label=r"Employee|Full\s+Name|Name|Candidate", convert=_clean),
+    Rule("start_date", _DATE,
+         label=r"Start\s+Date|Commencement\s+Date|Hire\s+Date|Date\s+of\s+Joining|Effective\s+Date"),
+    Rule("salary", _MONEY,
+         label=r"Gross\s+Salary|Annual\s+Salary|Monthly\s+Salary|Salary|Base\s+Pay|Gross\s+Pay",
+         convert=_amount),
+    # Any currency amount at all is a weak hint for the salary.
+    Rule("salary", r"[$£€]\s*[\d,]+(?:\.\d{1,2})?", confidence=0.4, convert=_amount),
+    Rule("contract_end", _DATE,
+         label=r"End\s+Date|Contract\s+Expiry|Contract\s+Expires?|Termination\s+Date|Expiry\s+Date"),
+]
+
+COUNTRY_RULES: dict[str, list[Rule]] = {
+    "RW": [
+        Rule("tax_id", r"\d{9}", label=r"TIN(?:\s+Number)?|Tax\s+Identification\s+Number"),
+        Rule("social_security_id", r"[A-Z0-9]{6,12}", label=r"RSSB(?:\s+(?:No\.?|Number))?"),
+    ],
+    "KE": [
+        Rule("tax_id", r"[AP]\d{9}[A-Z]", label=r"KRA\s+PIN|PIN(?:\s+No\.?)?"),
+        Rule("social_security_id", r"\d{6,12}", label=r"NSSF(?:\s+(?:No\.?|Number))?"),
+    ],
+    "NG": [
+        Rule("tax_id", r"\d{8}-\d{4}|\d{10}", label=r"TIN|Tax\s+Identification\s+Number"),
+    ],
+    "GB": [
+        Rule("social_security_id", r"[A-CEGHJ-PR-TW-Z]{2}\s?\d{2}\s?\d{2}\s?\d{2}\s?[A-D]",
+             label=r"National\s+Insurance(?:\s+(?:No\.?|Number))?|NI(?:NO|\s+Number)", convert=_clean),
+        Rule("tax_id", r"\d{3}\s?/\s?[A-Z0-9]{1,10}", label=r"(?:Employer\s+)?PAYE\s+Ref(?:erence)?"),
+    ],
+    "US": [
+        Rule("tax_id", r"\d{2}-\d{7}", label=r"EIN|Employer\s+Identification\s+Number"),
+    ],
+    "IN": [
+        Rule("tax_id", r"[A-Z]{5}\d{4}[A-Z]", label=r"PAN(?:\s+(?:No\.?|Number))?"),
+    ],
+}
+
+DOCUMENT_TYPE_RULES: dict[str, list[Rule]] = {
+    "employment_contract": [
+        Rule("job_title", r"[A-Z][A-Za-z/&\-]+(?:[ \t]+[A-Za-z/&\-]+){0,5}",
+             label=r"Job\s+Title|Position|Designation|Role", confidence=0.8, convert=_clean),
+        Rule("probation_period", _DURATION, label=r"Probation(?:ary)?\s+Period", convert=_clean),
+        Rule("notice_period", _DURATION, label=r"Notice\s+Period", convert=_clean),
+    ],
+    "payslip": [
+        Rule("net_pay", _MONEY, label=r"Net\s+Pay|Net\s+Salary|Take[\s\-]+Home(?:\s+Pay)?", convert=_amount),
+        Rule("pay_period", _DATE + r"|[A-Z][a-z]+\s+\d{4}", label=r"Pay\s+Period|Period|Month"),
+    ],
+    "tax_filing": [
+        Rule("tax_period", _DATE + r"|[A-Z][a-z]+\s+\d{4}|\d{4}", label=r"Tax\s+Period|Period|Year\s+of\s+Assessment"),
+    ],
+}
+DOCUMENT_TYPE_RULES["contract_amendment"] = list(DOCUMENT_TYPE_RULES["employment_contract"])
+DOCUMENT_TYPE_RULES["payroll_tax_return"] = list(DOCUMENT_TYPE_RULES["tax_filing"])
+DOCUMENT_TYPE_RULES["vat_return"] = list(DOCUMENT_TYPE_RULES["tax_filing"])
+
+
+# ─── Engine ───────────────────────────────────────────────────────────────────
+
+# What makes a label inside a value the start of the next field.
+_LABEL_END = re.compile(r"[ \t]*:")
+
+class ExtractionResult(NamedTuple):
+    fields: dict[str, FieldMatch]
+    field_names: tuple[str, ...]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Every field of the rule set mapped to its value, or None if not found."""
+        return {name: self.fields[name].value if name in self.fields else None for name in self.field_names}
+
+    def to_metadata(self) -> dict:
+        return {
+            "version": RULESET_VERSION,
+            "fields": {
+                name: {"value": m.value, "confidence": m.confidence, "span": [m.start, m.end]}
+                for name, m in self.fields.items()
+            },
+        }
+
+
+class RuleSet:
+    """A list of rules compiled into one regex."""
+
+    FLAGS = re.IGNORECASE | re.ASCII
+
+    def __init__(self, rules: Iterable[Rule]):
+        self.rules = list(rules)
+        self.field_names = tuple(dict.fromkeys(rule.field for rule in self.rules))
+        self.values = [re.compile(rule.value, self.FLAGS) for rule in self.rules]
+        labelled, unlabelled = [], []
+        for i, rule in enumerate(self.rules):
+            if self.values[i].groups:
+                raise ValueError(f"Rule for {rule.field!r} must use non-capturing groups only")
+            value = f"(?P<v{i}>{rule.value})"
+            if rule.label:
+                labelled.append(f"(?:{rule.label})[:\\s]+{value}")
+            else:
+                unlabelled.append(value)
+        # One shared word boundary in front of all labelled rules lets most
+        # positions fail on a single check; ASCII classes keep matching cheap.
+        alternatives = [f"\\b(?:{'|'.join(labelled)})"] if labelled else []
+        self.pattern = re.compile("|".join(alternatives + unlabelled), self.FLAGS)
+        labels = "|".join(dict.fromkeys(rule.label for rule in self.rules if rule.label))
+        self.labels = re.compile(f"\\b(?:{labels})\\b", self.FLAGS) if labels else None
+
+    def _value_span(self, index: int, text: str, m: re.Match) -> tuple[int, int, int]:
+        """
+        (start, end) of the value in match `m` and the position to resume
+        scanning from. A value that runs into another label ("John Smith
+        Start Date: ...") is re-matched up to that label, and scanning resumes
+        there so the label's own field is still found. start == end when
+        nothing of the value is left.
+        """
+        start, end = m.span(m.lastgroup)
+        labels = self.labels.finditer(text, start, end) if self.labels else ()
+        stop = next((label for label in labels if _LABEL_END.match(text, label.end())), None)
+        if stop is None:
+            return start, end, m.end()
+        cut = self.values[index].match(text, start, stop.start())
+        if cut is None:
+            return start, start, max(stop.start(), m.start() + 1)
+        return start, cut.end(), max(stop.start(), m.start() + 1)
+
+    def extract(self, text: str) -> ExtractionResult:
+        text = text or ""
+        found: dict[str, FieldMatch] = {}
+        pos = 0
+        while (m := self.pattern.search(text, pos)) is not None:
+            index = int(m.lastgroup[1:])
+            rule = self.rules[index]
+            value_start, value_end, pos = self._value_span(index, text, m)
+            current = found.get(rule.field)
+            if current is not None and current.confidence >= rule.confidence:
+                continue
+
+            group = text[value_start:value_end]
+            raw = group.strip()
+            if not raw:
+                continue
+            start = value_start + len(group) - len(group.lstrip())
+            confidence = rule.confidence
+            value: Any = raw
+            if rule.convert:
+                try:
+                    value = rule.convert(raw)
+                except ValueError:
+                    confidence /= 2
+            if current is None or confidence > current.confidence:
+                found[rule.field] = FieldMatch(value, confidence, start, start + len(raw))
+        return ExtractionResult(found, self.field_names)
+
+    def extract_many(self, texts: Iterable[str]) -> list[ExtractionResult]:
+        return [self.extract(text) for text in texts]
+
+
+@functools.cache
+def get_ruleset(country: str | None = None, document_type: str | None = None) -> RuleSet:
+    """Compiled rule set for a country (ISO alpha-2) and document type; built once per process."""
+    return RuleSet(
+        BASE_RULES
+        + COUNTRY_RULES.get((country or "").upper(), [])
+        + DOCUMENT_TYPE_RULES.get(document_type or "", [])
+    )
+
+
+def register_rules(rules: Iterable[Rule], *, country: str | None = None, document_type: str | None = None) -> None:
+    """Add rules for one country or one document type (or to the base set if neither is given)."""
+    if country and document_type:
+        raise ValueError("Register rules for a country or a document type, not both")
+    if country:
+        COUNTRY_RULES.setdefault(country.upper(), []).extend(rules)
+    elif document_type:
+        DOCUMENT_TYPE_RULES.setdefault(document_type, []).extend(rules)
+    else:
+        BASE_RULES.extend(rules)
+    get_ruleset.cache_clear()
+
+
+def extract_fields(text: str, country: str | None = None, document_type: str | None = None) -> ExtractionResult:
+    return get_ruleset(country, document_type).extract(text)
+
+
+def extract_document_fields(text: str, company, document_type: str | None) -> ExtractionResult:
+    """Extract with the rule set for a company's country and a document type."""
+    country = company.country.iso_code if company.country_id else None
+    return extract_fields(text, country, document_type)
+
+
+def extraction_metadata(result: ExtractionResult) -> dict:
+    """The Document.metadata keys that hold an extraction result."""
+    return {"ai_extracted": result.as_dict(), "ai_extraction": result.to_metadata()}
+
+
+def extract_fields_batch(texts: Iterable[str], country: str | None = None,
+                         document_type: str | None = None) -> list[ExtractionResult]:
+    """Extract from many texts sharing one country / document type."""
+    return get_ruleset(country, document_type).extract_many(texts)
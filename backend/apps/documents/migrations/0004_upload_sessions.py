@@ -0,0 +1,159 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:38
+
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("companies", "0003_company_industry_company_fiscal_year_start"),
+        ("documents", "0003_document_metadata"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UploadSession",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("file_name", models.CharField(max_length=255)),
+                (
+                    "total_size",
+                    models.PositiveBigIntegerField(
+                        help_text="Declared plaintext size in bytes"
+                    ),
+                ),
+                (
+                    "chunk_size",
+                    models.PositiveIntegerField(
+                        help_text="Bytes per uploaded chunk (last may be shorter)"
+                    ),
+                ),
+                (
+                    "expected_sha256",
+                    models.CharField(
+                        blank=True,
+                        help_text="Optional client-declared SHA-256 of the plaintext",
+                        max_length=64,
+                    ),
+                ),
+                (
+                    "document_fields",
+                    models.JSONField(
+                        default=dict,
+                        help_text="Validated Document metadata applied on finalize",
+                    ),
+                ),
+                ("header", models.BinaryField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("open", "Open"),
+                            ("completed", "Completed"),
+                            ("aborted", "Aborted"),
+                        ],
+                        default="open",
+                        max_length=20,
+                    ),
+                ),
+                ("expires_at", models.DateTimeField()),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="%(app_label)s_%(class)s_set",
+                        to="companies.company",
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="upload_sessions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "document",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="documents.document",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "document_upload_sessions",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="UploadChunk",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("index", models.PositiveIntegerField()),
+                (
+                    "size",
+                    models.PositiveIntegerField(
+                        help_text="Plaintext bytes in this chunk"
+                    ),
+                ),
+                (
+                    "sha256",
+                    models.CharField(
+                        help_text="SHA-256 of the chunk plaintext", max_length=64
+                    ),
+                ),
+                ("file", models.FileField(max_length=255, upload_to="")),
+                ("received_at", models.DateTimeField(auto_now=True)),
+                (
+                    "session",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chunks",
+                        to="documents.uploadsession",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "document_upload_chunks",
+                "ordering": ["index"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="uploadsession",
+            index=models.Index(
+                fields=["status", "expires_at"], name="document_up_status_87f40b_idx"
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="uploadchunk",
+            unique_together={("session", "index")},
+        ),
+    ]
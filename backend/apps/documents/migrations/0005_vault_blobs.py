@@ -0,0 +1,86 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:39
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import apps.documents.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("companies", "0003_company_industry_company_fiscal_year_start"),
+        ("documents", "0004_upload_sessions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VaultBlob",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "sha256",
+                    models.CharField(
+                        help_text="SHA-256 of the plaintext", max_length=64
+                    ),
+                ),
+                (
+                    "file",
+                    models.FileField(
+                        max_length=255, upload_to=apps.documents.models.blob_upload_path
+                    ),
+                ),
+                (
+                    "checksum",
+                    models.CharField(
+                        help_text="SHA-256 of the encrypted file", max_length=64
+                    ),
+                ),
+                (
+                    "size",
+                    models.PositiveBigIntegerField(help_text="Plaintext size in bytes"),
+                ),
+                ("mime_type", models.CharField(max_length=100)),
+                ("ref_count", models.PositiveIntegerField(default=0)),
+                ("extracted_text", models.TextField(blank=True)),
+                ("ai_extracted", models.JSONField(blank=True, default=dict)),
+                ("ocr_processed", models.BooleanField(default=False)),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="%(app_label)s_%(class)s_set",
+                        to="companies.company",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "document_blobs",
+                "unique_together": {("company", "sha256")},
+            },
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="blob",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Shared encrypted content; `file` points at the blob's stored file",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="documents",
+                to="documents.vaultblob",
+            ),
+        ),
+    ]
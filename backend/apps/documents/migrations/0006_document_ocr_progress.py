@@ -0,0 +1,23 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0005_vault_blobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="ocr_pages_done",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="document",
+            name="ocr_pages_total",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0006_document_ocr_progress"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OCRPageCache",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "sha256",
+                    models.CharField(
+                        db_index=True,
+                        help_text="SHA-256 of the document plaintext",
+                        max_length=64,
+                    ),
+                ),
+                ("page_index", models.PositiveIntegerField()),
+                ("dpi", models.PositiveIntegerField()),
+                (
+                    "engine",
+                    models.CharField(
+                        help_text="OCR engine, version and language", max_length=100
+                    ),
+                ),
+                ("text", models.TextField(blank=True)),
+                (
+                    "size",
+                    models.PositiveIntegerField(
+                        help_text="Size of the cached text in bytes"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("last_used_at", models.DateTimeField(db_index=True)),
+            ],
+            options={
+                "db_table": "document_ocr_cache",
+                "unique_together": {("sha256", "page_index", "dpi", "engine")},
+            },
+        ),
+    ]
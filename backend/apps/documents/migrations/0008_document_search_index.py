@@ -0,0 +1,81 @@
+"""
+Full-text search side table (see apps/documents/search.py).
+
+PostgreSQL gets a tsvector table with a GIN index; SQLite gets an FTS5 virtual
+table plus a key table mapping its integer rowids to document UUIDs. Existing
+documents are indexed in the same step.
+"""
+from django.db import migrations
+
+PG_FORWARD = [
+    """
+    CREATE TABLE document_search (
+        document_id uuid PRIMARY KEY REFERENCES documents (id) ON DELETE CASCADE,
+        company_id uuid NOT NULL,
+        body tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX document_search_body_gin ON document_search USING gin (body)",
+    "CREATE INDEX document_search_company_idx ON document_search (company_id)",
+    """
+    INSERT INTO document_search (document_id, company_id, body)
+    SELECT id, company_id,
+           setweight(to_tsvector('english', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(reference_number, '') || ' ' || coalesce(file_name, '')), 'B')
+        || setweight(to_tsvector('english', left(coalesce(extracted_text, ''), 500000)), 'D')
+    FROM documents
+    """,
+]
+
+PG_REVERSE = ["DROP TABLE IF EXISTS document_search"]
+
+SQLITE_FORWARD = [
+    """
+    CREATE TABLE document_search_keys (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        document_id char(32) NOT NULL UNIQUE,
+        company_id char(32) NOT NULL
+    )
+    """,
+    "CREATE INDEX document_search_keys_company_idx ON document_search_keys (company_id)",
+    """
+    CREATE VIRTUAL TABLE document_search USING fts5(
+        title, reference, body,
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    )
+    """,
+    "INSERT INTO document_search_keys (document_id, company_id) SELECT id, company_id FROM documents",
+    """
+    INSERT INTO document_search (rowid, title, reference, body)
+    SELECT k.id, coalesce(d.title, ''),
+           coalesce(d.reference_number, '') || ' ' || coalesce(d.file_name, ''),
+           substr(coalesce(d.extracted_text, ''), 1, 500000)
+    FROM documents d JOIN document_search_keys k ON k.document_id = d.id
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TABLE IF EXISTS document_search",
+    "DROP TABLE IF EXISTS document_search_keys",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0007_ocr_page_cache"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({"postgresql": PG_FORWARD, "sqlite": SQLITE_FORWARD}),
+            _run({"postgresql": PG_REVERSE, "sqlite": SQLITE_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:55
+
+from django.db import migrations, models
+
+import apps.documents.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0008_document_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="vaultblob",
+            name="page_strip",
+            field=models.FileField(
+                blank=True,
+                max_length=255,
+                upload_to=apps.documents.models.preview_upload_path,
+            ),
+        ),
+        migrations.AddField(
+            model_name="vaultblob",
+            name="preview_rendered_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="vaultblob",
+            name="thumbnail",
+            field=models.FileField(
+                blank=True,
+                max_length=255,
+                upload_to=apps.documents.models.preview_upload_path,
+            ),
+        ),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("companies", "0003_company_industry_company_fiscal_year_start"),
+        ("documents", "0009_blob_previews"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentSignature",
+            fields=[
+                (
+                    "document",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="signature",
+                        serialize=False,
+                        to="documents.document",
+                    ),
+                ),
+                (
+                    "minhash",
+                    models.BinaryField(
+                        help_text="NUM_PERM little-endian uint32 minimums"
+                    ),
+                ),
+                (
+                    "shingles",
+                    models.PositiveIntegerField(
+                        help_text="Distinct word shingles in the text"
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "cluster",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Earliest document of this one's near-duplicate cluster, if any",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="documents.document",
+                    ),
+                ),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="companies.company",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "document_signatures",
+            },
+        ),
+        migrations.CreateModel(
+            name="DocumentLSHBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.BigIntegerField(
+                        help_text="Hash of the band index and its signature rows"
+                    ),
+                ),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="companies.company",
+                    ),
+                ),
+                (
+                    "document",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lsh_buckets",
+                        to="documents.document",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "document_lsh_buckets",
+                "indexes": [
+                    models.Index(
+                        fields=["company", "key"], name="document_lsh_lookup_idx"
+                    )
+                ],
+            },
+        ),
+    ]
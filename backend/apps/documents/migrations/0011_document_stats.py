@@ -0,0 +1,44 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("companies", "0003_company_industry_company_fiscal_year_start"),
+        ("documents", "0010_document_similarity"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentStats",
+            fields=[
+                (
+                    "company",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="document_stats",
+                        serialize=False,
+                        to="companies.company",
+                    ),
+                ),
+                ("total", models.IntegerField(default=0)),
+                ("expired", models.IntegerField(default=0)),
+                (
+                    "expiring_soon",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Active, expiring within EXPIRING_SOON_DAYS",
+                    ),
+                ),
+                ("as_of", models.DateField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "document_stats",
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0011_document_stats"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="document",
+            name="blob",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Shared encrypted content; `file` points at the blob's stored file",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="documents",
+                to="documents.vaultblob",
+            ),
+        ),
+    ]
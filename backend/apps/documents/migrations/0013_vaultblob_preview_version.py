@@ -0,0 +1,28 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:54
+
+from django.db import migrations, models
+
+
+def mark_existing_previews(apps, schema_editor):
+    # Previews rendered before the field existed all came from PREVIEW_VERSION 1.
+    VaultBlob = apps.get_model("documents", "VaultBlob")
+    VaultBlob.objects.filter(preview_rendered_at__isnull=False).update(preview_version=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0012_document_blob_cascade"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="vaultblob",
+            name="preview_version",
+            field=models.PositiveSmallIntegerField(
+                default=0,
+                help_text="PREVIEW_VERSION that rendered the previews (0 = not rendered)",
+            ),
+        ),
+        migrations.RunPython(mark_existing_previews, migrations.RunPython.noop),
+    ]
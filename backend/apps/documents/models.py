@@ -58,6 +58,10 @@ class Document(TenantModel):
     mime_type = models.CharField(max_length=100)
     is_encrypted = models.BooleanField(default=True)
     checksum = models.CharField(max_length=64, blank=True, help_text="SHA-256 of encrypted file")
+    blob = models.ForeignKey(
+        "VaultBlob", on_delete=models.CASCADE, null=True, blank=True, related_name="documents",
+        help_text="Shared encrypted content; `file` points at the blob's stored file",
+    )
 
     # Metadata
     description = models.TextField(blank=True)
@@ -70,6 +74,8 @@ class Document(TenantModel):
     # OCR extracted content
     extracted_text = models.TextField(blank=True)
     ocr_processed = models.BooleanField(default=False)
+    ocr_pages_total = models.PositiveIntegerField(default=0)
+    ocr_pages_done = models.PositiveIntegerField(default=0)
 
     # AI / structured extraction results (populated after OCR)
     metadata = models.JSONField(
@@ -107,3 +113,198 @@ class Document(TenantModel):
             delta = self.expiry_date - timezone.now().date()
             return delta.days
         return None
+
+
+def blob_upload_path(instance, filename):
+    return f"blobs/{instance.company_id}/{instance.sha256[:2]}/{instance.sha256}"
+
+
+def preview_upload_path(instance, filename):
+    return f"previews/{instance.company_id}/{instance.sha256[:2]}/{instance.sha256}.{filename}"
+
+
+class VaultBlob(TenantModel):
+    """
+    Content-addressed encrypted file, shared by every Document in a company
+    whose plaintext has the same SHA-256. Holds the OCR / extraction results
+    so duplicates never re-run them. Deleted when the last reference goes.
+    """
+    sha256 = models.CharField(max_length=64, help_text="SHA-256 of the plaintext")
+    file = models.FileField(upload_to=blob_upload_path, max_length=255)
+    checksum = models.CharField(max_length=64, help_text="SHA-256 of the encrypted file")
+    size = models.PositiveBigIntegerField(help_text="Plaintext size in bytes")
+    mime_type = models.CharField(max_length=100)
+    ref_count = models.PositiveIntegerField(default=0)
+
+    # Shared OCR / extraction results
+    extracted_text = models.TextField(blank=True)
+    ai_extracted = models.JSONField(default=dict, blank=True)
+    ocr_processed = models.BooleanField(default=False)
+
+    # Encrypted JPEG previews (see preview.py); rendered_at is set even for types without one
+    thumbnail = models.FileField(upload_to=preview_upload_path, max_length=255, blank=True)
+    page_strip = models.FileField(upload_to=preview_upload_path, max_length=255, blank=True)
+    preview_rendered_at = models.DateTimeField(null=True, blank=True)
+    preview_version = models.PositiveSmallIntegerField(
+        default=0, help_text="PREVIEW_VERSION that rendered the previews (0 = not rendered)",
+    )
+
+    class Meta:
+        db_table = "document_blobs"
+        unique_together = ["company", "sha256"]
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
+
+class OCRPageCache(models.Model):
+    """
+    OCR text of one rendered page, keyed by the plaintext hash and everything
+    that affects the result (page, DPI, engine/language version). Lets retries,
+    re-uploads and reprocessing skip Tesseract. Pruned least-recently-used
+    first once the total size passes OCR_CACHE_MAX_MB.
+    """
+    sha256 = models.CharField(max_length=64, db_index=True, help_text="SHA-256 of the document plaintext")
+    page_index = models.PositiveIntegerField()
+    dpi = models.PositiveIntegerField()
+    engine = models.CharField(max_length=100, help_text="OCR engine, version and language")
+    text = models.TextField(blank=True)
+    size = models.PositiveIntegerField(help_text="Size of the cached text in bytes")
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = "document_ocr_cache"
+        unique_together = ["sha256", "page_index", "dpi", "engine"]
+
+    def __str__(self):
+        return f"{self.sha256[:12]} p{self.page_index} @{self.dpi}dpi"
+
+
+class DocumentSignature(models.Model):
+    """
+    MinHash signature of a document's OCR text (see similarity.py), plus the
+    duplicate cluster the nightly job last put it in.
+    """
+    document = models.OneToOneField(Document, on_delete=models.CASCADE, primary_key=True, related_name="signature")
+    company = models.ForeignKey("companies.Company", on_delete=models.CASCADE, related_name="+")
+    minhash = models.BinaryField(help_text="NUM_PERM little-endian uint32 minimums")
+    shingles = models.PositiveIntegerField(help_text="Distinct word shingles in the text")
+    cluster = models.ForeignKey(
+        Document, on_delete=models.SET_NULL, null=True, blank=True, related_name="+",
+        help_text="Earliest document of this one's near-duplicate cluster, if any",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "document_signatures"
+
+    def __str__(self):
+        return f"Signature of {self.document_id}"
+
+
+class DocumentLSHBucket(models.Model):
+    """One LSH band hash of a document signature; documents sharing a key are candidates."""
+    company = models.ForeignKey("companies.Company", on_delete=models.CASCADE, related_name="+")
+    key = models.BigIntegerField(help_text="Hash of the band index and its signature rows")
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name="lsh_buckets")
+
+    class Meta:
+        db_table = "document_lsh_buckets"
+        indexes = [models.Index(fields=["company", "key"], name="document_lsh_lookup_idx")]
+
+
+class DocumentStats(models.Model):
+    """
+    Per-company document counters shown with the vault list (see stats.py).
+
+    Kept current by Document signals; `expiring_soon` depends on the date,
+    so the daily expiry scan recomputes every row and `as_of` records the
+    day the counts are for.
+    """
+    company = models.OneToOneField(
+        "companies.Company", on_delete=models.CASCADE, primary_key=True, related_name="document_stats",
+    )
+    total = models.IntegerField(default=0)
+    expired = models.IntegerField(default=0)
+    expiring_soon = models.IntegerField(default=0, help_text="Active, expiring within EXPIRING_SOON_DAYS")
+    as_of = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "document_stats"
+
+    def __str__(self):
+        return f"{self.company_id}: {self.total} documents ({self.as_of})"
+
+
+def upload_chunk_path(session, index):
+    return f"upload_sessions/{session.company_id}/{session.id}/{index:06d}.part"
+
+
+class UploadSession(TenantModel):
+    """
+    A resumable upload: the client declares the file up front, PUTs numbered
+    chunks (each encrypted as it arrives), then finalizes into a Document.
+    """
+    class Status(models.TextChoices):
+        OPEN = "open", "Open"
+        COMPLETED = "completed", "Completed"
+        ABORTED = "aborted", "Aborted"
+
+    created_by = models.ForeignKey(
+        "accounts.User", on_delete=models.SET_NULL, null=True, related_name="upload_sessions",
+    )
+    document = models.ForeignKey(
+        Document, on_delete=models.SET_NULL, null=True, blank=True, related_name="+",
+    )
+    file_name = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField(help_text="Declared plaintext size in bytes")
+    chunk_size = models.PositiveIntegerField(help_text="Bytes per uploaded chunk (last may be shorter)")
+    expected_sha256 = models.CharField(
+        max_length=64, blank=True, help_text="Optional client-declared SHA-256 of the plaintext",
+    )
+    document_fields = models.JSONField(
+        default=dict, help_text="Validated Document metadata applied on finalize",
+    )
+    # Vault container header shared by every chunk, so chunks encrypted
+    # independently concatenate into one container on finalize.
+    header = models.BinaryField()
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.OPEN)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "document_upload_sessions"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "expires_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
+
+    @property
+    def chunk_count(self):
+        return -(-self.total_size // self.chunk_size)
+
+    def chunk_length(self, index):
+        """Exact plaintext length expected for chunk `index`."""
+        return min(self.chunk_size, self.total_size - index * self.chunk_size)
+
+
+class UploadChunk(models.Model):
+    """One received, already-encrypted chunk of an UploadSession."""
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name="chunks")
+    index = models.PositiveIntegerField()
+    size = models.PositiveIntegerField(help_text="Plaintext bytes in this chunk")
+    sha256 = models.CharField(max_length=64, help_text="SHA-256 of the chunk plaintext")
+    file = models.FileField(max_length=255)
+    received_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "document_upload_chunks"
+        ordering = ["index"]
+        unique_together = ["session", "index"]
+
+    def __str__(self):
+        return f"{self.session_id} #{self.index}"
@@ -0,0 +1,343 @@
+"""
+OCR engine — splits a document into page jobs and runs Tesseract on them in parallel.
+
+pytesseract shells out to the `tesseract` binary for every call, so a thread
+pool gives true process-level parallelism: each worker thread just waits on
+its own tesseract process. (A multiprocessing pool is not an option here —
+Celery's prefork workers are daemonic and may not spawn children.)
+
+PDFs are handled page by page: a page with a usable text layer is taken as
+is, and only image-only pages are rasterized and OCR'd, each at a DPI
+matched to the resolution of the scan embedded in it (rendering a 100 dpi
+scan at 300 dpi costs four times the pixels and recovers nothing).
+
+Every page image (rendered PDF page, or image / TIFF frame) is preprocessed
+before OCR — downscaled, deskewed, binarized and cropped (see preprocess.py)
+— in the pool thread that OCRs it.
+
+Pages are rendered in the calling thread (PyMuPDF documents are not
+thread-safe) and only a bounded number of rendered pages are in flight at
+once, so memory stays flat for long scans. Results are reassembled in page
+order whatever order they finish in.
+
+OCR'd page text is cached in the database keyed by the plaintext hash, page,
+DPI and engine version, so retries and reprocessing skip Tesseract entirely.
+"""
+import hashlib
+import io
+import logging
+import tempfile
+from collections.abc import Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import cached_property
+
+from django.conf import settings
+from django.utils import timezone
+
+from .preprocess import prepare_page, source_dpi, target_scale
+
+logger = logging.getLogger("auditshield")
+
+# A page whose text layer is shorter than this is treated as scanned.
+MIN_PAGE_TEXT_CHARS = 20
+
+# Upper bound on the longest side of a rendered page, whatever the DPI.
+MAX_RENDER_PIXELS = 5000
+
+# Bump whenever rendering or preprocessing changes, to invalidate cached OCR text.
+ENGINE_REVISION = 2
+
+# Tesseract errors that no page will escape (language data, installation).
+SYSTEM_TESSERACT_ERRORS = ("failed loading language", "error opening data file", "could not initialize tesseract")
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def is_page_error(exc: Exception) -> bool:
+    """
+    True for failures confined to one page image (undecodable or oversized
+    image, tesseract rejecting it). Anything else — missing binary or
+    language data, out of memory, I/O — would fail every page alike.
+    """
+    import pytesseract
+    from PIL import Image, UnidentifiedImageError
+
+    if isinstance(exc, pytesseract.TesseractError):
+        message = str(getattr(exc, "message", exc)).lower()
+        return not any(error in message for error in SYSTEM_TESSERACT_ERRORS)
+    return isinstance(exc, UnidentifiedImageError | Image.DecompressionBombError | ValueError)
+
+
+def _ocr_page(image, dpi: float | None, target_dpi: int | None) -> str:
+    """
+    Run Tesseract on one page image (executes in a pool thread), preprocessing
+    it for `target_dpi` first unless that is None.
+    """
+    import pytesseract
+
+    if target_dpi:
+        image, dpi = prepare_page(image, dpi, target_dpi, MAX_RENDER_PIXELS)
+    # pytesseract writes its input to a temp file anyway; saving it ourselves
+    # keeps the DPI, which tesseract uses to judge text size.
+    with tempfile.NamedTemporaryFile(prefix="ocr_", suffix=".png") as fh:
+        image.save(fh, format="PNG", **({"dpi": (dpi, dpi)} if dpi else {}))
+        fh.flush()
+        return pytesseract.image_to_string(fh.name, lang=settings.OCR_LANG)
+
+
+def engine_version(preprocess: bool = True) -> str:
+    """Identifies everything besides the input that affects OCR output (cache key part)."""
+    import pytesseract
+
+    version = f"tesseract-{pytesseract.get_tesseract_version()}:{settings.OCR_LANG}:r{ENGINE_REVISION}"
+    return version if preprocess else f"{version}:raw"
+
+
+# ─── Page cache ───────────────────────────────────────────────────────────────
+
+class PageCache:
+    """
+    OCR text cache for the pages of one document, backed by OCRPageCache.
+    The engine version is looked up on first use, so documents that need no
+    OCR (PDFs with text layers) never run `tesseract --version`.
+    """
+
+    def __init__(self, sha256: str, preprocess: bool):
+        self.sha256 = sha256
+        self.preprocess = preprocess
+
+    @cached_property
+    def engine(self) -> str:
+        return engine_version(self.preprocess)
+
+    def get_many(self, pages: list[tuple[int, int]]) -> dict[int, str]:
+        """Return {index: text} for the cached (index, dpi) pages, marking them used."""
+        from .models import OCRPageCache
+
+        if not pages:
+            return {}
+        wanted = set(pages)
+        rows = OCRPageCache.objects.filter(
+            sha256=self.sha256,
+            engine=self.engine,
+            page_index__in=[index for index, _ in pages],
+        ).values_list("pk", "page_index", "dpi", "text")
+        hits = {}
+        pks = []
+        for pk, index, dpi, text in rows:
+            if (index, dpi) in wanted:
+                hits[index] = text
+                pks.append(pk)
+        if pks:
+            OCRPageCache.objects.filter(pk__in=pks).update(last_used_at=timezone.now())
+        return hits
+
+    def put_many(self, entries: list[tuple[int, int, str]]) -> None:
+        """Store (index, dpi, text) results; concurrent writers of the same page are ignored."""
+        from .models import OCRPageCache
+
+        now = timezone.now()
+        OCRPageCache.objects.bulk_create(
+            [
+                OCRPageCache(
+                    sha256=self.sha256,
+                    page_index=index,
+                    dpi=dpi,
+                    engine=self.engine,
+                    text=text,
+                    size=len(text.encode()),
+                    last_used_at=now,
+                )
+                for index, dpi, text in entries
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def prune_page_cache(max_bytes: int) -> int:
+    """Evict least-recently-used cache rows until the cache fits in `max_bytes`. Returns rows deleted."""
+    from django.db.models import Sum
+
+    from .models import OCRPageCache
+
+    excess = (OCRPageCache.objects.aggregate(total=Sum("size"))["total"] or 0) - max_bytes
+    if excess <= 0:
+        return 0
+
+    doomed = []
+    for pk, size in OCRPageCache.objects.order_by("last_used_at").values_list("pk", "size").iterator():
+        doomed.append(pk)
+        excess -= size
+        if excess <= 0:
+            break
+    deleted = 0
+    for i in range(0, len(doomed), 500):
+        deleted += OCRPageCache.objects.filter(pk__in=doomed[i:i + 500]).delete()[0]
+    return deleted
+
+
+class OCREngine:
+    """
+    Extracts text from PDFs and images.
+
+    `on_progress(done, total)` is called from the calling thread after every
+    finished page, so it may safely touch the database. The page cache is
+    used unless `use_cache` is False or OCR_CACHE_MAX_MB is 0, and page
+    images are preprocessed unless `preprocess` (default OCR_PREPROCESS) is False.
+    """
+
+    def __init__(self, max_workers: int | None = None, dpi: int | None = None,
+                 on_progress: ProgressCallback | None = None, use_cache: bool = True,
+                 preprocess: bool | None = None):
+        self.max_workers = max(1, max_workers or settings.OCR_MAX_WORKERS)
+        self.dpi = dpi or settings.OCR_DPI
+        self.on_progress = on_progress or (lambda done, total: None)
+        self.use_cache = use_cache and settings.OCR_CACHE_MAX_MB > 0
+        self.preprocess = settings.OCR_PREPROCESS if preprocess is None else preprocess
+        self.cache: PageCache | None = None
+
+    def extract(self, data: bytes, mime: str, sha256: str | None = None) -> str:
+        """OCR `data`; pass the plaintext `sha256` if already known to save re-hashing it."""
+        if self.use_cache:
+            self.cache = PageCache(sha256 or hashlib.sha256(data).hexdigest(), self.preprocess)
+        if "pdf" in mime:
+            return self.extract_pdf(data)
+        if "image" in mime:
+            return self.extract_image(data)
+        return ""
+
+    def extract_image(self, data: bytes) -> str:
+        """OCR an image frame by frame (multi-page TIFFs); frames are cached as pages at DPI 0."""
+        from PIL import Image
+
+        with Image.open(io.BytesIO(data)) as img:
+            total = getattr(img, "n_frames", 1)
+            frames = [(index, 0) for index in range(total)]
+            cached = self.cache.get_many(frames) if self.cache else {}
+            todo = [(index, dpi) for index, dpi in frames if index not in cached]
+            results = self.run_jobs(self._image_frames(img, todo), total, skipped=len(cached)) if todo else {}
+
+        fresh = [(index, dpi, results[index]) for index, dpi in todo if results.get(index, "").strip()]
+        if self.cache and fresh:
+            self.cache.put_many(fresh)
+        if not todo:
+            self.on_progress(total, total)
+        pages = {**cached, **results}
+        return "\n".join(pages.get(i, "") for i in range(total))
+
+    def _image_frames(self, img, frames: list[tuple[int, int]]) -> Iterator[tuple[int, tuple]]:
+        # Frames share one decoder, so they are read here, in order, in the calling thread.
+        for index, _ in frames:
+            img.seek(index)
+            dpi = source_dpi(img)
+            if self.preprocess and img.format == "JPEG":
+                # Let the JPEG decoder downscale: a fraction of the work of decoding full size.
+                width = img.width
+                scale = target_scale(img.size, dpi, self.dpi, MAX_RENDER_PIXELS)
+                img.draft("L", (round(img.width * scale), round(img.height * scale)))
+                dpi = dpi and dpi * img.width / width
+            yield index, (img.copy(), dpi)
+
+    def extract_pdf(self, data: bytes) -> str:
+        import fitz  # PyMuPDF
+
+        with fitz.open(stream=data, filetype="pdf") as pdf:
+            total = pdf.page_count
+            pages: dict[int, str] = {}
+            scanned: list[tuple[int, int]] = []
+            for page in pdf:
+                pages[page.number] = page.get_text()
+                if len(pages[page.number].strip()) < MIN_PAGE_TEXT_CHARS:
+                    dpi = self.page_dpi(page)
+                    if dpi:
+                        scanned.append((page.number, dpi))
+
+            cached = self.cache.get_many(scanned) if self.cache else {}
+            pages.update(cached)
+            todo = [(index, dpi) for index, dpi in scanned if index not in cached]
+
+            if todo:
+                # The text layer stays as the per-page fallback if OCR comes back empty.
+                results = self.run_jobs(self._render_pages(pdf, todo), total, skipped=total - len(todo))
+                fresh = [(index, dpi, results[index]) for index, dpi in todo if results.get(index, "").strip()]
+                pages.update((index, text) for index, _, text in fresh)
+                if self.cache and fresh:
+                    self.cache.put_many(fresh)
+            else:
+                self.on_progress(total, total)
+            logger.debug(
+                "PDF text: %d pages from text layer, %d from OCR cache, %d OCR'd",
+                total - len(scanned), len(cached), len(todo),
+            )
+            return "\n".join(pages[i] for i in range(total))
+
+    def page_dpi(self, page) -> int | None:
+        """
+        Render resolution for an image-only page, or None if it has no images.
+
+        Uses the effective resolution of the sharpest image on the page, capped
+        at the configured OCR DPI and at MAX_RENDER_PIXELS on the longest side.
+        """
+        source = 0.0
+        for info in page.get_image_info():
+            x0, y0, x1, y1 = info["bbox"]
+            if x1 - x0 <= 0 or y1 - y0 <= 0:
+                continue
+            source = max(source, 72 * info["width"] / (x1 - x0), 72 * info["height"] / (y1 - y0))
+        if not source:
+            return None
+
+        longest_inches = max(page.rect.width, page.rect.height) / 72
+        dpi = min(source, self.dpi, MAX_RENDER_PIXELS / longest_inches)
+        return max(int(dpi), settings.OCR_MIN_DPI)
+
+    def _render_pages(self, pdf, pages: list[tuple[int, int]]) -> Iterator[tuple[int, tuple]]:
+        import fitz  # PyMuPDF
+        from PIL import Image
+
+        for index, dpi in pages:
+            pix = pdf[index].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+            yield index, (Image.frombytes("L", (pix.width, pix.height), pix.samples), dpi)
+
+    def run_jobs(self, jobs: Iterator[tuple[int, tuple]], total: int, skipped: int = 0) -> dict[int, str]:
+        """
+        OCR (index, (image, dpi)) jobs on the pool and return {index: text}.
+
+        At most 2 × max_workers page images are held at once. A page whose
+        OCR fails with a page error (is_page_error) is logged and recorded as
+        "", so callers can fall back per page. Any other error — or every page
+        failing — is raised, so the caller's task retries instead of storing
+        empty text. `skipped` counts pages of `total` that needed no OCR, for
+        progress reporting.
+        """
+        results: dict[int, str] = {}
+        failures: list[Exception] = []
+        self.on_progress(skipped, total)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ocr") as pool:
+            pending = {}
+
+            def drain() -> None:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    try:
+                        results[index] = future.result()
+                    except Exception as exc:
+                        if not is_page_error(exc):
+                            for other in pending:
+                                other.cancel()
+                            raise
+                        logger.warning("OCR failed for page %d: %s", index, exc)
+                        failures.append(exc)
+                        results[index] = ""
+                    self.on_progress(skipped + len(results), total)
+
+            for index, (image, dpi) in jobs:
+                while len(pending) >= self.max_workers * 2:
+                    drain()
+                pending[pool.submit(_ocr_page, image, dpi, self.dpi if self.preprocess else None)] = index
+            while pending:
+                drain()
+        if failures and len(failures) == len(results):
+            raise failures[-1]
+        return results
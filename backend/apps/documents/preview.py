@@ -0,0 +1,102 @@
+"""
+Document previews — a first-page thumbnail and a low-resolution page strip.
+
+Rendered once per vault blob and PREVIEW_VERSION by the render_blob_preview
+task (PyMuPDF for PDFs, Pillow for images), encrypted like any other vault file and served by
+the documents `preview` endpoint, so listing screens never need to download
+and decrypt the full document.
+"""
+import io
+from typing import NamedTuple
+
+# Thumbnail width and strip page height in pixels, and pages shown in the strip.
+THUMBNAIL_WIDTH = 320
+STRIP_HEIGHT = 160
+STRIP_PAGES = 8
+JPEG_QUALITY = 70
+
+# Bump when rendering changes. Each blob records the version that rendered it
+# (part of its preview URLs' `v=` value and of the ETag), and older renders
+# are redone the next time their preview is requested.
+PREVIEW_VERSION = 1
+
+
+class Preview(NamedTuple):
+    thumbnail: bytes            # JPEG
+    strip: bytes | None         # JPEG, first pages side by side (multi-page files only)
+
+
+def _jpeg(image) -> bytes:
+    buf = io.BytesIO()
+    image.convert("RGB").save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buf.getvalue()
+
+
+def _fit_width(image, width: int):
+    if image.width <= width:
+        return image
+    return image.resize((width, max(1, round(image.height * width / image.width))))
+
+
+def _fit_height(image, height: int):
+    if image.height <= height:
+        return image
+    return image.resize((max(1, round(image.width * height / image.height)), height))
+
+
+def _strip(pages) -> bytes:
+    from PIL import Image
+
+    strip = Image.new("RGB", (sum(page.width for page in pages), max(page.height for page in pages)), "white")
+    x = 0
+    for page in pages:
+        strip.paste(page, (x, 0))
+        x += page.width
+    return _jpeg(strip)
+
+
+def render_pdf_preview(data: bytes) -> Preview | None:
+    import fitz  # PyMuPDF
+    from PIL import Image
+
+    with fitz.open(stream=data, filetype="pdf") as pdf:
+        if not pdf.page_count:
+            return None
+        pages = []
+        for page in pdf.pages(0, min(STRIP_PAGES, pdf.page_count)):
+            # Render straight at the target size rather than full resolution.
+            target = THUMBNAIL_WIDTH if page.number == 0 else STRIP_HEIGHT
+            scale = target / (page.rect.width if page.number == 0 else page.rect.height)
+            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+            pages.append(Image.frombytes("RGB", (pix.width, pix.height), pix.samples))
+
+    thumbnail = _jpeg(pages[0])
+    strip = [_fit_height(pages[0], STRIP_HEIGHT)] + pages[1:]
+    return Preview(thumbnail, _strip(strip) if len(strip) > 1 else None)
+
+
+def render_image_preview(data: bytes) -> Preview | None:
+    from PIL import Image, ImageSequence
+
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft("RGB", (THUMBNAIL_WIDTH, THUMBNAIL_WIDTH * 2))  # cheap JPEG downscale on decode
+        frames = [
+            frame.copy().convert("RGB")
+            for _, frame in zip(range(STRIP_PAGES), ImageSequence.Iterator(img))
+        ]
+    if not frames:
+        return None
+
+    thumbnail = _jpeg(_fit_width(frames[0], THUMBNAIL_WIDTH))
+    # Multi-page TIFFs get a strip like PDFs do.
+    strip = _strip([_fit_height(frame, STRIP_HEIGHT) for frame in frames]) if len(frames) > 1 else None
+    return Preview(thumbnail, strip)
+
+
+def render_preview(data: bytes, mime: str) -> Preview | None:
+    """Render previews for a plaintext file, or None if its type has none."""
+    if "pdf" in mime:
+        return render_pdf_preview(data)
+    if mime.startswith("image/"):
+        return render_image_preview(data)
+    return None
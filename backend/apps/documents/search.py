@@ -0,0 +1,216 @@
+"""
+Full-text search over document titles, references and OCR text.
+
+The index lives in a side table created by migration 0008, in whichever form
+the database supports:
+
+    PostgreSQL  document_search (document_id, company_id, body tsvector) + GIN index
+    SQLite      document_search FTS5 table, keyed through document_search_keys
+
+Documents are (re)indexed from a post_save signal whenever their searchable
+fields change — notably when OCR completes — and dropped on delete. Results
+are ranked (ts_rank_cd / bm25) and carry a highlighted snippet in which only
+the <mark> tags are HTML; the document text itself is escaped.
+"""
+import re
+import uuid
+from typing import NamedTuple
+
+from django.db import connection
+from django.utils.html import escape
+
+# Text search configuration used for PostgreSQL vectors and queries.
+PG_CONFIG = "english"
+
+# Only this much OCR text per document is indexed (tsvector is capped at 1 MB).
+MAX_INDEXED_CHARS = 500_000
+
+SNIPPET_WORDS = 24
+
+_START, _STOP = "\x02", "\x03"
+_TERM_RE = re.compile(r'"[^"]+"|[^\s"]+')
+
+
+class SearchHit(NamedTuple):
+    document_id: uuid.UUID
+    rank: float
+    snippet: str
+
+
+def _is_postgres() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def _db_id(value) -> str:
+    """UUIDs as stored by the backend: native on PostgreSQL, 32-char hex on SQLite."""
+    return str(value) if _is_postgres() else getattr(value, "hex", str(value).replace("-", ""))
+
+
+def _fts5_query(query: str) -> str:
+    """Turn free text into an FTS5 query: every word (or "quoted phrase") must match."""
+    terms = []
+    for term in _TERM_RE.findall(query):
+        term = term.strip('"').replace('"', '""')
+        if term:
+            terms.append(f'"{term}"')
+    return " ".join(terms)
+
+
+def _highlight(snippet: str) -> str:
+    return escape(snippet or "").replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+
+# ─── Indexing ─────────────────────────────────────────────────────────────────
+
+def index_document(document_id) -> None:
+    """Insert or refresh one document's index entry from its current row."""
+    with connection.cursor() as cursor:
+        if _is_postgres():
+            cursor.execute(
+                """
+                INSERT INTO document_search (document_id, company_id, body)
+                SELECT id, company_id,
+                       setweight(to_tsvector(%s, coalesce(title, '')), 'A')
+                    || setweight(to_tsvector(%s, coalesce(reference_number, '') || ' ' || coalesce(file_name, '')), 'B')
+                    || setweight(to_tsvector(%s, left(coalesce(extracted_text, ''), %s)), 'D')
+                FROM documents WHERE id = %s
+                ON CONFLICT (document_id) DO UPDATE
+                    SET company_id = EXCLUDED.company_id, body = EXCLUDED.body
+                """,
+                [PG_CONFIG, PG_CONFIG, PG_CONFIG, MAX_INDEXED_CHARS, _db_id(document_id)],
+            )
+            return
+
+        doc_id = _db_id(document_id)
+        cursor.execute(
+            "INSERT INTO document_search_keys (document_id, company_id) "
+            "SELECT id, company_id FROM documents WHERE id = %s "
+            "ON CONFLICT (document_id) DO NOTHING",
+            [doc_id],
+        )
+        cursor.execute(
+            "DELETE FROM document_search WHERE rowid = "
+            "(SELECT rowid FROM document_search_keys WHERE document_id = %s)",
+            [doc_id],
+        )
+        cursor.execute(
+            """
+            INSERT INTO document_search (rowid, title, reference, body)
+            SELECT k.rowid, coalesce(d.title, ''),
+                   coalesce(d.reference_number, '') || ' ' || coalesce(d.file_name, ''),
+                   substr(coalesce(d.extracted_text, ''), 1, %s)
+            FROM documents d JOIN document_search_keys k ON k.document_id = d.id
+            WHERE d.id = %s
+            """,
+            [MAX_INDEXED_CHARS, doc_id],
+        )
+
+
+def remove_document(document_id) -> None:
+    with connection.cursor() as cursor:
+        if _is_postgres():
+            cursor.execute("DELETE FROM document_search WHERE document_id = %s", [_db_id(document_id)])
+            return
+        doc_id = _db_id(document_id)
+        cursor.execute(
+            "DELETE FROM document_search WHERE rowid = "
+            "(SELECT rowid FROM document_search_keys WHERE document_id = %s)",
+            [doc_id],
+        )
+        cursor.execute("DELETE FROM document_search_keys WHERE document_id = %s", [doc_id])
+
+
+# ─── Querying ─────────────────────────────────────────────────────────────────
+
+class SearchResults:
+    """
+    Lazy, sliceable result set for one company and query.
+
+    Behaves enough like a queryset for Django's Paginator: `count()` runs the
+    match count and slicing runs the ranked query for just that page.
+    """
+
+    def __init__(self, company_id, query: str):
+        self.company_id = _db_id(company_id)
+        self.query = query.strip()
+        self._fts_query = self.query if _is_postgres() else _fts5_query(self.query)
+        self._count = None
+
+    def count(self) -> int:
+        if self._count is None:
+            self._count = self._fetch_count() if self._fts_query else 0
+        return self._count
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start = key.start or 0
+        stop = self.count() if key.stop is None else key.stop
+        if not self._fts_query or stop <= start:
+            return []
+        return self._fetch_page(start, stop - start)
+
+    def _fetch_count(self) -> int:
+        with connection.cursor() as cursor:
+            if _is_postgres():
+                cursor.execute(
+                    "SELECT count(*) FROM document_search "
+                    "WHERE company_id = %s AND body @@ websearch_to_tsquery(%s, %s)",
+                    [self.company_id, PG_CONFIG, self._fts_query],
+                )
+            else:
+                cursor.execute(
+                    "SELECT count(*) FROM document_search s "
+                    "JOIN document_search_keys k ON k.rowid = s.rowid "
+                    "WHERE document_search MATCH %s AND k.company_id = %s",
+                    [self._fts_query, self.company_id],
+                )
+            return cursor.fetchone()[0]
+
+    def _fetch_page(self, offset: int, limit: int) -> list[SearchHit]:
+        with connection.cursor() as cursor:
+            if _is_postgres():
+                # Rank and page first; ts_headline only runs on the rows returned.
+                cursor.execute(
+                    f"""
+                    SELECT hit.document_id, hit.rank,
+                           ts_headline(%s, left(coalesce(nullif(d.extracted_text, ''), d.title), %s), hit.q,
+                                       'StartSel=' || chr(2) || ', StopSel=' || chr(3) ||
+                                       ', MaxWords={SNIPPET_WORDS}, MinWords=8, MaxFragments=2')
+                    FROM (
+                        SELECT s.document_id, ts_rank_cd(s.body, q) AS rank, q
+                        FROM document_search s, websearch_to_tsquery(%s, %s) q
+                        WHERE s.company_id = %s AND s.body @@ q
+                        ORDER BY rank DESC
+                        LIMIT %s OFFSET %s
+                    ) hit
+                    JOIN documents d ON d.id = hit.document_id
+                    ORDER BY hit.rank DESC
+                    """,
+                    [PG_CONFIG, MAX_INDEXED_CHARS, PG_CONFIG, self._fts_query, self.company_id, limit, offset],
+                )
+            else:
+                # bm25 is lower-is-better; column weights favour title, then references.
+                cursor.execute(
+                    f"""
+                    SELECT k.document_id, -bm25(document_search, 10.0, 5.0, 1.0) AS rank,
+                           snippet(document_search, 2, char(2), char(3), '…', {SNIPPET_WORDS})
+                    FROM document_search s
+                    JOIN document_search_keys k ON k.rowid = s.rowid
+                    WHERE document_search MATCH %s AND k.company_id = %s
+                    ORDER BY rank DESC
+                    LIMIT %s OFFSET %s
+                    """,
+                    [self._fts_query, self.company_id, limit, offset],
+                )
+            return [
+                SearchHit(uuid.UUID(str(document_id)), float(rank), _highlight(snippet))
+                for document_id, rank, snippet in cursor.fetchall()
+            ]
+
+
+def search_documents(company_id, query: str) -> SearchResults:
+    return SearchResults(company_id, query)
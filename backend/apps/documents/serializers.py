@@ -1,6 +1,10 @@
+from django.conf import settings
+from django.urls import reverse
 from rest_framework import serializers
 
-from .models import Document
+from core.utils.validators import validate_upload_size
+
+from .models import Document, UploadSession
 
 
 class DocumentSerializer(serializers.ModelSerializer):
@@ -8,19 +12,109 @@ class DocumentSerializer(serializers.ModelSerializer):
     employee_name = serializers.CharField(source="employee.full_name", read_only=True)
     is_expired = serializers.ReadOnlyField()
     days_until_expiry = serializers.ReadOnlyField()
+    preview = serializers.SerializerMethodField()
 
     class Meta:
         model = Document
-        exclude = ["company", "extracted_text"]
+        exclude = ["company", "extracted_text", "blob"]
         read_only_fields = ["id", "file_name", "file_size", "mime_type", "is_encrypted",
-                            "checksum", "ocr_processed", "created_at", "updated_at"]
+                            "checksum", "ocr_processed", "ocr_pages_total", "ocr_pages_done",
+                            "created_at", "updated_at"]
 
+    def get_preview(self, obj) -> dict | None:
+        """Versioned preview URLs (safe to cache forever), once a preview exists."""
+        blob = obj.blob
+        if blob is None or not blob.thumbnail:
+            return None
+        url = reverse("document-preview", args=[obj.pk])
+        version = f"{blob.preview_version}-{blob.sha256[:16]}"
+        return {
+            "thumbnail": f"{url}?kind=thumbnail&v={version}",
+            "strip": f"{url}?kind=strip&v={version}" if blob.page_strip else None,
+        }
 
-class DocumentUploadSerializer(serializers.ModelSerializer):
-    file = serializers.FileField(write_only=True)
+
+class EvidencePackSerializer(serializers.Serializer):
+    """Selection for an evidence pack export; filters are combined with AND."""
+    compliance_record = serializers.UUIDField(required=False, help_text="Evidence documents of this record")
+    employee = serializers.UUIDField(required=False)
+    document_type = serializers.ChoiceField(choices=Document.DocumentType.choices, required=False)
+    date_from = serializers.DateField(required=False, help_text="Uploaded on or after")
+    date_to = serializers.DateField(required=False, help_text="Uploaded on or before")
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("Select documents by at least one filter.")
+        if attrs.get("date_from") and attrs.get("date_to") and attrs["date_from"] > attrs["date_to"]:
+            raise serializers.ValidationError({"date_to": "Must not be before date_from."})
+        return attrs
+
+
+class DocumentMetadataSerializer(serializers.ModelSerializer):
+    """Client-supplied document fields, without the file itself."""
 
     class Meta:
         model = Document
         fields = ["title", "document_type", "employee", "description",
                   "tags", "expiry_date", "issue_date", "reference_number",
-                  "period_start", "period_end", "file"]
+                  "period_start", "period_end"]
+
+
+class DocumentUploadSerializer(DocumentMetadataSerializer):
+    file = serializers.FileField(write_only=True)
+
+    class Meta(DocumentMetadataSerializer.Meta):
+        fields = DocumentMetadataSerializer.Meta.fields + ["file"]
+
+
+class BatchUploadSerializer(serializers.Serializer):
+    """Files (or one ZIP of them) plus per-file metadata for a batch upload."""
+    files = serializers.ListField(child=serializers.FileField(), required=False)
+    archive = serializers.FileField(required=False, help_text="ZIP of the files to upload")
+    manifest = serializers.JSONField(
+        required=False, default=dict,
+        help_text="Object mapping file names (ZIP paths) to document metadata",
+    )
+
+    def validate_manifest(self, value):
+        if not isinstance(value, dict) or not all(isinstance(entry, dict) for entry in value.values()):
+            raise serializers.ValidationError("Must be an object mapping file names to metadata objects.")
+        return value
+
+    def validate(self, attrs):
+        if bool(attrs.get("files")) == bool(attrs.get("archive")):
+            raise serializers.ValidationError("Send either `files` or one `archive`.")
+        return attrs
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    document = DocumentMetadataSerializer(source="document_fields", write_only=True)
+    document_id = serializers.UUIDField(source="document.id", read_only=True, default=None)
+    chunk_count = serializers.ReadOnlyField()
+    received_chunks = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ["id", "file_name", "total_size", "chunk_size", "chunk_count", "expected_sha256",
+                  "status", "expires_at", "received_chunks", "document", "document_id", "created_at"]
+        read_only_fields = ["id", "chunk_size", "status", "expires_at", "created_at"]
+
+    def get_received_chunks(self, obj):
+        return list(obj.chunks.values_list("index", flat=True))
+
+    def validate_total_size(self, value):
+        if value < 1:
+            raise serializers.ValidationError("File is empty.")
+        validate_upload_size(value, max_mb=settings.MAX_RESUMABLE_UPLOAD_SIZE_MB)
+        return value
+
+    def validate_expected_sha256(self, value):
+        value = value.lower()
+        if value and (len(value) != 64 or any(c not in "0123456789abcdef" for c in value)):
+            raise serializers.ValidationError("Must be a hex-encoded SHA-256 digest.")
+        return value
+
+    def validate(self, attrs):
+        # Persist the metadata exactly as submitted; it is re-validated on finalize.
+        attrs["document_fields"] = self.initial_data.get("document", {})
+        return attrs
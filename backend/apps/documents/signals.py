@@ -2,17 +2,23 @@
 Document signals.
 - Notify company admins when a document is about to expire (30 / 7 days).
 - Auto-mark documents as expired when expiry_date has passed.
+- Release the shared vault blob when a document is deleted; purge deleted blobs' files.
+- Keep the full-text search index in step with titles and OCR text.
+- Recompute the near-duplicate (MinHash) signature when OCR text changes.
+- Keep the per-company document counters (stats.py) in step.
 """
 import logging
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 
-from .models import Document
+from .models import Document, VaultBlob
 
 logger = logging.getLogger(__name__)
 
+SEARCHABLE_FIELDS = {"title", "reference_number", "file_name", "extracted_text"}
+
 
 @receiver(post_save, sender=Document)
 def check_document_expiry_on_save(sender, instance, created, **kwargs):
@@ -30,4 +36,98 @@ def check_document_expiry_on_save(sender, instance, created, **kwargs):
         Document.Status.EXPIRED, Document.Status.ARCHIVED
     ):
         Document.objects.filter(pk=instance.pk).update(status=Document.Status.EXPIRED)
+        instance.status = Document.Status.EXPIRED  # so later receivers (counters) see it
         logger.info("Document %s auto-marked as expired.", instance.title)
+
+
+@receiver(post_delete, sender=Document)
+def release_document_blob(sender, instance, origin=None, **kwargs):
+    """
+    Drop the document's reference to its blob; the last one deletes the blob.
+    Skipped when the document goes in a cascade from its blob or company,
+    which deletes the blobs themselves.
+    """
+    if not instance.blob_id:
+        return
+    if origin is not None and not (isinstance(origin, Document) or getattr(origin, "model", None) is Document):
+        return
+    from .vault import release_blob
+    release_blob(instance.blob_id)
+
+
+@receiver(post_delete, sender=VaultBlob)
+def purge_deleted_blob(sender, instance, **kwargs):
+    """Delete the blob's encrypted file and previews once the deletion commits."""
+    from .vault import purge_blob
+    purge_blob(instance)
+
+
+@receiver(post_save, sender=Document)
+def index_document_for_search(sender, instance, created, update_fields=None, **kwargs):
+    """Re-index when a searchable field may have changed (e.g. OCR just completed)."""
+    if update_fields is not None and not SEARCHABLE_FIELDS.intersection(update_fields):
+        return
+    from .search import index_document
+    index_document(instance.pk)
+
+
+@receiver(post_save, sender=Document)
+def index_document_similarity(sender, instance, created, update_fields=None, **kwargs):
+    """Sign the OCR text once it exists (on OCR completion, or at upload for reused text)."""
+    if created and not instance.ocr_processed:
+        return
+    if not created and (update_fields is None or "extracted_text" not in update_fields):
+        return
+    from .similarity import index_document
+    index_document(instance.pk)
+
+
+@receiver(post_delete, sender=Document)
+def remove_document_from_search(sender, instance, **kwargs):
+    from .search import remove_document
+    remove_document(instance.pk)
+
+
+# ─── Document counters ────────────────────────────────────────────────────────
+
+STATS_FIELDS = {"status", "expiry_date"}
+
+
+def _stats_state(instance):
+    """The (status, expiry_date) the counters hold for this instance, or None if deferred."""
+    if not STATS_FIELDS.issubset(instance.__dict__):
+        return None
+    return instance.status, instance.expiry_date
+
+
+@receiver(post_init, sender=Document)
+def remember_document_stats_state(sender, instance, **kwargs):
+    instance._stats_state = _stats_state(instance)
+
+
+@receiver(post_save, sender=Document)
+def update_document_stats(sender, instance, created, update_fields=None, **kwargs):
+    if not created and update_fields is not None and not STATS_FIELDS.intersection(update_fields):
+        return
+    from .stats import apply_delta, classify
+
+    today = timezone.now().date()
+    before = getattr(instance, "_stats_state", None)
+    after = _stats_state(instance)
+    if after is None or (before is None and not created):
+        return  # loaded with deferred fields; the daily recount corrects any drift
+    apply_delta(
+        instance.company_id,
+        None if created else classify(*before, today),
+        classify(*after, today),
+    )
+    instance._stats_state = after
+
+
+@receiver(post_delete, sender=Document)
+def remove_document_from_stats(sender, instance, **kwargs):
+    state = _stats_state(instance)
+    if state is None:
+        return
+    from .stats import apply_delta, classify
+    apply_delta(instance.company_id, classify(*state, timezone.now().date()), None)
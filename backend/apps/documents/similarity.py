@@ -0,0 +1,240 @@
+"""
+Near-duplicate detection over OCR text with MinHash and LSH.
+
+Each document's text is reduced to its set of word shingles (runs of
+SHINGLE_WORDS words) and summarised by a MinHash signature of NUM_PERM
+values, whose per-position agreement estimates the Jaccard similarity of two
+shingle sets. Two scans of the same contract differ in a few OCR'd words and
+still share most shingles.
+
+Signatures are split into BANDS bands of ROWS values; each band is hashed to
+a key stored in document_lsh_buckets. Documents sharing any key are
+candidates, so finding similar documents is an indexed lookup of BANDS keys
+followed by exact signature comparison against those few candidates, rather
+than a scan of the whole vault. With 32 bands of 4 rows, pairs above ~0.6
+similarity are almost always candidates and pairs below ~0.2 rarely are.
+
+Signatures are (re)computed from a post_save signal when OCR text changes.
+The nightly detect_duplicate_clusters task backfills missing ones and groups
+each company's near-duplicates into clusters.
+"""
+import hashlib
+import re
+import zlib
+from typing import NamedTuple
+
+import numpy as np
+from django.db import transaction
+
+NUM_PERM = 128
+BANDS, ROWS = 32, 4
+SHINGLE_WORDS = 3
+# Texts with fewer distinct shingles than this are too short to compare.
+MIN_SHINGLES = 10
+# Signature agreement at which two documents count as near-duplicates
+# (about 5% of words differing between two OCR runs still scores ~0.75).
+DUPLICATE_SIMILARITY = 0.7
+# Lowest similarity a search may ask for. A pair becomes a candidate with
+# probability 1 - (1 - s**ROWS)**BANDS: ~99% at 0.6, ~87% at 0.5, but only
+# ~56% at 0.4 and ~23% at 0.3, so lower thresholds would quietly miss many matches.
+MIN_SEARCH_SIMILARITY = 0.5
+# Distinct groups tracked per LSH bucket when clustering; caps the comparisons per document.
+MAX_BUCKET_REPRESENTATIVES = 50
+
+_PRIME = 4294967311  # smallest prime above 2**32
+_HASH_BLOCK = 8192
+_rng = np.random.default_rng(20240611)  # fixed: signatures must be comparable across processes
+_A = _rng.integers(1, 2**31, NUM_PERM, dtype=np.uint64)[:, None]
+_B = _rng.integers(0, 2**31, NUM_PERM, dtype=np.uint64)[:, None]
+_WORD_RE = re.compile(r"\w+")
+
+
+class SimilarDocument(NamedTuple):
+    document_id: object
+    similarity: float
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """32-bit hashes of the distinct word shingles of a text."""
+    words = _WORD_RE.findall((text or "").lower())
+    if len(words) < SHINGLE_WORDS:
+        return np.empty(0, dtype=np.uint64)
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    return np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+def minhash(text: str) -> tuple[np.ndarray | None, int]:
+    """(signature, shingle count) of a text; the signature is None if the text is too short."""
+    hashes = shingle_hashes(text)
+    if len(hashes) < MIN_SHINGLES:
+        return None, len(hashes)
+    signature = np.full(NUM_PERM, _PRIME, dtype=np.uint64)
+    # (a*h + b) mod p per permutation; blocks keep the NUM_PERM x n matrix small.
+    for start in range(0, len(hashes), _HASH_BLOCK):
+        block = hashes[start:start + _HASH_BLOCK][None, :]
+        np.minimum(signature, ((_A * block + _B) % _PRIME).min(axis=1), out=signature)
+    return signature.astype(np.uint32), len(hashes)
+
+
+def band_keys(signature: np.ndarray) -> list[int]:
+    """One signed 64-bit key per LSH band."""
+    return [
+        int.from_bytes(
+            hashlib.blake2b(bytes([band]) + signature[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8).digest(),
+            "big", signed=True,
+        )
+        for band in range(BANDS)
+    ]
+
+
+def _signature(raw) -> np.ndarray:
+    return np.frombuffer(bytes(raw), dtype="<u4")
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+# ─── Index ────────────────────────────────────────────────────────────────────
+
+def index_document(document_id) -> bool:
+    """(Re)compute a document's signature and LSH keys from its OCR text. Returns False if too short."""
+    from .models import Document, DocumentLSHBucket, DocumentSignature
+
+    doc = Document.objects.filter(pk=document_id).only("id", "company_id", "extracted_text").first()
+    if doc is None:
+        return False
+    signature, shingles = minhash(doc.extracted_text)
+
+    with transaction.atomic():
+        DocumentLSHBucket.objects.filter(document_id=doc.pk).delete()
+        if signature is None:
+            DocumentSignature.objects.filter(document_id=doc.pk).delete()
+            return False
+        DocumentSignature.objects.update_or_create(
+            document_id=doc.pk,
+            defaults={"company_id": doc.company_id, "minhash": signature.astype("<u4").tobytes(), "shingles": shingles},
+        )
+        DocumentLSHBucket.objects.bulk_create([
+            DocumentLSHBucket(company_id=doc.company_id, key=key, document_id=doc.pk)
+            for key in band_keys(signature)
+        ])
+    return True
+
+
+def similar_documents(document, min_similarity: float = DUPLICATE_SIMILARITY,
+                      limit: int = 20) -> list[SimilarDocument] | None:
+    """
+    Documents of the same company whose text is at least `min_similarity`
+    similar, most similar first. None if the document has no signature.
+    """
+    from .models import DocumentLSHBucket, DocumentSignature
+
+    own = DocumentSignature.objects.filter(document_id=document.pk).values_list("minhash", flat=True).first()
+    if own is None:
+        return None
+    own = _signature(own)
+
+    candidates = (
+        DocumentLSHBucket.objects
+        .filter(company_id=document.company_id, key__in=band_keys(own))
+        .exclude(document_id=document.pk)
+        .values("document_id")
+    )
+    results = []
+    for document_id, raw in DocumentSignature.objects.filter(document_id__in=candidates).values_list(
+        "document_id", "minhash",
+    ):
+        score = similarity(own, _signature(raw))
+        if score >= min_similarity:
+            results.append(SimilarDocument(document_id, score))
+    results.sort(key=lambda hit: hit.similarity, reverse=True)
+    return results[:limit]
+
+
+# ─── Duplicate clusters ───────────────────────────────────────────────────────
+
+def backfill_signatures(company_id=None) -> int:
+    """Compute signatures for OCR'd documents that have none yet. Returns the number indexed."""
+    from .models import Document
+
+    missing = Document.objects.filter(ocr_processed=True, signature__isnull=True).exclude(extracted_text="")
+    if company_id:
+        missing = missing.filter(company_id=company_id)
+    indexed = 0
+    for document_id in list(missing.values_list("pk", flat=True)):
+        indexed += index_document(document_id)
+    return indexed
+
+
+def find_duplicate_clusters(company_id, min_similarity: float = DUPLICATE_SIMILARITY) -> int:
+    """
+    Group a company's near-duplicate documents and store each document's
+    cluster (its earliest member) on its signature. Only documents sharing an
+    LSH bucket are ever compared, each against at most MAX_BUCKET_REPRESENTATIVES
+    others per bucket. Returns the number of clusters.
+    """
+    from django.db.models import Count
+
+    from .models import Document, DocumentLSHBucket, DocumentSignature
+
+    shared_keys = (
+        DocumentLSHBucket.objects.filter(company_id=company_id)
+        .values("key").annotate(n=Count("id")).filter(n__gt=1).values("key")
+    )
+    buckets: dict[int, list] = {}
+    for key, document_id in DocumentLSHBucket.objects.filter(
+        company_id=company_id, key__in=shared_keys,
+    ).values_list("key", "document_id"):
+        buckets.setdefault(key, []).append(document_id)
+
+    members = {d for ids in buckets.values() for d in ids}
+    signatures = {
+        document_id: _signature(raw)
+        for document_id, raw in DocumentSignature.objects.filter(document_id__in=members).values_list(
+            "document_id", "minhash",
+        )
+    }
+
+    parent = {d: d for d in signatures}
+
+    def find(d):
+        while parent[d] != d:
+            parent[d] = parent[parent[d]]
+            d = parent[d]
+        return d
+
+    # Within a bucket each document is compared with the bucket's representatives
+    # (the first member of each group found there so far), not with every other
+    # member: a bucket of N templated payslips costs about N comparisons, not N²/2.
+    # Pairs already in one cluster are never compared.
+    for ids in buckets.values():
+        representatives = []
+        for d in ids:
+            if d not in signatures:
+                continue
+            matched = False
+            for rep in representatives:
+                root_d, root_rep = find(d), find(rep)
+                if root_d == root_rep:
+                    matched = True
+                elif similarity(signatures[d], signatures[rep]) >= min_similarity:
+                    parent[root_d] = root_rep
+                    matched = True
+            if not matched and len(representatives) < MAX_BUCKET_REPRESENTATIVES:
+                representatives.append(d)
+
+    clusters: dict = {}
+    for d in signatures:
+        clusters.setdefault(find(d), []).append(d)
+    clusters = {root: ids for root, ids in clusters.items() if len(ids) > 1}
+
+    created = dict(Document.objects.filter(pk__in=[d for ids in clusters.values() for d in ids])
+                   .values_list("pk", "created_at"))
+    with transaction.atomic():
+        DocumentSignature.objects.filter(company_id=company_id, cluster__isnull=False).update(cluster=None)
+        for ids in clusters.values():
+            earliest = min(ids, key=lambda d: (created[d], str(d)))
+            DocumentSignature.objects.filter(document_id__in=ids).update(cluster_id=earliest)
+    return len(clusters)
@@ -0,0 +1,96 @@
+"""
+Per-company document counters (total, expired, expiring soon).
+
+The vault list shows these with every page, and counting them on a tenant
+with 100k+ documents cost more than the page itself. They now live in
+document_stats, one row per company:
+
+    - Document signals apply +/- deltas on create, delete and status or
+      expiry date changes (F() updates, so concurrent writers don't clash).
+    - The daily expiry scan recomputes every company in one grouped query,
+      which rolls the "expiring soon" window forward and corrects any drift
+      from queryset updates that bypass signals.
+    - A row missing or not yet rolled forward today is recomputed for that
+      company on first read.
+"""
+from datetime import date, timedelta
+
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+EXPIRING_SOON_DAYS = 30
+
+
+def classify(status: str | None, expiry_date: date | None, today: date) -> tuple[int, int, int]:
+    """(total, expired, expiring_soon) contribution of one document."""
+    from .models import Document
+
+    expiring = (
+        status == Document.Status.ACTIVE
+        and expiry_date is not None
+        and expiry_date <= today + timedelta(days=EXPIRING_SOON_DAYS)
+    )
+    return 1, int(status == Document.Status.EXPIRED), int(expiring)
+
+
+def recompute(company_ids=None, today: date | None = None) -> int:
+    """Recount the given companies (default: all) in one query. Returns the rows written."""
+    from apps.companies.models import Company
+
+    from .models import Document, DocumentStats
+
+    today = today or timezone.now().date()
+    companies = Company.objects.all()
+    if company_ids is not None:
+        companies = companies.filter(pk__in=company_ids)
+    doc = "documents_document_set"
+    counts = companies.annotate(
+        total=Count(doc),
+        expired=Count(doc, filter=Q(**{f"{doc}__status": Document.Status.EXPIRED})),
+        expiring_soon=Count(doc, filter=Q(**{
+            f"{doc}__status": Document.Status.ACTIVE,
+            f"{doc}__expiry_date__lte": today + timedelta(days=EXPIRING_SOON_DAYS),
+        })),
+    ).values_list("pk", "total", "expired", "expiring_soon")
+
+    rows = [
+        DocumentStats(company_id=pk, total=total, expired=expired, expiring_soon=soon, as_of=today)
+        for pk, total, expired, soon in counts
+    ]
+    DocumentStats.objects.bulk_create(
+        rows, batch_size=1000, update_conflicts=True, unique_fields=["company"],
+        update_fields=["total", "expired", "expiring_soon", "as_of", "updated_at"],
+    )
+    return len(rows)
+
+
+def get_stats(company_id):
+    """The company's counters for today, recomputing them first if missing or stale."""
+    from .models import DocumentStats
+
+    today = timezone.now().date()
+    stats = DocumentStats.objects.filter(company_id=company_id, as_of=today).first()
+    if stats is None:
+        recompute([company_id], today)
+        stats = DocumentStats.objects.get(company_id=company_id)
+    return stats
+
+
+def apply_delta(company_id, before: tuple | None, after: tuple | None) -> None:
+    """
+    Move a document's contribution from `before` to `after` (None = absent).
+    Rows not rolled forward to today are left alone; their next read recounts.
+    """
+    from .models import DocumentStats
+
+    before = before or (0, 0, 0)
+    after = after or (0, 0, 0)
+    delta = [new - old for old, new in zip(before, after)]
+    if not any(delta):
+        return
+    today = timezone.now().date()
+    DocumentStats.objects.filter(company_id=company_id, as_of=today).update(
+        total=F("total") + delta[0],
+        expired=F("expired") + delta[1],
+        expiring_soon=F("expiring_soon") + delta[2],
+    )
@@ -1,135 +1,67 @@
 """
 Celery tasks for document processing:
 - OCR extraction from scanned PDFs / images
-- AI field extraction from OCR text
+- AI field extraction from OCR text (and bulk re-extraction when rules change)
+- Thumbnail / page-strip previews
 - Expiry notifications
 """
 import hashlib
 import logging
-import re
 
 from celery import shared_task
 
 logger = logging.getLogger("auditshield")
 
 
-def _extract_fields_from_text(text: str) -> dict:
+def _extract_fields_from_text(text: str, country: str | None = None, document_type: str | None = None) -> dict:
     """
-    Lightweight pattern-based field extraction from document OCR text.
+    Pattern-based field extraction from document OCR text.
 
-    Looks for:
-    - Employee name
-    - Start / hire date
-    - Salary / gross amount
-    - Contract end date
-
-    Returns a dict with found values (None if not found).
+    Returns a dict of every field the applicable rule set knows (None if not
+    found). See apps.documents.extraction for the rules themselves.
     """
-    result = {
-        "name": None,
-        "start_date": None,
-        "salary": None,
-        "contract_end": None,
-    }
-
-    # ── Name ─────────────────────────────────────────────────────────────────
-    name_pattern = re.compile(
-        r"(?:Employee|Full\s+Name|Name|Candidate)[:\s]+([A-Z][a-zA-Z'\-]+(?:\s+[A-Z][a-zA-Z'\-]+){1,4})",
-        re.IGNORECASE,
-    )
-    m = name_pattern.search(text)
-    if m:
-        result["name"] = m.group(1).strip()
-
-    # ── Start / hire date ─────────────────────────────────────────────────────
-    start_pattern = re.compile(
-        r"(?:Start\s+Date|Commencement\s+Date|Hire\s+Date|Date\s+of\s+Joining|Effective\s+Date)[:\s]+"
-        r"(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4}|\d{4}[\/\-\.]\d{1,2}[\/\-\.]\d{1,2}"
-        r"|(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|"
-        r"Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)"
-        r"\.?\s+\d{1,2},?\s+\d{4})",
-        re.IGNORECASE,
-    )
-    m = start_pattern.search(text)
-    if m:
-        result["start_date"] = m.group(1).strip()
-
-    # ── Salary / gross ────────────────────────────────────────────────────────
-    salary_pattern = re.compile(
-        r"(?:Gross\s+Salary|Annual\s+Salary|Monthly\s+Salary|Salary|Base\s+Pay|Gross\s+Pay)[:\s]+"
-        r"(?:USD|GBP|EUR|KES|RWF|NGN|ZAR|[$£€])?\s*"
-        r"([\d,]+(?:\.\d{1,2})?)",
-        re.IGNORECASE,
-    )
-    m = salary_pattern.search(text)
-    if not m:
-        # Fallback: currency symbol followed by number
-        m = re.search(r"[$£€]\s*([\d,]+(?:\.\d{1,2})?)", text)
-    if m:
-        raw = m.group(1).replace(",", "")
-        try:
-            result["salary"] = float(raw)
-        except ValueError:
-            result["salary"] = m.group(1)
-
-    # ── Contract end date ─────────────────────────────────────────────────────
-    end_pattern = re.compile(
-        r"(?:End\s+Date|Contract\s+Expiry|Contract\s+Expires?|Termination\s+Date|Expiry\s+Date)[:\s]+"
-        r"(\d{1,2}[\/\-\.]\d{1,2}[\/\-\.]\d{2,4}|\d{4}[\/\-\.]\d{1,2}[\/\-\.]\d{1,2}"
-        r"|(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|"
-        r"Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)"
-        r"\.?\s+\d{1,2},?\s+\d{4})",
-        re.IGNORECASE,
-    )
-    m = end_pattern.search(text)
-    if m:
-        result["contract_end"] = m.group(1).strip()
+    from .extraction import extract_fields
 
-    return result
+    return extract_fields(text, country, document_type).as_dict()
 
 
 @shared_task(name="apps.documents.tasks.process_document_ocr", bind=True, max_retries=3)
 def process_document_ocr(self, document_id: str):
-    """Extract text from uploaded document using Tesseract / PyMuPDF."""
-    from core.utils.encryption import decrypt_file
-
-    from .models import Document
+    """Extract text from uploaded document using Tesseract / PyMuPDF (pages OCR'd in parallel)."""
+    from .extraction import extract_document_fields, extraction_metadata
+    from .models import Document, VaultBlob
+    from .ocr import OCREngine
+    from .vault import read_plaintext
 
     try:
-        doc = Document.objects.get(id=document_id)
+        doc = Document.objects.select_related("blob", "company__country").get(id=document_id)
     except Document.DoesNotExist:
         return
 
-    try:
-        raw = doc.file.read()
-        decrypted = decrypt_file(raw) if doc.is_encrypted else raw
-
-        mime = doc.mime_type
-        text = ""
-
-        if "pdf" in mime:
-            import fitz  # PyMuPDF
-            pdf = fitz.open(stream=decrypted, filetype="pdf")
-            text = "\n".join(page.get_text() for page in pdf)
-
-            # Fallback to OCR if text-layer is empty (scanned PDF)
-            if len(text.strip()) < 50:
-                import io
+    # Identical content already processed under another document — reuse its
+    # text; field extraction is cheap and depends on this document's type.
+    if doc.blob and doc.blob.ocr_processed:
+        metadata = doc.metadata or {}
+        metadata.update(extraction_metadata(
+            extract_document_fields(doc.blob.extracted_text, doc.company, doc.document_type)
+        ))
+        doc.extracted_text = doc.blob.extracted_text
+        doc.ocr_processed = True
+        doc.status = Document.Status.ACTIVE
+        doc.metadata = metadata
+        doc.save(update_fields=["extracted_text", "ocr_processed", "status", "metadata"])
+        logger.info("OCR reused from blob %s for document %s", doc.blob_id, document_id)
+        return
 
-                import pytesseract
-                from PIL import Image
-                for page in pdf:
-                    pix = page.get_pixmap(dpi=150)
-                    img = Image.open(io.BytesIO(pix.tobytes("png")))
-                    text += pytesseract.image_to_string(img)
+    try:
+        decrypted = read_plaintext(doc)
 
-        elif "image" in mime:
-            import io
+        def record_progress(done: int, total: int) -> None:
+            Document.objects.filter(pk=doc.pk).update(ocr_pages_done=done, ocr_pages_total=total)
 
-            import pytesseract
-            from PIL import Image
-            img = Image.open(io.BytesIO(decrypted))
-            text = pytesseract.image_to_string(img)
+        text = OCREngine(on_progress=record_progress).extract(
+            decrypted, doc.mime_type, sha256=doc.blob.sha256 if doc.blob else None,
+        )
 
         extracted_text = text.strip()
         doc.extracted_text = extracted_text
@@ -138,14 +70,21 @@ def process_document_ocr(self, document_id: str):
 
         # AI field extraction
         try:
-            ai_fields = _extract_fields_from_text(extracted_text)
             metadata = doc.metadata or {}
-            metadata["ai_extracted"] = ai_fields
+            metadata.update(extraction_metadata(
+                extract_document_fields(extracted_text, doc.company, doc.document_type)
+            ))
             doc.metadata = metadata
         except Exception as extract_exc:
             logger.warning("AI extraction failed for document %s: %s", document_id, extract_exc)
 
         doc.save(update_fields=["extracted_text", "ocr_processed", "status", "metadata"])
+        if doc.blob_id:
+            VaultBlob.objects.filter(pk=doc.blob_id).update(
+                extracted_text=extracted_text,
+                ai_extracted=doc.metadata.get("ai_extracted", {}),
+                ocr_processed=True,
+            )
         logger.info("OCR completed for document %s — %d chars extracted", document_id, len(text))
 
     except Exception as exc:
@@ -153,28 +92,326 @@ def process_document_ocr(self, document_id: str):
         raise self.retry(exc=exc, countdown=60)
 
 
+@shared_task(name="apps.documents.tasks.render_blob_preview", bind=True, max_retries=2)
+def render_blob_preview(self, blob_id: str):
+    """Render and store the encrypted thumbnail / page strip for a vault blob, unless current."""
+    from .models import VaultBlob
+    from .preview import PREVIEW_VERSION, render_preview
+    from .vault import read_blob_plaintext, save_blob_preview
+
+    blob = VaultBlob.objects.filter(pk=blob_id).first()
+    if blob is None or blob.preview_version == PREVIEW_VERSION:
+        return
+
+    try:
+        preview = render_preview(read_blob_plaintext(blob), blob.mime_type)
+    except Exception as exc:
+        logger.warning("Preview rendering failed for blob %s: %s", blob_id, exc)
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=exc, countdown=60)
+        preview = None  # give up: record that this blob has no preview
+    save_blob_preview(blob, preview)
+
+
+EXPIRY_SCAN_JOB = "document_expiry_scan"
+# Reminders go out when a document is this many days from expiry.
+EXPIRY_REMINDER_DAYS = (7, 30)
+
+
 @shared_task(name="apps.documents.tasks.check_document_expiries")
 def check_document_expiries():
-    """Mark expired docs and send notifications for docs expiring within 30 days."""
+    """
+    Mark newly expired documents and queue expiry reminders, one task per company.
+
+    The last scanned date is kept as a watermark in job_checkpoints, and each
+    run covers every day since then: documents that expired in the window are
+    marked, and documents whose 7- or 30-day reminder date fell in it are
+    reminded (with their actual days left). A missed beat therefore catches
+    up on the next run instead of losing reminders. The first run marks every
+    past-due document but only reminds for today.
+
+    It also recounts every company's document counters, rolling their
+    "expiring soon" window forward to today.
+    """
+    from datetime import date, timedelta
+
+    from django.db import transaction
     from django.utils import timezone
 
-    from apps.notifications.tasks import send_expiry_notification
+    from apps.notifications.tasks import send_expiry_digest
+    from core.models import JobCheckpoint
 
     from .models import Document
+    from .stats import recompute
 
     today = timezone.now().date()
+    with transaction.atomic():
+        watermark, _ = JobCheckpoint.objects.select_for_update().get_or_create(name=EXPIRY_SCAN_JOB)
+        last = date.fromisoformat(watermark.cursor) if watermark.cursor else None
+        if last is not None and last >= today:
+            return
+
+        active = Document.objects.filter(status=Document.Status.ACTIVE)
+        expired = active.filter(expiry_date__lt=today)
+        if last is not None:
+            expired = expired.filter(expiry_date__gte=last)
+        marked = expired.update(status=Document.Status.EXPIRED)
+
+        since = last or today - timedelta(days=1)
+        due: dict = {}
+        for days in sorted(EXPIRY_REMINDER_DAYS):
+            window = active.filter(
+                expiry_date__gt=max(since + timedelta(days=days), today - timedelta(days=1)),
+                expiry_date__lte=today + timedelta(days=days),
+            )
+            for doc_id, company_id, expiry_date in window.values_list("id", "company_id", "expiry_date"):
+                # A catch-up window can hold both reminders for one document; send the nearer.
+                due.setdefault(company_id, {}).setdefault(str(doc_id), (expiry_date - today).days)
+
+        watermark.advance(today.isoformat(), processed=sum(len(docs) for docs in due.values()), changed=marked)
+        for company_id, docs in due.items():
+            transaction.on_commit(
+                lambda company_id=company_id, docs=docs: send_expiry_digest.delay(str(company_id), docs)
+            )
+
+    recompute(today=today)
+
+    logger.info(
+        "Expiry scan %s..%s: %d documents marked expired, reminders for %d companies",
+        since, today, marked, len(due),
+    )
+
+
+@shared_task(name="apps.documents.tasks.purge_expired_upload_sessions")
+def purge_expired_upload_sessions():
+    """Delete chunk files of upload sessions that expired before being finalized."""
+    from django.utils import timezone
+
+    from .models import UploadSession
+    from .vault import discard_session_chunks
+
+    stale = UploadSession.objects.filter(
+        status=UploadSession.Status.OPEN,
+        expires_at__lt=timezone.now(),
+    )
+    count = 0
+    for session in stale.iterator():
+        discard_session_chunks(session)
+        session.status = UploadSession.Status.ABORTED
+        session.save(update_fields=["status", "updated_at"])
+        count += 1
+    if count:
+        logger.info("Purged %d expired upload sessions", count)
+
+
+@shared_task(name="apps.documents.tasks.prune_ocr_cache")
+def prune_ocr_cache():
+    """Evict least-recently-used OCR page text once the cache exceeds OCR_CACHE_MAX_MB."""
+    from django.conf import settings
+
+    from .ocr import prune_page_cache
+
+    deleted = prune_page_cache(settings.OCR_CACHE_MAX_MB * 1024 * 1024)
+    if deleted:
+        logger.info("Pruned %d OCR cache pages", deleted)
+
+
+# ─── Bulk re-extraction ───────────────────────────────────────────────────────
+
+REEXTRACT_JOB = "reextract_documents"
+
+
+def run_reextraction(checkpoint, batch_size: int = 1000, max_batches: int | None = None,
+                     force: bool = False, company_id=None) -> bool:
+    """
+    Re-run field extraction on stored OCR text, resuming from `checkpoint`.
+
+    Documents are walked in primary-key order (keyset pagination, never
+    OFFSET), loading only the columns extraction needs. Each batch's
+    metadata is written with one bulk_update, in the same transaction as the
+    checkpoint's new cursor. Documents already extracted with the current
+    RULESET_VERSION are skipped unless `force`. Returns True once every
+    document has been visited.
+    """
+    from django.db import transaction
+
+    from apps.companies.models import Company
+
+    from .extraction import RULESET_VERSION, extract_fields_batch, extraction_metadata
+    from .models import Document
+
+    countries = dict(Company.objects.values_list("id", "country__iso_code"))
+    base = Document.objects.filter(ocr_processed=True).only("id", "company_id", "document_type", "extracted_text", "metadata")
+    if company_id:
+        base = base.filter(company_id=company_id)
+
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        qs = base.order_by("pk")
+        if checkpoint.cursor:
+            qs = qs.filter(pk__gt=checkpoint.cursor)
+        docs = list(qs[:batch_size].iterator(chunk_size=batch_size))
+        if not docs:
+            checkpoint.complete()
+            return True
+
+        pending = [
+            doc for doc in docs
+            if force or (doc.metadata or {}).get("ai_extraction", {}).get("version") != RULESET_VERSION
+        ]
+        groups: dict[tuple, list] = {}
+        for doc in pending:
+            groups.setdefault((countries.get(doc.company_id), doc.document_type), []).append(doc)
+        for (country, document_type), group in groups.items():
+            results = extract_fields_batch([doc.extracted_text for doc in group], country, document_type)
+            for doc, result in zip(group, results):
+                doc.metadata = {**(doc.metadata or {}), **extraction_metadata(result)}
+
+        with transaction.atomic():
+            if pending:
+                Document.objects.bulk_update(pending, ["metadata"], batch_size=batch_size)
+            checkpoint.advance(docs[-1].pk, processed=len(docs), changed=len(pending))
+        batches += 1
+    return False
+
+
+@shared_task(name="apps.documents.tasks.reextract_documents", bind=True)
+def reextract_documents(self, batch_size: int = 1000, batches_per_task: int = 50,
+                        force: bool = False, restart: bool = False, company_id: str | None = None):
+    """
+    Refresh metadata["ai_extracted"] for existing documents after rule changes.
+
+    Works through `batches_per_task` batches, then re-queues itself to carry
+    on from the checkpoint, so no single task holds a worker for hours and a
+    lost worker only costs the batch in flight.
+    """
+    from core.models import JobCheckpoint
+
+    from .extraction import RULESET_VERSION
+
+    params = {"ruleset_version": RULESET_VERSION, "force": force, "company_id": company_id}
+    checkpoint = JobCheckpoint.resume(REEXTRACT_JOB, params, restart=restart)
+    done = run_reextraction(checkpoint, batch_size, batches_per_task, force, company_id)
+    if done:
+        logger.info(
+            "Re-extraction complete: %d documents visited, %d updated",
+            checkpoint.processed, checkpoint.changed,
+        )
+    else:
+        self.apply_async(kwargs={
+            "batch_size": batch_size, "batches_per_task": batches_per_task,
+            "force": force, "company_id": company_id,
+        })
+
+
+# ─── Vault key rotation ───────────────────────────────────────────────────────
+
+REENCRYPT_JOB = "reencrypt_vault_bodies"
+
+
+def reencryption_params(company_id) -> dict:
+    # "walk" tells a checkpoint over documents from an older one over blobs, whose cursor does not apply.
+    return {"company_id": company_id, "walk": "documents"}
+
+
+def run_body_reencryption(checkpoint, batch_size: int = 50, max_batches: int | None = None,
+                          max_mb_per_sec: float | None = None, company_id=None) -> bool:
+    """
+    Re-encrypt stored files that are not under their company's active data key.
+
+    Only needed after a data key is retired (rotate_data_key) or to move files
+    written before per-company keys existed; master key rotation alone never
+    touches file bodies. Documents are walked in primary-key order from
+    `checkpoint`: a document's shared blob is re-encrypted once for all its
+    documents, and a document stored before deduplication (no blob) has its
+    own file re-encrypted. Throughput is held under `max_mb_per_sec` so the
+    job can run beside live traffic. Returns True once every document has been
+    visited.
+    """
+    import time
+
+    from core.utils.keyring import active_key_id
+
+    from .models import Document
+    from .vault import reencrypt_blob, reencrypt_document, stored_header
 
-    # Mark as expired
-    expired = Document.objects.filter(
-        expiry_date__lt=today,
-        status=Document.Status.ACTIVE,
+    base = Document.objects.select_related("blob").only(
+        "id", "company_id", "document_type", "file", "is_encrypted",
+        "blob__id", "blob__company_id", "blob__sha256", "blob__file", "blob__thumbnail", "blob__page_strip",
     )
-    expired.update(status=Document.Status.EXPIRED)
-
-    # Warn about docs expiring in 7 or 30 days
-    from datetime import timedelta
-    for days in (7, 30):
-        target_date = today + timedelta(days=days)
-        soon = Document.objects.filter(expiry_date=target_date, status=Document.Status.ACTIVE)
-        for doc in soon:
-            send_expiry_notification.delay(str(doc.id), days)
+    if company_id:
+        base = base.filter(company_id=company_id)
+
+    started, moved = time.monotonic(), 0
+    batches = 0
+    done_blobs = set()
+    while max_batches is None or batches < max_batches:
+        qs = base.order_by("pk")
+        if checkpoint.cursor:
+            qs = qs.filter(pk__gt=checkpoint.cursor)
+        docs = list(qs[:batch_size])
+        if not docs:
+            checkpoint.complete()
+            return True
+
+        changed = 0
+        for doc in docs:
+            if doc.blob_id in done_blobs:
+                continue
+            key_id = active_key_id(doc.company_id)
+            if doc.blob:
+                done_blobs.add(doc.blob_id)
+                header = stored_header(doc.blob.file)
+            else:
+                header = stored_header(doc.file) if doc.is_encrypted else None
+            if header is not None and header.key_id == key_id:
+                continue
+            if doc.blob:
+                moved += reencrypt_blob(doc.blob, key_id)
+            else:
+                moved += reencrypt_document(doc, key_id)
+            changed += 1
+            if max_mb_per_sec:
+                # Sleep off any lead over the allowed rate.
+                ahead = moved / (max_mb_per_sec * 1024 * 1024) - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+        checkpoint.advance(docs[-1].pk, processed=len(docs), changed=changed)
+        batches += 1
+    return False
+
+
+@shared_task(name="apps.documents.tasks.reencrypt_vault_bodies", bind=True)
+def reencrypt_vault_bodies(self, batch_size: int = 50, batches_per_task: int = 20,
+                           max_mb_per_sec: float | None = None, restart: bool = False,
+                           company_id: str | None = None):
+    """Re-encrypt stored files under current data keys, re-queueing itself between slices."""
+    from core.models import JobCheckpoint
+
+    checkpoint = JobCheckpoint.resume(REENCRYPT_JOB, reencryption_params(company_id), restart=restart)
+    done = run_body_reencryption(checkpoint, batch_size, batches_per_task, max_mb_per_sec, company_id)
+    if done:
+        logger.info(
+            "Vault re-encryption complete: %d documents visited, %d files re-encrypted",
+            checkpoint.processed, checkpoint.changed,
+        )
+    else:
+        self.apply_async(kwargs={
+            "batch_size": batch_size, "batches_per_task": batches_per_task,
+            "max_mb_per_sec": max_mb_per_sec, "company_id": company_id,
+        })
+
+
+# ─── Near-duplicate detection ─────────────────────────────────────────────────
+
+@shared_task(name="apps.documents.tasks.detect_duplicate_clusters")
+def detect_duplicate_clusters(company_id: str | None = None):
+    """Sign any unsigned OCR'd documents, then regroup each company's near-duplicate clusters."""
+    from apps.companies.models import Company
+
+    from .similarity import backfill_signatures, find_duplicate_clusters
+
+    indexed = backfill_signatures(company_id)
+    companies = [company_id] if company_id else Company.objects.values_list("id", flat=True)
+    clusters = sum(find_duplicate_clusters(cid) for cid in companies)
+    logger.info("Duplicate detection: %d documents signed, %d clusters", indexed, clusters)
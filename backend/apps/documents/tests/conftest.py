@@ -0,0 +1,34 @@
+"""
+Fixtures shared by the documents tests.
+"""
+import pytest
+
+from .helpers import DOCUMENTS_URL
+
+
+@pytest.fixture
+def vault_settings(settings):
+    """Tiny vault segments and upload-session chunks, so small files span many of them."""
+    settings.VAULT_CHUNK_SIZE = 1024
+    settings.UPLOAD_SESSION_CHUNK_SIZE = 3000
+    return settings
+
+
+@pytest.fixture
+def upload(auth_client):
+    """Upload a file through the API and return the created Document."""
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    from apps.documents.models import Document
+
+    def _upload(content: bytes, name: str = "file.pdf", content_type: str = "application/pdf", **fields):
+        response = auth_client.post(DOCUMENTS_URL, {
+            "title": fields.pop("title", name),
+            "document_type": fields.pop("document_type", "other"),
+            "file": SimpleUploadedFile(name, content, content_type),
+            **fields,
+        }, format="multipart")
+        assert response.status_code == 201, response.data
+        return Document.objects.get(pk=response.data["id"])
+
+    return _upload
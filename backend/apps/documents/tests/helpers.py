@@ -0,0 +1,14 @@
+"""
+Helpers shared by the documents tests.
+"""
+DOCUMENTS_URL = "/api/v1/documents/"
+
+
+def make_pdf(text: str = "Employee: John Smith\nSalary: 5000", pages: int = 1) -> bytes:
+    """A small PDF with a text layer; `pages` pages, each numbered."""
+    import fitz  # PyMuPDF
+
+    pdf = fitz.open()
+    for i in range(pages):
+        pdf.new_page().insert_text((72, 72), f"{text} page {i}")
+    return pdf.tobytes()
@@ -0,0 +1,114 @@
+"""
+Content deduplication tests: identical uploads within a company share one
+reference-counted VaultBlob, and the last reference removes it.
+"""
+import os
+
+import pytest
+
+from .helpers import DOCUMENTS_URL, make_pdf
+
+
+@pytest.fixture
+def content():
+    return make_pdf("Shared payroll register")
+
+
+@pytest.mark.django_db
+def test_identical_uploads_share_one_blob(upload, content):
+    from apps.documents.models import VaultBlob
+
+    first, second = upload(content), upload(content, name="copy.pdf")
+    blob = VaultBlob.objects.get()
+    assert blob.ref_count == 2
+    assert first.blob_id == second.blob_id == blob.pk
+    assert first.file.name == second.file.name == blob.file.name
+    assert second.file_name == "copy.pdf"
+
+
+@pytest.mark.django_db
+def test_different_content_gets_its_own_blob(upload, content):
+    from apps.documents.models import VaultBlob
+
+    upload(content)
+    upload(make_pdf("Another register"))
+    assert VaultBlob.objects.count() == 2
+    assert set(VaultBlob.objects.values_list("ref_count", flat=True)) == {1}
+
+
+@pytest.mark.django_db
+def test_blobs_are_not_shared_across_companies(upload, content):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    from apps.companies.models import Company
+    from apps.documents.models import Document, VaultBlob
+    from apps.documents.vault import acquire_blob, ingest_upload
+
+    upload(content)
+    other = Company.objects.create(name="Other Ltd", company_type="sme", email="o@other.com", phone="1")
+    encrypted = ingest_upload(SimpleUploadedFile("f.pdf", content, "application/pdf"), other)
+    blob, created = acquire_blob(other, encrypted, "application/pdf")
+    assert created
+    assert VaultBlob.objects.count() == 2
+    assert blob.company_id == other.pk
+    assert not Document.objects.filter(company=other).exists()
+
+
+@pytest.mark.django_db
+def test_deleting_copies_releases_the_blob(auth_client, upload, content, django_capture_on_commit_callbacks):
+    from apps.documents.models import VaultBlob
+
+    first, second = upload(content), upload(content)
+    path = VaultBlob.objects.get().file.path
+
+    assert auth_client.delete(f"{DOCUMENTS_URL}{first.pk}/").status_code == 204
+    assert VaultBlob.objects.get().ref_count == 1
+    assert os.path.exists(path)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert auth_client.delete(f"{DOCUMENTS_URL}{second.pk}/").status_code == 204
+    assert not VaultBlob.objects.exists()
+    assert not os.path.exists(path)
+
+
+@pytest.mark.django_db
+def test_queryset_delete_releases_each_reference(upload, content, django_capture_on_commit_callbacks):
+    from apps.documents.models import Document, VaultBlob
+
+    for _ in range(3):
+        upload(content)
+    kept = upload(make_pdf("Kept"))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Document.objects.exclude(pk=kept.pk).delete()
+    assert list(VaultBlob.objects.values_list("pk", "ref_count")) == [(kept.blob_id, 1)]
+
+
+@pytest.mark.django_db
+def test_company_deletion_removes_its_blobs(upload, content, company, django_capture_on_commit_callbacks):
+    from apps.documents.models import Document, VaultBlob
+
+    upload(content)
+    upload(content)
+    path = VaultBlob.objects.get().file.path
+
+    with django_capture_on_commit_callbacks(execute=True):
+        company.delete()
+    assert not Document.objects.exists()
+    assert not VaultBlob.objects.exists()
+    assert not os.path.exists(path)
+
+
+@pytest.mark.django_db
+def test_duplicate_reuses_ocr_results(upload, content):
+    from apps.documents.models import VaultBlob
+
+    first = upload(content, document_type="payslip")
+    VaultBlob.objects.filter(pk=first.blob_id).update(
+        extracted_text="Employee: Jane Roe\nNet Pay: 4,000", ocr_processed=True,
+    )
+
+    second = upload(content, document_type="payslip")
+    assert second.ocr_processed
+    assert second.extracted_text == "Employee: Jane Roe\nNet Pay: 4,000"
+    assert second.metadata["ai_extracted"]["net_pay"] == 4000.0
@@ -0,0 +1,128 @@
+"""
+Download endpoint tests: decrypting streams, byte ranges and conditional GETs.
+"""
+import pytest
+
+from core.utils.http import RangeNotSatisfiable, parse_byte_range
+
+from .helpers import DOCUMENTS_URL, make_pdf
+
+
+def _body(response) -> bytes:
+    return b"".join(response.streaming_content)
+
+
+@pytest.fixture
+def stored(vault_settings, upload):
+    content = make_pdf(pages=8)
+    return upload(content), content
+
+
+@pytest.mark.django_db
+def test_full_download(auth_client, stored):
+    doc, content = stored
+    response = auth_client.get(f"{DOCUMENTS_URL}{doc.pk}/download/")
+    assert response.status_code == 200
+    assert _body(response) == content
+    assert response["Content-Length"] == str(len(content))
+    assert response["Accept-Ranges"] == "bytes"
+    assert response["ETag"] == f'"{doc.checksum}"'
+    assert response["Content-Disposition"] == 'attachment; filename="file.pdf"'
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("header,start,end", [
+    ("bytes=1000-2999", 1000, 2999),     # crosses vault segment boundaries
+    ("bytes=0-0", 0, 0),
+    ("bytes=-100", None, None),          # suffix
+    ("bytes=2048-", 2048, None),         # open-ended
+])
+def test_range_download(auth_client, stored, header, start, end):
+    doc, content = stored
+    if start is None:
+        start, end = len(content) - 100, len(content) - 1
+    end = len(content) - 1 if end is None else end
+
+    response = auth_client.get(f"{DOCUMENTS_URL}{doc.pk}/download/", HTTP_RANGE=header)
+    assert response.status_code == 206
+    assert _body(response) == content[start:end + 1]
+    assert response["Content-Range"] == f"bytes {start}-{end}/{len(content)}"
+    assert response["Content-Length"] == str(end - start + 1)
+
+
+@pytest.mark.django_db
+def test_range_past_the_end_is_416(auth_client, stored):
+    doc, content = stored
+    response = auth_client.get(f"{DOCUMENTS_URL}{doc.pk}/download/", HTTP_RANGE=f"bytes={len(content)}-")
+    assert response.status_code == 416
+    assert response["Content-Range"] == f"bytes */{len(content)}"
+
+
+@pytest.mark.django_db
+def test_malformed_range_serves_everything(auth_client, stored):
+    doc, content = stored
+    response = auth_client.get(f"{DOCUMENTS_URL}{doc.pk}/download/", HTTP_RANGE="bytes=0-1,5-9")
+    assert response.status_code == 200
+    assert _body(response) == content
+
+
+@pytest.mark.django_db
+def test_if_none_match(auth_client, stored):
+    doc, _ = stored
+    url = f"{DOCUMENTS_URL}{doc.pk}/download/"
+    response = auth_client.get(url, HTTP_IF_NONE_MATCH=f'"{doc.checksum}"')
+    assert response.status_code == 304
+    assert response["ETag"] == f'"{doc.checksum}"'
+    assert auth_client.get(url, HTTP_IF_NONE_MATCH='"stale"').status_code == 200
+
+
+@pytest.mark.django_db
+def test_if_range(auth_client, stored):
+    doc, content = stored
+    url = f"{DOCUMENTS_URL}{doc.pk}/download/"
+
+    current = auth_client.get(url, HTTP_RANGE="bytes=5-9", HTTP_IF_RANGE=f'"{doc.checksum}"')
+    assert current.status_code == 206
+    assert _body(current) == content[5:10]
+
+    changed = auth_client.get(url, HTTP_RANGE="bytes=5-9", HTTP_IF_RANGE='"older"')
+    assert changed.status_code == 200
+    assert _body(changed) == content
+
+
+@pytest.mark.django_db
+def test_other_companies_documents_are_hidden(api_client, stored):
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from apps.accounts.models import User
+    from apps.companies.models import Company
+
+    doc, _ = stored
+    other = Company.objects.create(name="Other Ltd", company_type="sme", email="o@other.com", phone="1")
+    outsider = User.objects.create_user(
+        email="admin@other.com", password="TestP@ssword123", first_name="O", last_name="U",
+        role=User.Role.COMPANY_ADMIN, company=other, must_change_password=False,
+    )
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(outsider).access_token}")
+    assert api_client.get(f"{DOCUMENTS_URL}{doc.pk}/download/").status_code == 404
+
+
+@pytest.mark.parametrize("header,expected", [
+    (None, None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=90-200", (90, 99)),      # end clamped to the body
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+    ("bytes=50-", (50, 99)),
+    ("bytes=9-3", None),             # inverted: ignored
+    ("bytes=0-1,5-6", None),         # several ranges: ignored
+    ("items=0-5", None),
+])
+def test_parse_byte_range(header, expected):
+    assert parse_byte_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=-0"])
+def test_parse_byte_range_not_satisfiable(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_byte_range(header, 100)
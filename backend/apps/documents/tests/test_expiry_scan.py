@@ -0,0 +1,118 @@
+"""
+Daily expiry scan tests: the job_checkpoints watermark makes each run cover
+every day since the last one, so missed beats catch up instead of losing
+reminders.
+"""
+from datetime import date
+
+import pytest
+from freezegun import freeze_time
+
+from apps.documents.tasks import EXPIRY_SCAN_JOB, check_document_expiries
+
+
+@pytest.fixture
+def make_document(company):
+    from apps.documents.models import Document
+
+    def _make(title: str, expiry_date: date, company=company):
+        # Created before the first scan, so saving doesn't already mark it expired.
+        with freeze_time("2024-05-01"):
+            return Document.objects.create(
+                company=company, title=title, expiry_date=expiry_date, status="active", document_type="other",
+                file="documents/x.pdf", file_name="x.pdf", file_size=1, mime_type="application/pdf",
+            )
+
+    return _make
+
+
+@pytest.fixture
+def digests(monkeypatch):
+    """Digests the scan queues, as {company_id: {document_id: days_left}} per run."""
+    from apps.notifications.tasks import send_expiry_digest
+
+    queued = []
+    monkeypatch.setattr(send_expiry_digest, "delay", lambda company_id, docs: queued[-1].update({company_id: docs}))
+
+    def _run(day: str) -> dict:
+        queued.append({})
+        with freeze_time(day):
+            check_document_expiries()
+        return queued[-1]
+
+    return _run
+
+
+def _status(doc) -> str:
+    doc.refresh_from_db(fields=["status"])
+    return doc.status
+
+
+@pytest.mark.django_db(transaction=True)
+def test_first_run_marks_past_due_and_reminds_for_today(company, make_document, digests):
+    overdue = make_document("Overdue", date(2024, 5, 15))
+    week = make_document("Week", date(2024, 6, 8))
+    month = make_document("Month", date(2024, 7, 1))
+    make_document("Between", date(2024, 6, 20))
+    make_document("Later", date(2024, 9, 1))
+
+    assert digests("2024-06-01") == {str(company.pk): {str(week.pk): 7, str(month.pk): 30}}
+    assert _status(overdue) == "expired"
+    assert _status(week) == "active"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_same_day_rerun_does_nothing(make_document, digests):
+    make_document("Week", date(2024, 6, 8))
+    assert digests("2024-06-01")
+    assert digests("2024-06-01") == {}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_missed_days_are_caught_up(company, make_document, digests):
+    from core.models import JobCheckpoint
+
+    digests("2024-06-01")
+    lapsed = make_document("Lapsed", date(2024, 6, 2))
+    missed = make_document("Missed", date(2024, 6, 10))       # 7-day reminder was due on 06-03
+    reminded = make_document("Reminded", date(2024, 6, 8))    # already reminded on 06-01
+    today = make_document("Today", date(2024, 7, 4))
+
+    assert digests("2024-06-04") == {str(company.pk): {str(missed.pk): 6, str(today.pk): 30}}
+    assert _status(lapsed) == "expired"
+    assert _status(reminded) == "active"
+    assert JobCheckpoint.objects.get(name=EXPIRY_SCAN_JOB).cursor == "2024-06-04"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_long_gap_sends_the_nearer_reminder_once(company, make_document, digests):
+    digests("2024-06-01")
+    doc = make_document("Both", date(2024, 7, 5))
+    assert digests("2024-07-01") == {str(company.pk): {str(doc.pk): 4}}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_one_digest_per_company(company, make_document, digests):
+    from apps.companies.models import Company
+
+    other = Company.objects.create(name="Other Ltd", company_type="sme", email="o@other.com", phone="1")
+    ours = make_document("Ours", date(2024, 6, 8))
+    theirs = make_document("Theirs", date(2024, 6, 8), company=other)
+
+    assert digests("2024-06-01") == {
+        str(company.pk): {str(ours.pk): 7},
+        str(other.pk): {str(theirs.pk): 7},
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_scan_rolls_document_counters_forward(company, make_document, digests):
+    from apps.documents.models import DocumentStats
+
+    make_document("Overdue", date(2024, 5, 15))
+    make_document("Soon", date(2024, 6, 20))
+    make_document("Later", date(2024, 9, 1))
+
+    digests("2024-06-01")
+    stats = DocumentStats.objects.get(company=company)
+    assert (stats.total, stats.expired, stats.expiring_soon, stats.as_of) == (3, 1, 1, date(2024, 6, 1))
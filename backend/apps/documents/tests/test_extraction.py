@@ -0,0 +1,56 @@
+"""
+Field extraction rule engine tests. Pure text in, fields out; no database.
+"""
+import pytest
+
+from apps.documents.extraction import RULESET_VERSION, Rule, RuleSet, extract_fields
+
+
+def test_value_stops_at_next_label():
+    result = extract_fields("Employee Name: John Smith Start Date: 01/02/2020 Salary: 5,000")
+    assert result.as_dict() == {
+        "name": "John Smith",
+        "start_date": "01/02/2020",
+        "salary": 5000.0,
+        "contract_end": None,
+    }
+    assert result.fields["name"].start == 15
+    assert result.fields["name"].end == 25
+
+
+def test_value_that_is_only_a_label_is_dropped():
+    result = extract_fields("Name: Start Date: 01/02/2020")
+    assert result.as_dict()["name"] is None
+    assert result.as_dict()["start_date"] == "01/02/2020"
+
+
+def test_one_field_per_line():
+    text = "Employee: Jane Roe\nGross Salary: $4,500.00\nEnd Date: 2024-12-31"
+    result = extract_fields(text, document_type="payslip")
+    assert result.as_dict()["name"] == "Jane Roe"
+    assert result.as_dict()["salary"] == 4500.0
+    assert result.as_dict()["contract_end"] == "2024-12-31"
+    salary = result.fields["salary"]
+    assert text[salary.start:salary.end] == "$4,500.00"
+
+
+def test_labelled_rule_beats_weak_hint():
+    result = extract_fields("Bonus $12 paid. Monthly Salary: 3,000")
+    assert result.fields["salary"].value == 3000.0
+    assert result.fields["salary"].confidence == 0.9
+
+
+def test_country_rules():
+    assert extract_fields("KRA PIN: A123456789Z", country="ke").as_dict()["tax_id"] == "A123456789Z"
+    assert "tax_id" not in extract_fields("KRA PIN: A123456789Z").as_dict()
+
+
+def test_metadata_is_versioned():
+    metadata = extract_fields("Salary: 5,000").to_metadata()
+    assert metadata["version"] == RULESET_VERSION
+    assert metadata["fields"]["salary"] == {"value": 5000.0, "confidence": 0.9, "span": [8, 13]}
+
+
+def test_capturing_groups_rejected():
+    with pytest.raises(ValueError):
+        RuleSet([Rule("code", r"(\d+)", label="Code")])
@@ -0,0 +1,125 @@
+"""
+OCR engine tests. Tesseract is replaced by a stand-in (`_ocr_page` and the
+version probe are patched), so these run without the binary.
+"""
+import io
+
+import pytest
+
+from apps.documents import ocr
+from apps.documents.models import OCRPageCache
+
+
+def _scanned_pdf(pages: int) -> bytes:
+    """A PDF whose pages are images only (no text layer), like a scan."""
+    import fitz  # PyMuPDF
+    from PIL import Image, ImageDraw
+
+    pdf = fitz.open()
+    for i in range(pages):
+        image = Image.new("L", (850, 1100), 255)
+        ImageDraw.Draw(image).text((100, 100), f"scanned page {i}", fill=0)
+        buf = io.BytesIO()
+        image.save(buf, format="PNG")
+        page = pdf.new_page(width=612, height=792)
+        page.insert_image(page.rect, stream=buf.getvalue())
+    return pdf.tobytes()
+
+
+def _text_pdf() -> bytes:
+    import fitz  # PyMuPDF
+
+    pdf = fitz.open()
+    pdf.new_page().insert_text((72, 72), "Employment contract between the employer and the employee")
+    return pdf.tobytes()
+
+
+@pytest.fixture
+def tesseract(monkeypatch):
+    """Counts OCR calls; each returns text naming its page image size."""
+    calls = []
+
+    def fake_ocr_page(image, dpi, target_dpi):
+        calls.append(dpi)
+        return f"ocr text {len(calls)} {image.size}"
+
+    monkeypatch.setattr(ocr, "_ocr_page", fake_ocr_page)
+    monkeypatch.setattr("pytesseract.get_tesseract_version", lambda: "5.3.0")
+    return calls
+
+
+@pytest.mark.django_db
+def test_second_pass_reads_page_cache(tesseract, settings):
+    settings.OCR_CACHE_MAX_MB = 16
+    data = _scanned_pdf(pages=3)
+
+    first = ocr.OCREngine(max_workers=2).extract(data, "application/pdf")
+    assert len(tesseract) == 3
+    assert OCRPageCache.objects.count() == 3
+
+    second = ocr.OCREngine(max_workers=2).extract(data, "application/pdf")
+    assert len(tesseract) == 3, "second pass must not OCR again"
+    assert second == first
+
+
+@pytest.mark.django_db
+def test_text_layer_pdf_needs_no_tesseract(monkeypatch, settings):
+    import pytesseract
+
+    def missing():
+        raise pytesseract.TesseractNotFoundError()
+
+    settings.OCR_CACHE_MAX_MB = 16
+    monkeypatch.setattr(pytesseract, "get_tesseract_version", missing)
+    text = ocr.OCREngine().extract(_text_pdf(), "application/pdf")
+    assert "Employment contract" in text
+
+
+@pytest.mark.django_db
+def test_page_error_falls_back_per_page(monkeypatch, settings):
+    import pytesseract
+
+    def flaky(image, dpi, target_dpi):
+        if flaky.calls == 0:
+            flaky.calls += 1
+            raise pytesseract.TesseractError(1, "Image too small to scale")
+        flaky.calls += 1
+        return "page text"
+
+    flaky.calls = 0
+    settings.OCR_CACHE_MAX_MB = 0
+    monkeypatch.setattr(ocr, "_ocr_page", flaky)
+    text = ocr.OCREngine(max_workers=1).extract(_scanned_pdf(pages=2), "application/pdf")
+    assert text.split("\n") == ["", "page text"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("message", [
+    "Failed loading language 'xyz'",   # broken language data: every page would fail
+    "Image too small to scale",        # a page error, but on every page
+])
+def test_document_wide_tesseract_failures_raise(monkeypatch, settings, message):
+    import pytesseract
+
+    def broken(image, dpi, target_dpi):
+        raise pytesseract.TesseractError(1, message)
+
+    settings.OCR_CACHE_MAX_MB = 0
+    monkeypatch.setattr(ocr, "_ocr_page", broken)
+    with pytest.raises(pytesseract.TesseractError):
+        ocr.OCREngine(max_workers=2).extract(_scanned_pdf(pages=3), "application/pdf")
+
+
+@pytest.mark.django_db
+def test_system_error_raises_even_if_other_pages_succeed(monkeypatch, settings):
+    def out_of_memory_once(image, dpi, target_dpi):
+        out_of_memory_once.calls += 1
+        if out_of_memory_once.calls == 2:
+            raise MemoryError()
+        return "page text"
+
+    out_of_memory_once.calls = 0
+    settings.OCR_CACHE_MAX_MB = 0
+    monkeypatch.setattr(ocr, "_ocr_page", out_of_memory_once)
+    with pytest.raises(MemoryError):
+        ocr.OCREngine(max_workers=1).extract(_scanned_pdf(pages=3), "application/pdf")
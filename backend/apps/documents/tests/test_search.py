@@ -0,0 +1,119 @@
+"""
+Full-text search tests. Documents are indexed by signals as they are saved,
+so these create rows directly instead of going through OCR.
+"""
+import pytest
+
+from apps.documents.search import search_documents
+
+from .helpers import DOCUMENTS_URL
+
+SEARCH_URL = f"{DOCUMENTS_URL}search/"
+
+
+@pytest.fixture
+def make_document(company):
+    from apps.documents.models import Document
+
+    def _make(title: str, text: str = "", company=company, **fields):
+        return Document.objects.create(
+            company=company, title=title, extracted_text=text, ocr_processed=bool(text),
+            document_type=fields.pop("document_type", "other"), file="documents/x.pdf",
+            file_name=fields.pop("file_name", "x.pdf"), file_size=1, mime_type="application/pdf", **fields,
+        )
+
+    return _make
+
+
+def _ids(hits) -> list:
+    return [hit.document_id for hit in hits]
+
+
+@pytest.mark.django_db
+def test_every_word_must_match(company, make_document):
+    both = make_document("Contract", "The probation period is three months.")
+    make_document("Policy", "No probation applies to contractors.")
+    make_document("Letter", "Your notice period is one month.")
+
+    assert _ids(search_documents(company.pk, "probation period")[:10]) == [both.pk]
+    assert search_documents(company.pk, "probation").count() == 2
+
+
+@pytest.mark.django_db
+def test_quoted_phrase(company, make_document):
+    phrase = make_document("A", "Employees must give a notice period of 30 days.")
+    make_document("B", "The period of notice is set out below.")
+
+    assert _ids(search_documents(company.pk, '"notice period"')[:10]) == [phrase.pk]
+
+
+@pytest.mark.django_db
+def test_title_matches_rank_above_body_matches(company, make_document):
+    in_body = make_document("Handbook", "Section 4 covers the payroll calendar.")
+    in_title = make_document("Payroll calendar 2024", "Dates for the year.")
+
+    assert _ids(search_documents(company.pk, "payroll")[:10]) == [in_title.pk, in_body.pk]
+
+
+@pytest.mark.django_db
+def test_snippet_is_escaped_and_highlighted(company, make_document):
+    make_document("Note", "Salary <script>alert(1)</script> review")
+
+    (hit,) = search_documents(company.pk, "salary")[:10]
+    assert "<mark>Salary</mark>" in hit.snippet
+    assert "<script>" not in hit.snippet
+    assert "&lt;script&gt;" in hit.snippet
+
+
+@pytest.mark.django_db
+def test_index_follows_ocr_and_deletion(company, make_document):
+    doc = make_document("Scan")
+    assert search_documents(company.pk, "gratuity").count() == 0
+
+    doc.extracted_text = "End of service gratuity schedule"
+    doc.save(update_fields=["extracted_text"])
+    assert _ids(search_documents(company.pk, "gratuity")[:10]) == [doc.pk]
+
+    doc.delete()
+    assert search_documents(company.pk, "gratuity").count() == 0
+
+
+@pytest.mark.django_db
+def test_results_are_scoped_to_the_company(company, make_document):
+    from apps.companies.models import Company
+
+    other = Company.objects.create(name="Other Ltd", company_type="sme", email="o@other.com", phone="1")
+    make_document("Pension scheme", company=other)
+
+    assert search_documents(company.pk, "pension").count() == 0
+    assert search_documents(other.pk, "pension").count() == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("query", ['"', 'NEAR(a b)', "salary AND", "col:umn", "*"])
+def test_query_syntax_is_treated_as_text(company, make_document, query):
+    make_document("Salary", "salary review")
+    results = search_documents(company.pk, query)
+    assert results.count() == 0
+    assert results[:10] == []
+
+
+@pytest.mark.django_db
+def test_search_endpoint(auth_client, make_document):
+    docs = [make_document(f"Audit report {i}", "Findings of the external audit.") for i in range(3)]
+    make_document("Unrelated")
+
+    response = auth_client.get(SEARCH_URL, {"q": "audit", "page_size": 2})
+    assert response.status_code == 200
+    assert response.data["count"] == 3
+    assert len(response.data["results"]) == 2
+    result = response.data["results"][0]
+    assert result["id"] in {str(doc.pk) for doc in docs}
+    assert result["rank"] > 0
+    assert "<mark>" in result["highlight"]
+
+
+@pytest.mark.django_db
+def test_search_requires_q(auth_client):
+    assert auth_client.get(SEARCH_URL).status_code == 400
+    assert auth_client.get(SEARCH_URL, {"q": "  "}).status_code == 400
@@ -0,0 +1,162 @@
+"""
+Near-duplicate detection tests: MinHash estimates, the LSH index kept by
+signals, similar-document lookups and the nightly clustering.
+"""
+import random
+
+import pytest
+
+from apps.documents import similarity
+from apps.documents.similarity import (
+    find_duplicate_clusters,
+    minhash,
+    shingle_hashes,
+    similar_documents,
+)
+
+from .helpers import DOCUMENTS_URL
+
+WORDS = (
+    "employer employee agreement salary shall month notice period probation leave annual "
+    "company policy terminate contract clause duties hours overtime benefit pension tax "
+    "deduction allowance schedule review performance confidential property rights law"
+).split()
+
+
+def _text(seed: int, words: int = 300) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _rescan(text: str, seed: int, share: float) -> str:
+    """The same text with `share` of its words misread, as a second OCR run might."""
+    rng = random.Random(seed)
+    words = text.split()
+    for i in rng.sample(range(len(words)), int(len(words) * share)):
+        words[i] = f"x{rng.randrange(10**6)}"
+    return " ".join(words)
+
+
+def _jaccard(a: str, b: str) -> float:
+    sa, sb = set(shingle_hashes(a).tolist()), set(shingle_hashes(b).tolist())
+    return len(sa & sb) / len(sa | sb)
+
+
+@pytest.fixture
+def make_document(company):
+    from apps.documents.models import Document
+
+    def _make(text: str, title: str = "Scan", company=company):
+        return Document.objects.create(
+            company=company, title=title, extracted_text=text, ocr_processed=True,
+            document_type="other", file="documents/x.pdf", file_name="x.pdf", file_size=1,
+            mime_type="application/pdf",
+        )
+
+    return _make
+
+
+@pytest.mark.parametrize("share", [0.02, 0.1, 0.3])
+def test_minhash_estimates_jaccard(share):
+    original = _text(1)
+    copy = _rescan(original, 2, share)
+    estimate = similarity.similarity(minhash(original)[0], minhash(copy)[0])
+    assert abs(estimate - _jaccard(original, copy)) < 0.12
+
+
+def test_short_text_has_no_signature():
+    signature, shingles = minhash("Payslip March 2024")
+    assert signature is None
+    assert shingles < similarity.MIN_SHINGLES
+
+
+def test_signatures_are_stable_across_calls():
+    text = _text(3)
+    assert (minhash(text)[0] == minhash(text)[0]).all()
+
+
+@pytest.mark.django_db
+def test_signature_follows_ocr_text(make_document):
+    from apps.documents.models import DocumentLSHBucket, DocumentSignature
+
+    doc = make_document(_text(1))
+    assert DocumentSignature.objects.filter(document=doc).exists()
+    assert DocumentLSHBucket.objects.filter(document=doc).count() == similarity.BANDS
+
+    doc.extracted_text = "too short"
+    doc.save(update_fields=["extracted_text"])
+    assert not DocumentSignature.objects.filter(document=doc).exists()
+    assert not DocumentLSHBucket.objects.filter(document=doc).exists()
+
+
+@pytest.mark.django_db
+def test_similar_documents(make_document, company):
+    from apps.companies.models import Company
+
+    original = make_document(_text(1))
+    rescan = make_document(_rescan(_text(1), 2, 0.02))
+    make_document(_text(99))
+    other = Company.objects.create(name="Other Ltd", company_type="sme", email="o@other.com", phone="1")
+    make_document(_text(1), company=other)
+
+    hits = similar_documents(original)
+    assert [hit.document_id for hit in hits] == [rescan.pk]
+    assert hits[0].similarity >= similarity.DUPLICATE_SIMILARITY
+
+
+@pytest.mark.django_db
+def test_similar_documents_without_signature(make_document):
+    assert similar_documents(make_document("only a few words")) is None
+
+
+@pytest.mark.django_db
+def test_clusters_group_near_duplicates_under_the_earliest(make_document, company):
+    from apps.documents.models import DocumentSignature
+
+    first = make_document(_text(1))
+    copies = [make_document(_rescan(_text(1), seed, 0.02)) for seed in (2, 3)]
+    pair = [make_document(_text(5)), make_document(_rescan(_text(5), 6, 0.02))]
+    loner = make_document(_text(9))
+
+    assert find_duplicate_clusters(company.pk) == 2
+    clusters = dict(DocumentSignature.objects.values_list("document_id", "cluster_id"))
+    assert {clusters[d.pk] for d in [first, *copies]} == {first.pk}
+    assert {clusters[d.pk] for d in pair} == {pair[0].pk}
+    assert clusters[loner.pk] is None
+
+    # Re-running after a member changes drops stale assignments.
+    pair[1].extracted_text = _text(7)
+    pair[1].save(update_fields=["extracted_text"])
+    assert find_duplicate_clusters(company.pk) == 1
+    assert DocumentSignature.objects.get(document=pair[0]).cluster_id is None
+
+
+@pytest.mark.django_db
+def test_clusters_join_through_shared_members(make_document, company, monkeypatch):
+    """Documents linked only through others still end up in one cluster, with few representatives per bucket."""
+    from apps.documents.models import DocumentSignature
+
+    monkeypatch.setattr(similarity, "MAX_BUCKET_REPRESENTATIVES", 2)
+    base = _text(1)
+    docs = [make_document(_rescan(base, seed, 0.03)) for seed in range(8)]
+    assert find_duplicate_clusters(company.pk) == 1
+    assert set(DocumentSignature.objects.values_list("cluster_id", flat=True)) == {docs[0].pk}
+
+
+@pytest.mark.django_db
+def test_similar_endpoint(auth_client, make_document):
+    original = make_document(_text(1))
+    rescan = make_document(_rescan(_text(1), 2, 0.02))
+    url = f"{DOCUMENTS_URL}{original.pk}/similar/"
+
+    response = auth_client.get(url)
+    assert response.status_code == 200
+    assert [item["id"] for item in response.data] == [str(rescan.pk)]
+    assert response.data[0]["similarity"] >= 0.7
+
+    assert auth_client.get(url, {"min_similarity": "0.5"}).status_code == 200
+    for bad in ("0.3", "1.5", "high"):
+        assert auth_client.get(url, {"min_similarity": bad}).status_code == 400
+
+    short = make_document("only a few words")
+    assert auth_client.get(f"{DOCUMENTS_URL}{short.pk}/similar/").status_code == 409
@@ -0,0 +1,158 @@
+"""
+Document counter tests: signals keep document_stats in step with each
+save and delete, and a stale or missing row is recounted on first read.
+"""
+from datetime import date, timedelta
+
+import pytest
+from django.utils import timezone
+
+from apps.documents.stats import classify, get_stats, recompute
+
+from .helpers import DOCUMENTS_URL
+
+TODAY = date(2024, 6, 1)
+
+
+@pytest.fixture
+def make_document(company):
+    from apps.documents.models import Document
+
+    def _make(expiry_days: int | None = None, status: str = "active", company=company):
+        expiry_date = None if expiry_days is None else timezone.now().date() + timedelta(days=expiry_days)
+        return Document.objects.create(
+            company=company, title="Doc", expiry_date=expiry_date, status=status, document_type="other",
+            file="documents/x.pdf", file_name="x.pdf", file_size=1, mime_type="application/pdf",
+        )
+
+    return _make
+
+
+def _counts(company) -> tuple[int, int, int]:
+    stats = get_stats(company.pk)
+    return stats.total, stats.expired, stats.expiring_soon
+
+
+def _recounted(company) -> tuple[int, int, int]:
+    from apps.documents.models import DocumentStats
+
+    DocumentStats.objects.filter(company=company).delete()
+    return _counts(company)
+
+
+@pytest.mark.parametrize("status,expiry_date,expected", [
+    ("active", None, (1, 0, 0)),
+    ("active", TODAY + timedelta(days=30), (1, 0, 1)),
+    ("active", TODAY + timedelta(days=31), (1, 0, 0)),
+    ("pending", TODAY + timedelta(days=5), (1, 0, 0)),
+    ("expired", TODAY - timedelta(days=1), (1, 1, 0)),
+    ("archived", TODAY - timedelta(days=1), (1, 0, 0)),
+])
+def test_classify(status, expiry_date, expected):
+    assert classify(status, expiry_date, TODAY) == expected
+
+
+@pytest.mark.django_db
+def test_first_read_counts_the_company(company, make_document):
+    from apps.documents.models import DocumentStats
+
+    make_document()
+    make_document(expiry_days=10)
+    make_document(expiry_days=-3)     # marked expired as it is saved
+    assert not DocumentStats.objects.exists()
+    assert _counts(company) == (3, 1, 1)
+    assert DocumentStats.objects.get().as_of == timezone.now().date()
+
+
+@pytest.mark.django_db
+def test_signals_apply_deltas(company, make_document):
+    from apps.documents.models import Document
+
+    _counts(company)
+    doc = make_document(expiry_days=60)
+    assert _counts(company) == (1, 0, 0)
+
+    doc.expiry_date = timezone.now().date() + timedelta(days=10)
+    doc.save(update_fields=["expiry_date"])
+    assert _counts(company) == (1, 0, 1)
+
+    doc.status = Document.Status.ARCHIVED
+    doc.save()
+    assert _counts(company) == (1, 0, 0)
+
+    expired = make_document(expiry_days=-1)
+    assert _counts(company) == (2, 1, 0)
+
+    expired.delete()
+    doc.delete()
+    assert _counts(company) == (0, 0, 0)
+
+
+@pytest.mark.django_db
+def test_saves_that_cannot_change_the_counters_are_skipped(company, make_document, monkeypatch):
+    from apps.documents import stats
+    from apps.documents.models import Document
+
+    doc = make_document(expiry_days=10)
+    _counts(company)
+    with monkeypatch.context() as patched:
+        patched.setattr(stats, "apply_delta", lambda *args: pytest.fail("counters touched"))
+        doc.title = "Renamed"
+        doc.save(update_fields=["title"])
+
+    # Deferred fields leave the previous state unknown; the signal doesn't guess.
+    partial = Document.objects.only("id", "company_id", "title").get(pk=doc.pk)
+    partial.save()
+    assert _counts(company) == _recounted(company) == (1, 0, 1)
+
+
+@pytest.mark.django_db
+def test_counters_are_per_company(company, make_document):
+    from apps.companies.models import Company
+
+    other = Company.objects.create(name="Other Ltd", company_type="sme", email="o@other.com", phone="1")
+    make_document(company=other)
+    make_document(expiry_days=-1, company=other)
+    make_document()
+    assert _counts(company) == (1, 0, 0)
+    assert _counts(other) == (2, 1, 0)
+
+
+@pytest.mark.django_db
+def test_stale_row_is_recounted_on_read(company, make_document):
+    from apps.documents.models import DocumentStats
+
+    make_document(expiry_days=5)
+    recompute([company.pk], today=timezone.now().date() - timedelta(days=20))
+    assert DocumentStats.objects.get().expiring_soon == 1
+
+    # Deltas skip a row that isn't for today...
+    make_document()
+    assert DocumentStats.objects.get().total == 1
+    # ...and the read rolls it forward.
+    assert _counts(company) == (2, 0, 1)
+
+
+@pytest.mark.django_db
+def test_recompute_corrects_drift_from_queryset_updates(company, make_document):
+    from apps.documents.models import Document
+
+    make_document(expiry_days=10)
+    _counts(company)
+    Document.objects.update(status=Document.Status.EXPIRED)
+    assert _counts(company) == (1, 0, 1)
+
+    assert recompute() == 1
+    assert _counts(company) == (1, 1, 0)
+
+
+@pytest.mark.django_db
+def test_list_reports_the_counters(auth_client, make_document):
+    for days in (None, 10, 20, -5):
+        make_document(expiry_days=days)
+
+    response = auth_client.get(DOCUMENTS_URL)
+    assert response.status_code == 200
+    assert response.data["count"] == 4
+    assert response.data["expired_count"] == 1
+    assert response.data["expiring_soon"] == 2
@@ -0,0 +1,158 @@
+"""
+Resumable upload session tests: chunks are encrypted as they arrive and
+concatenated into one vault container on finalize.
+"""
+import hashlib
+import os
+
+import pytest
+
+from .helpers import DOCUMENTS_URL, make_pdf
+
+SESSIONS_URL = f"{DOCUMENTS_URL}upload-sessions/"
+
+
+@pytest.fixture
+def content():
+    return make_pdf(pages=40)
+
+
+@pytest.fixture
+def session(vault_settings, auth_client, content):
+    response = auth_client.post(SESSIONS_URL, {
+        "file_name": "big.pdf",
+        "total_size": len(content),
+        "expected_sha256": hashlib.sha256(content).hexdigest(),
+        "document": {"title": "Big", "document_type": "audit_report"},
+    }, format="json")
+    assert response.status_code == 201, response.data
+    return response.data
+
+
+def _put(client, session, index: int, body: bytes, **headers):
+    return client.put(
+        f"{SESSIONS_URL}{session['id']}/chunks/{index}/", body,
+        content_type="application/octet-stream", **headers,
+    )
+
+
+def _chunk(content: bytes, session, index: int) -> bytes:
+    size = session["chunk_size"]
+    return content[index * size:(index + 1) * size]
+
+
+def _send_all(client, session, content: bytes, order=None):
+    for index in order or range(session["chunk_count"]):
+        response = _put(client, session, index, _chunk(content, session, index))
+        assert response.status_code == 200, response.data
+
+
+@pytest.mark.django_db
+def test_chunks_in_any_order_assemble_the_file(auth_client, session, content):
+    from apps.documents.models import Document
+
+    # Chunks are whole vault segments, so each encrypts on its own.
+    assert session["chunk_size"] % 1024 == 0
+    assert session["chunk_count"] == -(-len(content) // session["chunk_size"]) > 2
+    _send_all(auth_client, session, content, order=reversed(range(session["chunk_count"])))
+    status = auth_client.get(f"{SESSIONS_URL}{session['id']}/").data
+    assert status["received_chunks"] == list(range(session["chunk_count"]))
+
+    response = auth_client.post(f"{SESSIONS_URL}{session['id']}/finalize/")
+    assert response.status_code == 201, response.data
+    doc = Document.objects.get(pk=response.data["id"])
+    assert (doc.title, doc.document_type, doc.mime_type, doc.file_size) == (
+        "Big", "audit_report", "application/pdf", len(content),
+    )
+    download = auth_client.get(f"{DOCUMENTS_URL}{doc.pk}/download/")
+    assert b"".join(download.streaming_content) == content
+
+    again = auth_client.post(f"{SESSIONS_URL}{session['id']}/finalize/")
+    assert again.status_code == 400
+
+
+@pytest.mark.django_db
+def test_identical_resend_is_a_retry(auth_client, session, content):
+    first = _put(auth_client, session, 0, _chunk(content, session, 0))
+    again = _put(auth_client, session, 0, _chunk(content, session, 0))
+    assert again.status_code == 200
+    assert again.data == first.data
+
+
+@pytest.mark.django_db
+def test_resend_with_different_content_is_rejected(auth_client, session, content):
+    """Segment nonces depend on the chunk index, so an index must never be encrypted twice with different bytes."""
+    from apps.documents.models import UploadChunk
+
+    original = _chunk(content, session, 0)
+    _put(auth_client, session, 0, original)
+    stored = UploadChunk.objects.get(session_id=session["id"], index=0)
+
+    altered = bytes([original[0] ^ 1]) + original[1:]
+    response = _put(auth_client, session, 0, altered)
+    assert response.status_code == 400
+    assert "different content" in str(response.data)
+    assert UploadChunk.objects.get(session_id=session["id"], index=0).file.name == stored.file.name
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("body", [b"", b"too short"])
+def test_chunk_of_the_wrong_size_is_rejected(auth_client, session, body):
+    response = _put(auth_client, session, 0, body)
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_last_chunk_must_end_the_file(auth_client, session, content):
+    last = session["chunk_count"] - 1
+    response = _put(auth_client, session, last, _chunk(content, session, last) + b"extra")
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_chunk_index_out_of_range(auth_client, session):
+    response = _put(auth_client, session, session["chunk_count"], b"x")
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_declared_chunk_checksum_is_verified(auth_client, session, content):
+    chunk = _chunk(content, session, 0)
+    bad = _put(auth_client, session, 0, chunk, HTTP_X_CHUNK_SHA256="0" * 64)
+    assert bad.status_code == 400
+    good = _put(auth_client, session, 0, chunk, HTTP_X_CHUNK_SHA256=hashlib.sha256(chunk).hexdigest())
+    assert good.status_code == 200
+
+
+@pytest.mark.django_db
+def test_finalize_reports_missing_chunks(auth_client, session, content):
+    _put(auth_client, session, 1, _chunk(content, session, 1))
+    response = auth_client.post(f"{SESSIONS_URL}{session['id']}/finalize/")
+    assert response.status_code == 400
+    assert response.data["detail"]["missing_chunks"][:2] == ["0", "2"]
+
+
+@pytest.mark.django_db
+def test_finalize_checks_expected_sha256(vault_settings, auth_client, content):
+    response = auth_client.post(SESSIONS_URL, {
+        "file_name": "big.pdf", "total_size": len(content), "expected_sha256": "0" * 64,
+        "document": {"title": "Big", "document_type": "audit_report"},
+    }, format="json")
+    session = response.data
+    _send_all(auth_client, session, content)
+    response = auth_client.post(f"{SESSIONS_URL}{session['id']}/finalize/")
+    assert response.status_code == 400
+    assert "expected_sha256" in str(response.data)
+
+
+@pytest.mark.django_db
+def test_abort_discards_chunks(auth_client, session, content):
+    from apps.documents.models import UploadChunk, UploadSession
+
+    _put(auth_client, session, 0, _chunk(content, session, 0))
+    path = UploadChunk.objects.get(session_id=session["id"]).file.path
+    assert auth_client.delete(f"{SESSIONS_URL}{session['id']}/").status_code == 204
+    assert UploadSession.objects.get(pk=session["id"]).status == UploadSession.Status.ABORTED
+    assert not UploadChunk.objects.filter(session_id=session["id"]).exists()
+    assert not os.path.exists(path)
+    assert _put(auth_client, session, 1, _chunk(content, session, 1)).status_code == 400
@@ -4,6 +4,8 @@ from rest_framework.routers import DefaultRouter
 from . import views
 
 router = DefaultRouter()
+# Registered before the document routes so "upload-sessions" is not read as a document pk.
+router.register("upload-sessions", views.UploadSessionViewSet, basename="upload-session")
 router.register("", views.DocumentViewSet, basename="document")
 
 urlpatterns = [path("", include(router.urls))]
@@ -0,0 +1,535 @@
+"""
+Vault I/O — encrypting uploads into storage and reading plaintext back.
+
+Everything goes through the segmented container in core.utils.encryption, so
+memory per request is bounded by one segment rather than the file size. New
+files are encrypted under the owning company's data key (core.utils.keyring),
+compressed first when their type compresses well.
+Ciphertext that does not fit the spool threshold spills to a temporary file
+(it is already encrypted, so nothing sensitive touches disk).
+"""
+import hashlib
+import itertools
+import tempfile
+from collections.abc import Iterator
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from rest_framework.exceptions import ValidationError
+
+from core.utils.encryption import (
+    HEADER_SIZE,
+    StreamEncryptor,
+    StreamHeader,
+    codec_for,
+    decrypt_file,
+    decrypt_stream,
+    encrypt_file,
+    encrypt_segment,
+    get_stream_key,
+    is_stream_container,
+)
+from core.utils.keyring import active_key_id
+from core.utils.validators import SNIFF_BYTES, validate_upload_mime, validate_upload_size
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class EncryptedUpload(NamedTuple):
+    file: File        # ciphertext, ready to assign to Document.file
+    checksum: str     # SHA-256 of the ciphertext (Document.checksum)
+    size: int         # plaintext size in bytes (Document.file_size)
+    sha256: str       # SHA-256 of the plaintext
+    head: bytes       # first bytes of plaintext, for MIME sniffing
+    codec: str | None = None    # compression applied before encryption
+    stored_size: int = 0        # size of the ciphertext in storage
+    mime_type: str | None = None    # sniffed type, when known at encryption time
+
+
+def _spool():
+    return tempfile.SpooledTemporaryFile(max_size=settings.VAULT_SPOOL_MAX_MEMORY)
+
+
+def ingest_upload(upload, company) -> EncryptedUpload:
+    """
+    Validate, hash and encrypt an UploadedFile in a single pass over its chunks.
+
+    The first chunk is held back only until the type has been sniffed (it
+    picks the compression codec); everything after streams straight through
+    plaintext hashing, compression/encryption under the company's data key
+    and ciphertext hashing into a spooled file.
+    """
+    validate_upload_size(upload.size)
+    chunks = upload.chunks(chunk_size=settings.VAULT_CHUNK_SIZE)
+    pending = []
+    head = b""
+    for chunk in chunks:
+        pending.append(chunk)
+        head += chunk[:SNIFF_BYTES - len(head)]
+        if len(head) >= SNIFF_BYTES:
+            break
+    mime_type = validate_upload_mime(head)
+
+    codec = codec_for(mime_type)
+    encryptor = StreamEncryptor(chunk_size=settings.VAULT_CHUNK_SIZE, key_id=active_key_id(company.pk), codec=codec)
+    spool = _spool()
+    digest = hashlib.sha256()
+    plain_digest = hashlib.sha256()
+    size = stored = 0
+
+    def write(data: bytes) -> None:
+        nonlocal stored
+        if data:
+            digest.update(data)
+            spool.write(data)
+            stored += len(data)
+
+    for chunk in itertools.chain(pending, chunks):
+        size += len(chunk)
+        plain_digest.update(chunk)
+        write(encryptor.update(chunk))
+    write(encryptor.finalize())
+    spool.seek(0)
+
+    return EncryptedUpload(
+        File(spool, name=upload.name), digest.hexdigest(), size, plain_digest.hexdigest(), head,
+        codec, stored, mime_type,
+    )
+
+
+# ─── Resumable upload sessions ────────────────────────────────────────────────
+
+def new_session_header(company) -> bytes:
+    """
+    Container header shared by every chunk of an upload session.
+
+    Session chunks are encrypted independently before the file type is known,
+    so resumable uploads are stored uncompressed.
+    """
+    return StreamHeader.new(chunk_size=settings.VAULT_CHUNK_SIZE, key_id=active_key_id(company.pk)).to_bytes()
+
+
+def session_chunk_size() -> int:
+    """HTTP chunk size for upload sessions, rounded up to whole vault segments."""
+    segment = settings.VAULT_CHUNK_SIZE
+    return -(-settings.UPLOAD_SESSION_CHUNK_SIZE // segment) * segment
+
+
+def encrypt_session_chunk(session, index: int, stream) -> tuple[File, str, int]:
+    """
+    Read chunk `index` of an upload session from `stream` and encrypt it.
+
+    The chunk is written as the run of container segments it occupies in the
+    final file (segment numbers continue across chunks and the very last
+    segment carries the final flag), so finalize only has to concatenate.
+    Segment nonces therefore depend only on the index: the caller must keep
+    the result only if no chunk with different content is stored under
+    `index` already. Returns (ciphertext file, plaintext SHA-256, plaintext size).
+    """
+    header = StreamHeader.from_bytes(bytes(session.header))
+    key = get_stream_key(header.key_id)
+    expected = session.chunk_length(index)
+    segment_index = index * (session.chunk_size // header.chunk_size)
+    is_last_chunk = index == session.chunk_count - 1
+
+    spool = _spool()
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        piece = stream.read(header.chunk_size)
+        if not piece:
+            break
+        # Streams may return short reads; top up to a whole segment.
+        while len(piece) < header.chunk_size:
+            more = stream.read(header.chunk_size - len(piece))
+            if not more:
+                break
+            piece += more
+        size += len(piece)
+        if size > expected:
+            raise ValidationError(f"Chunk {index} must be exactly {expected} bytes.")
+        digest.update(piece)
+        final = is_last_chunk and size == expected
+        spool.write(encrypt_segment(header, key, segment_index, piece, final))
+        segment_index += 1
+
+    if size != expected:
+        raise ValidationError(f"Chunk {index} must be exactly {expected} bytes, got {size}.")
+    spool.seek(0)
+    return File(spool, name=f"{index:06d}.part"), digest.hexdigest(), size
+
+
+def assemble_session(session) -> EncryptedUpload:
+    """
+    Concatenate an upload session's encrypted chunks into one vault container.
+
+    The assembled container is then read back through the normal decrypting
+    reader, which authenticates every segment (including the final flag) and
+    yields the plaintext hash and MIME-sniffing head without holding the file.
+    """
+    spool = _spool()
+    digest = hashlib.sha256()
+
+    def write(data: bytes) -> None:
+        digest.update(data)
+        spool.write(data)
+
+    write(bytes(session.header))
+    for chunk in session.chunks.order_by("index"):
+        with chunk.file.open("rb") as fh:
+            for block in iter(lambda: fh.read(COPY_BUFFER_SIZE), b""):
+                write(block)
+
+    stored_size = spool.tell()
+    spool.seek(0)
+    plain_digest = hashlib.sha256()
+    head = b""
+    size = 0
+    for plaintext in decrypt_stream(spool):
+        size += len(plaintext)
+        plain_digest.update(plaintext)
+        if len(head) < SNIFF_BYTES:
+            head += plaintext[:SNIFF_BYTES - len(head)]
+    spool.seek(0)
+
+    return EncryptedUpload(
+        File(spool, name=session.file_name), digest.hexdigest(), size, plain_digest.hexdigest(), head,
+        stored_size=stored_size,
+    )
+
+
+def discard_session_chunks(session) -> None:
+    """Delete an upload session's encrypted chunk files and rows."""
+    for chunk in session.chunks.all():
+        chunk.file.delete(save=False)
+    session.chunks.all().delete()
+
+
+# ─── Content-addressed blobs ──────────────────────────────────────────────────
+
+def acquire_blob(company, encrypted: EncryptedUpload, mime_type: str):
+    """
+    Return (blob, created) for the upload's plaintext hash, taking a reference.
+
+    A duplicate upload just bumps the existing blob's ref_count and its freshly
+    encrypted copy is dropped without ever reaching storage.
+    """
+    from .models import VaultBlob
+
+    existing = VaultBlob.objects.filter(company=company, sha256=encrypted.sha256)
+    if existing.update(ref_count=F("ref_count") + 1):
+        return existing.get(), False
+
+    blob = VaultBlob(
+        company=company,
+        sha256=encrypted.sha256,
+        checksum=encrypted.checksum,
+        size=encrypted.size,
+        mime_type=mime_type,
+        ref_count=1,
+    )
+    blob.file.save(encrypted.sha256, encrypted.file, save=False)
+    try:
+        with transaction.atomic():
+            blob.save()
+    except IntegrityError:
+        # A concurrent upload of the same content won the race; share its blob.
+        blob.file.delete(save=False)
+        existing.update(ref_count=F("ref_count") + 1)
+        return existing.get(), False
+    return blob, True
+
+
+def release_blob(blob_id) -> None:
+    """Drop one reference to a blob, deleting it when none remain (see purge_blob)."""
+    from .models import VaultBlob
+
+    with transaction.atomic():
+        blob = VaultBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1:
+            VaultBlob.objects.filter(pk=blob_id).update(ref_count=F("ref_count") - 1)
+            return
+        blob.delete()
+
+
+def purge_blob(blob) -> None:
+    """Remove a deleted blob's files and, with the last copy of its content, its OCR cache."""
+    from .models import OCRPageCache, VaultBlob
+
+    # Cached OCR text must not outlive the last copy of the content.
+    if not VaultBlob.objects.filter(sha256=blob.sha256).exists():
+        OCRPageCache.objects.filter(sha256=blob.sha256).delete()
+    names = [f.name for f in (blob.file, blob.thumbnail, blob.page_strip) if f]
+    if names:
+        transaction.on_commit(lambda: [blob.file.storage.delete(name) for name in names])
+
+
+def _blob_document_fields(company, encrypted: EncryptedUpload, mime_type, validated_data) -> tuple:
+    """
+    Acquire the upload's blob and return (blob, created, Document fields).
+
+    When the content was seen before and already OCR'd, its text is copied
+    across (fields are re-extracted for this document's type) so OCR can be
+    skipped. The stored codec and size are recorded under metadata["storage"].
+    """
+    from .extraction import extract_document_fields, extraction_metadata
+    from .models import Document
+
+    blob, created = acquire_blob(company, encrypted, mime_type)
+    if created:
+        storage = {"codec": encrypted.codec, "stored_size": encrypted.stored_size}
+    else:
+        header = stored_header(blob.file)
+        storage = {"codec": header and header.codec, "stored_size": blob.file.size}
+    metadata = {**(validated_data.get("metadata") or {}), "storage": storage}
+    fields = {}
+    if not created and blob.ocr_processed:
+        fields = {
+            "extracted_text": blob.extracted_text,
+            "ocr_processed": True,
+            "status": Document.Status.ACTIVE,
+        }
+        metadata.update(extraction_metadata(extract_document_fields(
+            blob.extracted_text, company, validated_data.get("document_type"),
+        )))
+
+    return blob, created, {
+        "blob": blob,
+        "file": blob.file.name,
+        "file_size": blob.size,
+        "mime_type": mime_type,
+        "is_encrypted": True,
+        "checksum": blob.checksum,
+        "metadata": metadata,
+        **fields,
+    }
+
+
+def store_document(serializer, encrypted: EncryptedUpload, *, company, uploaded_by, file_name, mime_type):
+    """
+    Save a Document for an encrypted upload, deduplicating against the company's blobs.
+
+    Content already OCR'd under another document reuses its text; otherwise
+    OCR is queued once the transaction commits.
+    """
+    from .tasks import process_document_ocr, render_blob_preview
+
+    with transaction.atomic():
+        blob, created, fields = _blob_document_fields(company, encrypted, mime_type, serializer.validated_data)
+        doc = serializer.save(company=company, uploaded_by=uploaded_by, file_name=file_name, **fields)
+        if not doc.ocr_processed:
+            transaction.on_commit(lambda: process_document_ocr.delay(str(doc.id)))
+        if created:
+            transaction.on_commit(lambda: render_blob_preview.delay(str(blob.id)))
+    return doc
+
+
+def store_documents(uploads, *, company, uploaded_by) -> list:
+    """
+    Bulk store_document for (validated metadata serializer, EncryptedUpload,
+    file name) triples: one bulk_create for all rows, and OCR and preview
+    rendering queued as one Celery group each.
+
+    bulk_create sends no post_save, so what the Document receivers do for a
+    single upload (expiry status, counters, search and similarity indexes)
+    is done here.
+    """
+    from celery import group
+    from django.utils import timezone
+
+    from . import search, similarity
+    from .models import Document
+    from .stats import apply_delta, classify
+    from .tasks import process_document_ocr, render_blob_preview
+
+    today = timezone.now().date()
+    docs, new_blobs = [], []
+    with transaction.atomic():
+        for serializer, encrypted, file_name in uploads:
+            blob, created, fields = _blob_document_fields(
+                company, encrypted, encrypted.mime_type, serializer.validated_data,
+            )
+            doc = Document(
+                **{**serializer.validated_data, **fields},
+                company=company, uploaded_by=uploaded_by, file_name=file_name,
+            )
+            if doc.expiry_date and doc.expiry_date < today and doc.status != Document.Status.ARCHIVED:
+                doc.status = Document.Status.EXPIRED
+            docs.append(doc)
+            if created:
+                new_blobs.append(str(blob.id))
+        if not docs:
+            return docs
+
+        Document.objects.bulk_create(docs, batch_size=500)
+        counts = [classify(doc.status, doc.expiry_date, today) for doc in docs]
+        apply_delta(company.pk, None, tuple(map(sum, zip(*counts))))
+        for doc in docs:
+            search.index_document(doc.pk)
+            if doc.ocr_processed:
+                similarity.index_document(doc.pk)
+
+        pending_ocr = [str(doc.id) for doc in docs if not doc.ocr_processed]
+        if pending_ocr:
+            transaction.on_commit(lambda: group(process_document_ocr.s(i) for i in pending_ocr).delay())
+        if new_blobs:
+            transaction.on_commit(lambda: group(render_blob_preview.s(i) for i in new_blobs).delay())
+    return docs
+
+
+def iter_plaintext(doc, start: int = 0, end: int | None = None) -> Iterator[bytes]:
+    """Yield the document's plaintext bytes [start, end] (inclusive), decrypting as it goes."""
+    with doc.file.open("rb") as fh:
+        if doc.is_encrypted:
+            yield from decrypt_stream(fh, start, end)
+            return
+
+        fh.seek(start)
+        remaining = None if end is None else end + 1 - start
+        while remaining is None or remaining > 0:
+            size = settings.VAULT_CHUNK_SIZE if remaining is None else min(remaining, settings.VAULT_CHUNK_SIZE)
+            chunk = fh.read(size)
+            if not chunk:
+                return
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def read_plaintext(doc) -> bytes:
+    """Return the whole decrypted document (for consumers that need random access, e.g. OCR)."""
+    return b"".join(iter_plaintext(doc))
+
+
+def read_blob_plaintext(blob) -> bytes:
+    with blob.file.open("rb") as fh:
+        return b"".join(decrypt_stream(fh))
+
+
+# ─── Key rotation ─────────────────────────────────────────────────────────────
+
+def stored_header(field) -> StreamHeader | None:
+    """Header of a stored vault container (None for legacy Fernet files)."""
+    with field.open("rb") as fh:
+        head = fh.read(HEADER_SIZE)
+    return StreamHeader.from_bytes(head) if is_stream_container(head) else None
+
+
+def _encrypt_plaintext(chunks, key_id: bytes, codec: str | None) -> tuple[File, str, int]:
+    """Encrypt plaintext chunks into a spooled container: (ciphertext file, its SHA-256, plaintext size)."""
+    encryptor = StreamEncryptor(chunk_size=settings.VAULT_CHUNK_SIZE, key_id=key_id, codec=codec)
+    spool = _spool()
+    digest = hashlib.sha256()
+    size = 0
+
+    def write(data: bytes) -> None:
+        if data:
+            digest.update(data)
+            spool.write(data)
+
+    for plaintext in chunks:
+        size += len(plaintext)
+        write(encryptor.update(plaintext))
+    write(encryptor.finalize())
+    spool.seek(0)
+    return File(spool), digest.hexdigest(), size
+
+
+def reencrypt_blob(blob, key_id: bytes) -> int:
+    """
+    Re-encrypt a blob (and its previews) under data key `key_id`.
+
+    The body keeps its compression codec and is streamed segment by segment into a new file; the blob and
+    every Document pointing at it switch to the new file and checksum in one
+    transaction, and the old files are deleted once it commits. Returns the
+    number of plaintext bytes re-encrypted.
+    """
+    from .models import Document, VaultBlob
+
+    header = stored_header(blob.file)
+    with blob.file.open("rb") as fh:
+        encrypted, checksum, size = _encrypt_plaintext(decrypt_stream(fh), key_id, header and header.codec)
+
+    old_names = [f.name for f in (blob.file, blob.thumbnail, blob.page_strip) if f]
+    storage = blob.file.storage
+    blob.file.save(blob.sha256, encrypted, save=False)
+    for field in (blob.thumbnail, blob.page_strip):
+        if field:
+            field.save(field.name.rsplit("/", 1)[-1], ContentFile(encrypt_file(read_blob_preview(field), key_id)), save=False)
+    new_names = [f.name for f in (blob.file, blob.thumbnail, blob.page_strip) if f]
+
+    with transaction.atomic():
+        updated = VaultBlob.objects.filter(pk=blob.pk, file=old_names[0]).update(
+            file=blob.file.name, checksum=checksum,
+            thumbnail=blob.thumbnail.name, page_strip=blob.page_strip.name,
+        )
+        if not updated:
+            # Released or re-encrypted concurrently; drop our copy instead.
+            transaction.on_commit(lambda: [storage.delete(name) for name in new_names])
+            return 0
+        Document.objects.filter(blob=blob).update(file=blob.file.name, checksum=checksum)
+        transaction.on_commit(lambda: [storage.delete(name) for name in old_names])
+    return size
+
+
+def reencrypt_document(doc, key_id: bytes) -> int:
+    """
+    Re-encrypt the file of a Document stored before deduplication (no blob)
+    under data key `key_id`, in place of the old file.
+
+    Legacy Fernet and unencrypted files come out as vault containers; the
+    codec of an existing container is kept. Returns the number of plaintext
+    bytes re-encrypted (0 if the document changed underneath).
+    """
+    from .models import Document
+
+    header = stored_header(doc.file) if doc.is_encrypted else None
+    encrypted, checksum, size = _encrypt_plaintext(iter_plaintext(doc), key_id, header and header.codec)
+
+    old_name = doc.file.name
+    storage = doc.file.storage
+    doc.file.save(old_name.rsplit("/", 1)[-1], encrypted, save=False)
+    new_name = doc.file.name
+
+    with transaction.atomic():
+        updated = Document.objects.filter(pk=doc.pk, blob__isnull=True, file=old_name).update(
+            file=new_name, checksum=checksum, is_encrypted=True,
+        )
+        if not updated:
+            transaction.on_commit(lambda: storage.delete(new_name))
+            return 0
+        transaction.on_commit(lambda: storage.delete(old_name))
+    return size
+
+
+# ─── Previews ─────────────────────────────────────────────────────────────────
+
+def save_blob_preview(blob, preview) -> None:
+    """Encrypt and attach rendered previews (or mark the blob as having none)."""
+    from django.utils import timezone
+
+    from .preview import PREVIEW_VERSION
+
+    # Replace, rather than orphan, previews from an earlier render.
+    for field in (blob.thumbnail, blob.page_strip):
+        if field:
+            field.delete(save=False)
+    if preview is not None:
+        key_id = active_key_id(blob.company_id)
+        blob.thumbnail.save("thumb.jpg", ContentFile(encrypt_file(preview.thumbnail, key_id)), save=False)
+        if preview.strip:
+            blob.page_strip.save("strip.jpg", ContentFile(encrypt_file(preview.strip, key_id)), save=False)
+    blob.preview_rendered_at = timezone.now()
+    blob.preview_version = PREVIEW_VERSION
+    blob.save(update_fields=["thumbnail", "page_strip", "preview_rendered_at", "preview_version", "updated_at"])
+
+
+def read_blob_preview(field) -> bytes:
+    with field.open("rb") as fh:
+        return decrypt_file(fh.read())
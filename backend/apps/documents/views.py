@@ -1,9 +1,12 @@
-import hashlib
-import io
 from datetime import timedelta
 
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.http import quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import (
@@ -12,20 +15,49 @@ from drf_spectacular.utils import (
     extend_schema,
     extend_schema_view,
 )
-from rest_framework import generics, status
+from rest_framework import generics, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import OrderingFilter, SearchFilter
-from rest_framework.parsers import MultiPartParser
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.viewsets import GenericViewSet, ModelViewSet
 
-from core.utils.encryption import decrypt_file, encrypt_file
-from core.utils.validators import validate_upload
+from core.utils.http import RangeNotSatisfiable, etag_matches, parse_byte_range
+from core.utils.validators import validate_upload_mime, validate_upload_size
 
-from .models import Document
-from .serializers import DocumentSerializer, DocumentUploadSerializer
-from .tasks import process_document_ocr
+from .batch import check_batch_size, ingest_batch, request_files, zip_members
+from .evidence import iter_evidence_pack
+from .models import Document, UploadChunk, UploadSession, upload_chunk_path
+from .preview import PREVIEW_VERSION
+from .search import search_documents
+from .serializers import (
+    BatchUploadSerializer,
+    DocumentMetadataSerializer,
+    DocumentSerializer,
+    DocumentUploadSerializer,
+    EvidencePackSerializer,
+    UploadSessionSerializer,
+)
+from .similarity import DUPLICATE_SIMILARITY, MIN_SEARCH_SIMILARITY, similar_documents
+from .stats import EXPIRING_SOON_DAYS, get_stats
+from .tasks import render_blob_preview
+from .vault import (
+    assemble_session,
+    discard_session_chunks,
+    encrypt_session_chunk,
+    ingest_upload,
+    iter_plaintext,
+    new_session_header,
+    read_blob_preview,
+    session_chunk_size,
+    store_document,
+)
+
+# List query parameters that don't narrow the result; without any others the
+# page count comes from the company's document counter.
+UNFILTERED_LIST_PARAMS = {"page", "page_size", "ordering"}
 
 
 @extend_schema_view(
@@ -34,9 +66,10 @@ from .tasks import process_document_ocr
         summary="List documents",
         description=(
             "Returns a paginated list of documents in the company's encrypted vault.\n\n"
-            "Files are stored **Fernet AES-128 encrypted** at rest.\n\n"
+            "Files are stored **AES-256-GCM encrypted** at rest.\n\n"
             "**Filters**: `document_type`, `status`, `employee` (UUID)\n"
-            "**Search**: `title`, `reference_number`, `file_name`"
+            "**Search**: `title`, `reference_number`, `file_name` "
+            "(use `/documents/search/` to search document text)"
         ),
         parameters=[
             OpenApiParameter("document_type", OpenApiTypes.STR, description="employment_contract, rra_filing, payslip, rssb_declaration, etc."),
@@ -50,8 +83,10 @@ from .tasks import process_document_ocr
         summary="Upload a document",
         description=(
             "Upload a file to the encrypted vault.\n\n"
-            "The file is validated (MIME type + max 50 MB), Fernet-encrypted, "
+            "The file is validated (MIME type + max 50 MB), encrypted chunk by chunk, "
             "SHA-256 checksummed, and queued for async OCR.\n\n"
+            "Content already in the company's vault is stored once: the new document "
+            "shares the existing encrypted blob and reuses its OCR results.\n\n"
             "**Accepted types**: PDF, JPEG, PNG, TIFF, XLSX, XLS, CSV"
         ),
         request={
@@ -100,89 +135,203 @@ class DocumentViewSet(ModelViewSet):
     def get_queryset(self):
         qs = Document.objects.filter(
             company=self.request.user.company
-        ).select_related("employee", "uploaded_by")
+        ).select_related("employee", "uploaded_by", "blob")
 
         # Custom filter: expiring within 30 days
         if self.request.query_params.get("expiring_soon") in ("true", "1", "True"):
-            cutoff = timezone.now().date() + timedelta(days=30)
+            cutoff = timezone.now().date() + timedelta(days=EXPIRING_SOON_DAYS)
             qs = qs.filter(expiry_date__lte=cutoff, expiry_date__isnull=False, status="active")
 
         return qs
 
     def list(self, request, *args, **kwargs):
         """Override list to inject aggregate stats into the paginated response."""
-        response = super().list(request, *args, **kwargs)
-
-        company = request.user.company
-        today = timezone.now().date()
-        cutoff_30 = today + timedelta(days=30)
+        # Maintained counters instead of COUNT(*) queries over the company's whole vault
+        stats = get_stats(request.user.company_id)
+        if not set(request.query_params) - UNFILTERED_LIST_PARAMS:
+            self.paginator.known_count = stats.total
 
-        base_qs = Document.objects.filter(company=company)
-        expired_count = base_qs.filter(status="expired").count()
-        expiring_soon = base_qs.filter(
-            expiry_date__lte=cutoff_30,
-            expiry_date__isnull=False,
-            status="active",
-        ).count()
-
-        response.data["expired_count"] = expired_count
-        response.data["expiring_soon"] = expiring_soon
+        response = super().list(request, *args, **kwargs)
+        response.data["expired_count"] = stats.expired
+        response.data["expiring_soon"] = stats.expiring_soon
         return response
 
     def perform_create(self, serializer):
         request = self.request
         file = request.FILES.get("file")
 
-        validate_upload(file)
-
-        # Encrypt and compute checksum
-        raw = file.read()
-        encrypted = encrypt_file(raw)
-        checksum = hashlib.sha256(encrypted).hexdigest()
-
-        # Overwrite file content with encrypted bytes
-        from django.core.files.uploadedfile import InMemoryUploadedFile
-        encrypted_file = InMemoryUploadedFile(
-            io.BytesIO(encrypted), "file", file.name, file.content_type, len(encrypted), None
-        )
-
-        doc = serializer.save(
+        # One pass: sniff, hash, compress (if worthwhile) and encrypt; identical content shares one stored blob
+        encrypted = ingest_upload(file, request.user.company)
+        store_document(
+            serializer,
+            encrypted,
             company=request.user.company,
             uploaded_by=request.user,
-            file=encrypted_file,
             file_name=file.name,
-            file_size=file.size,
-            mime_type=file.content_type,
-            is_encrypted=True,
-            checksum=checksum,
+            mime_type=encrypted.mime_type,
         )
 
-        # Trigger async OCR
-        process_document_ocr.delay(str(doc.id))
+    @extend_schema(
+        tags=["documents"],
+        summary="Upload many documents at once",
+        description=(
+            "Multipart upload of several `files`, or one `archive` (ZIP), with an optional "
+            "`manifest`: a JSON object mapping each file name (ZIP path) to its metadata, e.g. "
+            "`{\"contract.pdf\": {\"title\": \"Contract\", \"document_type\": \"contract\"}}`. "
+            "Files without an entry are titled after their name with type `other`.\n\n"
+            "Files are validated and encrypted in parallel and stored together; OCR is queued "
+            "as one job. Invalid files and unreadable ZIP members are skipped and reported, the "
+            "rest are stored. At most `BATCH_UPLOAD_MAX_FILES` files and `BATCH_UPLOAD_MAX_TOTAL_MB` "
+            "of (uncompressed) content per request."
+        ),
+        request={"multipart/form-data": BatchUploadSerializer},
+        responses={
+            201: OpenApiResponse(description="Per-file results; at least one document stored"),
+            400: OpenApiResponse(description="Invalid request, or no file could be stored"),
+        },
+    )
+    @action(detail=False, methods=["post"], url_path="batch")
+    def batch(self, request):
+        serializer = BatchUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        files = request_files(data["files"]) if data.get("files") else zip_members(data["archive"])
+        if not files:
+            raise ValidationError("The archive contains no files.")
+        check_batch_size(files)
+
+        results = ingest_batch(
+            files, data["manifest"], company=request.user.company, uploaded_by=request.user,
+        )
+        created = sum(result["status"] == "created" for result in results)
+        return Response(
+            {"created": created, "failed": len(results) - created, "results": results},
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+        )
 
     @extend_schema(
         tags=["documents"],
         summary="Download (decrypt) a document",
         description=(
-            "Decrypts the stored file in-memory and streams it to the authenticated user. "
-            "The decrypted content is never written to disk."
+            "Decrypts the stored file segment by segment and streams it to the authenticated user. "
+            "The decrypted content is never written to disk.\n\n"
+            "Supports a single `Range: bytes=start-end` request (206 Partial Content) so PDF "
+            "viewers can fetch pages and clients can resume interrupted transfers. The stored "
+            "checksum is returned as the `ETag`; send it in `If-None-Match` to get a 304, or in "
+            "`If-Range` to make a range request conditional."
         ),
+        parameters=[
+            OpenApiParameter("Range", OpenApiTypes.STR, OpenApiParameter.HEADER, description="bytes=start-end"),
+            OpenApiParameter("If-None-Match", OpenApiTypes.STR, OpenApiParameter.HEADER),
+            OpenApiParameter("If-Range", OpenApiTypes.STR, OpenApiParameter.HEADER),
+        ],
         responses={
             200: OpenApiResponse(description="Binary file stream with Content-Disposition: attachment"),
+            206: OpenApiResponse(description="Requested byte range of the decrypted file"),
+            304: OpenApiResponse(description="Client copy is current (ETag matched)"),
             404: OpenApiResponse(description="Document not found"),
+            416: OpenApiResponse(description="Range lies outside the file"),
         },
     )
     @action(detail=True, methods=["get"])
     def download(self, request, pk=None):
-        """Decrypt and stream file to authorized user."""
+        """Decrypt and stream file (or one byte range of it) to authorized user."""
         doc = self.get_object()
-        encrypted = doc.file.read()
-        decrypted = decrypt_file(encrypted) if doc.is_encrypted else encrypted
+        size = doc.file_size
+        etag = quote_etag(doc.checksum) if doc.checksum else ""
+
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            response = HttpResponseNotModified()
+            response["ETag"] = etag
+            return response
+
+        byte_range = None
+        if_range = request.headers.get("If-Range")
+        if not if_range or etag_matches(if_range, etag):
+            try:
+                byte_range = parse_byte_range(request.headers.get("Range"), size)
+            except RangeNotSatisfiable:
+                response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+                response["Content-Range"] = f"bytes */{size}"
+                return response
+
+        if byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                iter_plaintext(doc, start, end),
+                content_type=doc.mime_type,
+                status=status.HTTP_206_PARTIAL_CONTENT,
+            )
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Content-Length"] = end - start + 1
+        else:
+            response = StreamingHttpResponse(iter_plaintext(doc), content_type=doc.mime_type)
+            response["Content-Length"] = size
 
-        response = HttpResponse(decrypted, content_type=doc.mime_type)
+        response["Accept-Ranges"] = "bytes"
+        response["Cache-Control"] = "private, no-cache"
+        if etag:
+            response["ETag"] = etag
         response["Content-Disposition"] = f'attachment; filename="{doc.file_name}"'
         return response
 
+    @extend_schema(
+        tags=["documents"],
+        summary="Get a preview image",
+        description=(
+            "Returns a small JPEG preview without downloading or decrypting the document: "
+            "`kind=thumbnail` (first page, 320 px wide, the default) or `kind=strip` (the first "
+            "pages side by side, 160 px high; multi-page files only).\n\n"
+            "Previews are rendered once per distinct file after upload. Use the versioned URLs "
+            "from the document's `preview` field — responses are cacheable for a year. "
+            "Returns 202 while the preview is still being rendered."
+        ),
+        parameters=[
+            OpenApiParameter("kind", OpenApiTypes.STR, description="thumbnail | strip"),
+            OpenApiParameter("If-None-Match", OpenApiTypes.STR, OpenApiParameter.HEADER),
+        ],
+        responses={
+            200: OpenApiResponse(description="image/jpeg"),
+            202: OpenApiResponse(description="Preview not rendered yet; retry shortly"),
+            304: OpenApiResponse(description="Client copy is current (ETag matched)"),
+            404: OpenApiResponse(description="No preview for this document type"),
+        },
+    )
+    @action(detail=True, methods=["get"])
+    def preview(self, request, pk=None):
+        """Serve the decrypted thumbnail or page strip with long-lived cache headers."""
+        kind = request.query_params.get("kind", "thumbnail")
+        if kind not in ("thumbnail", "strip"):
+            raise ValidationError({"kind": "Must be 'thumbnail' or 'strip'."})
+
+        blob = self.get_object().blob
+        if blob is None:
+            return Response({"detail": "No preview for this document."}, status=status.HTTP_404_NOT_FOUND)
+        if blob.preview_version != PREVIEW_VERSION:
+            # Blobs stored before previews existed, or rendered by an older
+            # PREVIEW_VERSION, are (re)rendered on first request.
+            if cache.add(f"preview-render:{blob.id}", 1, timeout=300):
+                render_blob_preview.delay(str(blob.id))
+        if blob.preview_rendered_at is None:
+            response = Response({"detail": "Preview is being rendered."}, status=status.HTTP_202_ACCEPTED)
+            response["Retry-After"] = "5"
+            return response
+
+        field = blob.thumbnail if kind == "thumbnail" else blob.page_strip
+        if not field:
+            return Response({"detail": "No preview for this document."}, status=status.HTTP_404_NOT_FOUND)
+
+        # Keyed to the version that rendered this file, like the serializer's URLs.
+        etag = quote_etag(f"{blob.sha256[:16]}-{kind}-v{blob.preview_version}")
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(read_blob_preview(field), content_type="image/jpeg")
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, max-age=31536000, immutable"
+        return response
+
     @extend_schema(
         tags=["documents"],
         summary="Get OCR-extracted text",
@@ -222,3 +371,339 @@ class DocumentViewSet(ModelViewSet):
         doc = self.get_object()
         metadata = doc.metadata or {}
         return Response(metadata.get("ai_extracted", {}))
+
+    @extend_schema(
+        tags=["documents"],
+        summary="Full-text search",
+        description=(
+            "Searches titles, reference numbers, file names and OCR-extracted text across the "
+            "company's documents, best matches first.\n\n"
+            "All words must match; wrap words in double quotes to match a phrase. Each result is "
+            "the usual document payload plus `rank` and `highlight`, an HTML-escaped snippet of "
+            "the matching text with hits wrapped in `<mark>`."
+        ),
+        parameters=[
+            OpenApiParameter("q", OpenApiTypes.STR, required=True, description='e.g. probation "notice period"'),
+        ],
+        responses={
+            200: OpenApiResponse(description="Paginated ranked documents with highlighted snippets"),
+            400: OpenApiResponse(description="Missing `q`"),
+        },
+    )
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        """Ranked full-text search backed by the tsvector / FTS5 index."""
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            raise ValidationError({"q": "This query parameter is required."})
+
+        hits = self.paginate_queryset(search_documents(request.user.company_id, query))
+        docs = (
+            Document.objects.filter(company=request.user.company)
+            .select_related("employee", "uploaded_by", "blob")
+            .in_bulk([hit.document_id for hit in hits])
+        )
+        results = []
+        for hit in hits:
+            doc = docs.get(hit.document_id)
+            if doc is None:
+                continue
+            item = self.get_serializer(doc).data
+            item["rank"] = hit.rank
+            item["highlight"] = hit.snippet
+            results.append(item)
+        return self.get_paginated_response(results)
+
+    @extend_schema(
+        tags=["documents"],
+        summary="Find near-duplicate documents",
+        description=(
+            "Documents of your company whose OCR text closely matches this one's, e.g. another "
+            "scan of the same contract, most similar first. `similarity` estimates the share of "
+            "3-word phrases the two texts have in common (MinHash), from `min_similarity` "
+            "(default 0.7) up to 1.0. Candidates come from an LSH index that finds ~99% of "
+            "matches at 0.6 and ~87% at 0.5, the lowest threshold accepted. Returns 409 until "
+            "OCR has produced enough text to compare."
+        ),
+        parameters=[
+            OpenApiParameter("min_similarity", OpenApiTypes.FLOAT, description="0.5 – 1.0, default 0.7"),
+        ],
+        responses={
+            200: OpenApiResponse(description="List of documents, each with `similarity`"),
+            409: OpenApiResponse(description="No text signature for this document yet"),
+        },
+    )
+    @action(detail=True, methods=["get"])
+    def similar(self, request, pk=None):
+        """List near-duplicates found through the MinHash LSH index."""
+        doc = self.get_object()
+        try:
+            min_similarity = float(request.query_params.get("min_similarity", DUPLICATE_SIMILARITY))
+        except ValueError:
+            raise ValidationError({"min_similarity": "Must be a number."})
+        if not MIN_SEARCH_SIMILARITY <= min_similarity <= 1:
+            raise ValidationError({"min_similarity": f"Must be between {MIN_SEARCH_SIMILARITY} and 1."})
+
+        hits = similar_documents(doc, min_similarity)
+        if hits is None:
+            return Response(
+                {"detail": "This document has no extracted text to compare yet."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        docs = self.get_queryset().in_bulk([hit.document_id for hit in hits])
+        results = []
+        for hit in hits:
+            if hit.document_id in docs:
+                item = self.get_serializer(docs[hit.document_id]).data
+                item["similarity"] = round(hit.similarity, 3)
+                results.append(item)
+        return Response(results)
+
+    @extend_schema(
+        tags=["documents"],
+        summary="List near-duplicate clusters",
+        description=(
+            "Groups of near-duplicate documents found by the nightly duplicate detection job. "
+            "Each cluster is keyed by its earliest document and lists all members."
+        ),
+        responses={200: OpenApiResponse(description="Paginated clusters: `{cluster, documents}`")},
+    )
+    @action(detail=False, methods=["get"], url_path="duplicate-clusters")
+    def duplicate_clusters(self, request):
+        """Paginated near-duplicate clusters, largest first."""
+        from django.db.models import Count, F
+
+        from .models import DocumentSignature
+
+        roots = (
+            DocumentSignature.objects.filter(company=request.user.company, cluster__isnull=False)
+            .values("cluster").annotate(size=Count("document")).order_by("-size", "cluster")
+        )
+        page = self.paginate_queryset(roots)
+        members: dict = {}
+        for doc in self.get_queryset().filter(signature__cluster__in=[row["cluster"] for row in page]).annotate(
+            cluster_id=F("signature__cluster"),
+        ).order_by("created_at"):
+            members.setdefault(doc.cluster_id, []).append(self.get_serializer(doc).data)
+        return self.get_paginated_response([
+            {"cluster": row["cluster"], "documents": members.get(row["cluster"], [])} for row in page
+        ])
+
+    @extend_schema(
+        tags=["documents"],
+        summary="Export an evidence pack (ZIP)",
+        description=(
+            "Streams one ZIP of decrypted documents selected by compliance record (its evidence "
+            "documents), employee, document type and/or upload date range. Files are decrypted "
+            "straight into the archive as it is sent; nothing is staged on disk.\n\n"
+            "The archive is organised by document type and ends with `manifest.json` (metadata, "
+            "size and SHA-256 of every file, and whether it matches the hash recorded at upload) "
+            "and `SHA256SUMS` for `sha256sum -c`. At most `EVIDENCE_PACK_MAX_DOCUMENTS` documents."
+        ),
+        request=EvidencePackSerializer,
+        responses={
+            200: OpenApiResponse(description="application/zip stream"),
+            400: OpenApiResponse(description="No filter given, nothing matched, or too many documents"),
+            404: OpenApiResponse(description="Compliance record not found"),
+        },
+    )
+    @action(detail=False, methods=["post"], url_path="evidence-pack", parser_classes=[JSONParser])
+    def evidence_pack(self, request):
+        """Stream a ZIP of the selected documents with a checksum manifest."""
+        from apps.compliance.models import ComplianceRecord
+
+        serializer = EvidencePackSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        selection = serializer.validated_data
+
+        docs = Document.objects.filter(company=request.user.company)
+        if "compliance_record" in selection:
+            record = get_object_or_404(
+                ComplianceRecord, pk=selection["compliance_record"], company=request.user.company,
+            )
+            docs = docs.filter(pk__in=record.evidence_documents.values("pk"))
+        if "employee" in selection:
+            docs = docs.filter(employee_id=selection["employee"])
+        if "document_type" in selection:
+            docs = docs.filter(document_type=selection["document_type"])
+        if "date_from" in selection:
+            docs = docs.filter(created_at__date__gte=selection["date_from"])
+        if "date_to" in selection:
+            docs = docs.filter(created_at__date__lte=selection["date_to"])
+
+        count = docs.count()
+        if not count:
+            raise ValidationError("No documents match the selection.")
+        if count > settings.EVIDENCE_PACK_MAX_DOCUMENTS:
+            raise ValidationError(
+                f"{count} documents match; narrow the selection to at most "
+                f"{settings.EVIDENCE_PACK_MAX_DOCUMENTS}."
+            )
+
+        docs = docs.select_related("blob").order_by("document_type", "created_at")
+        response = StreamingHttpResponse(
+            iter_evidence_pack(docs.iterator(chunk_size=200), serializer.data),
+            content_type="application/zip",
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="evidence-pack-{timezone.now():%Y%m%d-%H%M%S}.zip"'
+        )
+        response["Cache-Control"] = "private, no-store"
+        return response
+
+
+# ─── Resumable upload sessions ────────────────────────────────────────────────
+
+@extend_schema_view(
+    create=extend_schema(
+        tags=["documents"],
+        summary="Start a resumable upload",
+        description=(
+            "Declares a file to upload in chunks. Returns the session `id`, the "
+            "`chunk_size` to use and the number of chunks expected.\n\n"
+            "Then `PUT` each chunk's raw bytes to `/upload-sessions/{id}/chunks/{index}/` "
+            "(any order, retry freely) and call `/finalize/`. Sessions expire after "
+            "`UPLOAD_SESSION_TTL_HOURS`.\n\n"
+            "Body: `{\"file_name\": \"scan.pdf\", \"total_size\": 41943040, "
+            "\"expected_sha256\": \"...\", \"document\": {\"title\": \"...\", "
+            "\"document_type\": \"audit_report\"}}`"
+        ),
+    ),
+    retrieve=extend_schema(
+        tags=["documents"],
+        summary="Get upload session status",
+        description="Lists the chunk indices already received, so an interrupted client can resume.",
+    ),
+    destroy=extend_schema(
+        tags=["documents"],
+        summary="Abort an upload session",
+        description="Discards all received chunks.",
+    ),
+)
+class UploadSessionViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    GenericViewSet,
+):
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(company=self.request.user.company)
+
+    def perform_create(self, serializer):
+        serializer.save(
+            company=self.request.user.company,
+            created_by=self.request.user,
+            chunk_size=session_chunk_size(),
+            header=new_session_header(self.request.user.company),
+            expires_at=timezone.now() + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS),
+        )
+
+    def perform_destroy(self, instance):
+        discard_session_chunks(instance)
+        instance.status = UploadSession.Status.ABORTED
+        instance.save(update_fields=["status", "updated_at"])
+
+    def _get_open_session(self):
+        session = self.get_object()
+        if session.status != UploadSession.Status.OPEN:
+            raise ValidationError(f"Upload session is {session.status}.")
+        if session.expires_at <= timezone.now():
+            raise ValidationError("Upload session has expired.")
+        return session
+
+    @extend_schema(
+        tags=["documents"],
+        summary="Upload one chunk",
+        description=(
+            "Send the raw bytes of chunk `index` (0-based) as the request body with "
+            "`Content-Type: application/octet-stream`. Every chunk except the last must be "
+            "exactly `chunk_size` bytes. The chunk is encrypted as it is read. Re-sending an "
+            "index with the same bytes is accepted as a retry; different bytes for an index "
+            "already received are rejected (abort and start a new session instead). "
+            "Optionally send `X-Chunk-SHA256` to have the server verify it."
+        ),
+        request={"application/octet-stream": {"type": "string", "format": "binary"}},
+        responses={200: OpenApiResponse(description="Chunk stored; returns its SHA-256")},
+    )
+    @action(detail=True, methods=["put"], url_path=r"chunks/(?P<index>\d+)")
+    def chunk(self, request, pk=None, index=None):
+        session = self._get_open_session()
+        index = int(index)
+        if index >= session.chunk_count:
+            raise ValidationError(f"Chunk index must be below {session.chunk_count}.")
+        # DRF leaves no stream for an empty body (Content-Length missing or 0).
+        if request.stream is None:
+            raise ValidationError(f"Chunk {index} has an empty body.")
+
+        encrypted, sha256, size = encrypt_session_chunk(session, index, request.stream)
+        declared = request.headers.get("X-Chunk-SHA256", "").lower()
+        if declared and declared != sha256:
+            raise ValidationError("Chunk checksum mismatch.")
+
+        with transaction.atomic():
+            previous = UploadChunk.objects.select_for_update().filter(session=session, index=index).first()
+            if previous:
+                # A chunk's segment nonces depend only on its index, so different bytes
+                # under the same index would reuse them; only identical retries are allowed.
+                if previous.sha256 != sha256:
+                    raise ValidationError(f"Chunk {index} was already received with different content.")
+                return Response({"index": index, "size": previous.size, "sha256": previous.sha256})
+            chunk = UploadChunk(session=session, index=index, size=size, sha256=sha256)
+            chunk.file.save(upload_chunk_path(session, index), encrypted, save=False)
+            chunk.save()
+
+        return Response({"index": index, "size": size, "sha256": sha256})
+
+    @extend_schema(
+        tags=["documents"],
+        summary="Finalize a resumable upload",
+        description=(
+            "Assembles the received chunks into one encrypted vault file, validates it "
+            "(size + sniffed MIME type), checks `expected_sha256` if given, creates the "
+            "Document and queues OCR. Returns the new document."
+        ),
+        request=None,
+        responses={
+            201: DocumentSerializer,
+            400: OpenApiResponse(description="Missing chunks, checksum mismatch or invalid file"),
+        },
+    )
+    @action(detail=True, methods=["post"])
+    def finalize(self, request, pk=None):
+        with transaction.atomic():
+            session = self._get_open_session()
+            session = UploadSession.objects.select_for_update().get(pk=session.pk)
+            if session.status != UploadSession.Status.OPEN:
+                raise ValidationError(f"Upload session is {session.status}.")
+
+            received = set(session.chunks.values_list("index", flat=True))
+            missing = [i for i in range(session.chunk_count) if i not in received]
+            if missing:
+                raise ValidationError({"detail": "Upload incomplete.", "missing_chunks": missing[:100]})
+
+            metadata = DocumentMetadataSerializer(data=session.document_fields)
+            metadata.is_valid(raise_exception=True)
+
+            assembled = assemble_session(session)
+            validate_upload_size(assembled.size, max_mb=settings.MAX_RESUMABLE_UPLOAD_SIZE_MB)
+            mime = validate_upload_mime(assembled.head)
+            if session.expected_sha256 and session.expected_sha256 != assembled.sha256:
+                raise ValidationError("File checksum does not match expected_sha256.")
+
+            doc = store_document(
+                metadata,
+                assembled,
+                company=session.company,
+                uploaded_by=request.user,
+                file_name=session.file_name,
+                mime_type=mime,
+            )
+            session.document = doc
+            session.status = UploadSession.Status.COMPLETED
+            session.save(update_fields=["document", "status", "updated_at"])
+            transaction.on_commit(lambda: discard_session_chunks(session))
+
+        return Response(DocumentSerializer(doc, context=self.get_serializer_context()).data, status=status.HTTP_201_CREATED)
@@ -54,6 +54,73 @@ def send_expiry_notification(document_id: str, days_left: int):
         logger.exception("send_expiry_notification failed: %s", exc)
 
 
+@shared_task(name="apps.notifications.tasks.send_expiry_digest")
+def send_expiry_digest(company_id: str, documents: dict[str, int]):
+    """
+    Deliver one company's expiry reminders from the daily expiry scan.
+
+    `documents` maps document ids to days left. Every recipient gets an
+    in-app notification per document (created in bulk) and a single digest
+    email listing them all.
+    """
+    from apps.accounts.models import User
+    from apps.documents.models import Document
+
+    from .models import Notification
+
+    docs = list(
+        Document.objects.filter(company_id=company_id, id__in=documents).only("id", "title", "expiry_date")
+        .order_by("expiry_date", "title")
+    )
+    if not docs:
+        return
+    recipients = list(User.objects.filter(
+        company_id=company_id,
+        role__in=["admin", "hr", "accountant"],
+        is_active=True,
+    ))
+    if not recipients:
+        return
+
+    days_left = {doc.id: documents[str(doc.id)] for doc in docs}
+    notifications = Notification.objects.bulk_create([
+        Notification(
+            company_id=company_id,
+            recipient=user,
+            notification_type=Notification.NotificationType.DOCUMENT_EXPIRY,
+            title=f"Document expiring in {days_left[doc.id]} days",
+            body=f'"{doc.title}" will expire on {doc.expiry_date}. Please renew it before the deadline.',
+            related_object_id=doc.id,
+            related_object_type="document",
+        )
+        for user in recipients
+        for doc in docs
+    ])
+
+    subject = f"{len(docs)} document{'s' if len(docs) != 1 else ''} expiring soon"
+    message = "\n".join(
+        f"- {doc.title}: expires {doc.expiry_date} ({days_left[doc.id]} days left)" for doc in docs
+    ) + "\n\nPlease renew them before their deadlines."
+    sent = []
+    for user in recipients:
+        try:
+            send_mail(
+                subject=subject,
+                message=message,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[user.email],
+                fail_silently=False,
+            )
+            sent.append(user.pk)
+        except Exception as e:
+            logger.warning("Expiry digest email failed for user %s: %s", user.email, e)
+    if sent:
+        # Only this digest's notifications; earlier reminders whose email failed stay unsent.
+        Notification.objects.filter(
+            pk__in=[n.pk for n in notifications if n.recipient_id in sent],
+        ).update(is_sent_email=True, sent_at=timezone.now())
+
+
 @shared_task(name="apps.notifications.tasks.send_compliance_reminders")
 def send_compliance_reminders():
     from datetime import timedelta
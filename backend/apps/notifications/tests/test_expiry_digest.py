@@ -0,0 +1,85 @@
+"""
+Expiry digest tests: one email per recipient listing every reminded
+document, and in-app notifications marked sent only when their email went.
+"""
+from datetime import date
+
+import pytest
+from django.core import mail
+
+from apps.notifications import tasks
+from apps.notifications.tasks import send_expiry_digest
+
+
+@pytest.fixture
+def documents(company):
+    from apps.documents.models import Document
+
+    return [
+        Document.objects.create(
+            company=company, title=title, expiry_date=expiry_date, status="active", document_type="other",
+            file="documents/x.pdf", file_name="x.pdf", file_size=1, mime_type="application/pdf",
+        )
+        for title, expiry_date in [("Permit", date(2099, 1, 8)), ("Licence", date(2099, 1, 31))]
+    ]
+
+
+@pytest.mark.django_db
+def test_digest_notifies_each_recipient_once(company, admin_user, hr_user, employee_user, documents):
+    from apps.notifications.models import Notification
+
+    send_expiry_digest(str(company.pk), {str(documents[0].pk): 7, str(documents[1].pk): 30})
+
+    assert sorted(message.to[0] for message in mail.outbox) == [admin_user.email, hr_user.email]
+    body = mail.outbox[0].body
+    assert mail.outbox[0].subject == "2 documents expiring soon"
+    assert body.index("Permit") < body.index("Licence")
+    assert "(7 days left)" in body and "(30 days left)" in body
+
+    notifications = Notification.objects.all()
+    assert notifications.count() == 4
+    assert not notifications.filter(recipient=employee_user).exists()
+    assert set(notifications.values_list("is_sent_email", flat=True)) == {True}
+
+
+@pytest.mark.django_db
+def test_only_this_digests_notifications_are_marked_sent(company, admin_user, documents):
+    from apps.notifications.models import Notification
+
+    earlier = Notification.objects.create(
+        company=company, recipient=admin_user, notification_type=Notification.NotificationType.DOCUMENT_EXPIRY,
+        title="Document expiring in 30 days", body="...", related_object_id=documents[0].pk,
+        related_object_type="document",
+    )
+    send_expiry_digest(str(company.pk), {str(documents[0].pk): 7})
+
+    earlier.refresh_from_db()
+    assert not earlier.is_sent_email
+    assert Notification.objects.exclude(pk=earlier.pk).get().is_sent_email
+
+
+@pytest.mark.django_db
+def test_failed_email_leaves_notifications_unsent(company, admin_user, hr_user, documents, monkeypatch):
+    from apps.notifications.models import Notification
+
+    def send_mail(recipient_list, **kwargs):
+        if recipient_list == [hr_user.email]:
+            raise ConnectionError("SMTP down")
+        mail.outbox.append(recipient_list)
+
+    monkeypatch.setattr(tasks, "send_mail", send_mail)
+    send_expiry_digest(str(company.pk), {str(documents[0].pk): 7})
+
+    sent = dict(Notification.objects.values_list("recipient_id", "is_sent_email"))
+    assert sent == {admin_user.pk: True, hr_user.pk: False}
+
+
+@pytest.mark.django_db
+def test_digest_ignores_other_companies_documents(company, admin_user, documents):
+    from apps.companies.models import Company
+    from apps.notifications.models import Notification
+
+    other = Company.objects.create(name="Other Ltd", company_type="sme", email="o@other.com", phone="1")
+    send_expiry_digest(str(other.pk), {str(documents[0].pk): 7})
+    assert not mail.outbox
+    assert not Notification.objects.exists()
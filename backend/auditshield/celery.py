@@ -26,6 +26,31 @@ app.conf.beat_schedule = {
         "task": "apps.documents.tasks.check_document_expiries",
         "schedule": crontab(hour=8, minute=0),
     },
+    # Discard abandoned resumable upload sessions every hour
+    "purge-expired-upload-sessions": {
+        "task": "apps.documents.tasks.purge_expired_upload_sessions",
+        "schedule": crontab(minute=30),
+    },
+    # Keep the OCR page cache under OCR_CACHE_MAX_MB
+    "prune-ocr-cache": {
+        "task": "apps.documents.tasks.prune_ocr_cache",
+        "schedule": crontab(minute=45),
+    },
+    # Regroup near-duplicate documents nightly at 1 AM UTC
+    "detect-duplicate-clusters": {
+        "task": "apps.documents.tasks.detect_duplicate_clusters",
+        "schedule": crontab(hour=1, minute=0),
+    },
+    # Roll recurring compliance requirements forward nightly at 0:15 AM UTC
+    "materialise-compliance-schedule": {
+        "task": "apps.compliance.tasks.materialise_compliance_schedule",
+        "schedule": crontab(hour=0, minute=15),
+    },
+    # Recount monthly compliance score snapshots nightly at 0:30 AM UTC
+    "refresh-compliance-snapshots": {
+        "task": "apps.compliance.tasks.refresh_compliance_snapshots",
+        "schedule": crontab(hour=0, minute=30),
+    },
     # Cleanup expired JWT tokens every Sunday at 3 AM UTC
     "cleanup-expired-tokens": {
         "task": "apps.accounts.tasks.cleanup_expired_tokens",
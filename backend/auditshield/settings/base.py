@@ -244,6 +244,9 @@ CELERY_TASK_ROUTES = {
     "apps.notifications.*": {"queue": "notifications"},
 }
 
+# Largest selection one compliance bulk job (compliance/records/bulk-jobs/) may cover.
+COMPLIANCE_BULK_MAX_RECORDS = env.int("COMPLIANCE_BULK_MAX_RECORDS", default=50000)
+
 # ─── Email ────────────────────────────────────────────────────────────────────
 EMAIL_BACKEND = env("EMAIL_BACKEND", default="django.core.mail.backends.console.EmailBackend")
 EMAIL_HOST = env("EMAIL_HOST", default="")
@@ -256,7 +259,13 @@ DEFAULT_FROM_EMAIL = env("DEFAULT_FROM_EMAIL", default="AuditShield <noreply@aud
 # ─── File Upload ──────────────────────────────────────────────────────────────
 MAX_UPLOAD_SIZE_MB = env.int("MAX_UPLOAD_SIZE_MB", default=50)
 DATA_UPLOAD_MAX_MEMORY_SIZE = MAX_UPLOAD_SIZE_MB * 1024 * 1024
-FILE_UPLOAD_MAX_MEMORY_SIZE = DATA_UPLOAD_MAX_MEMORY_SIZE
+# Larger uploads are streamed to a temporary file by Django instead of held in memory.
+FILE_UPLOAD_MAX_MEMORY_SIZE = env.int("FILE_UPLOAD_MAX_MEMORY_MB", default=2) * 1024 * 1024
+# Resumable upload sessions (documents/upload-sessions/): each chunk is its own
+# request, so the cap can sit well above the single-request limit.
+MAX_RESUMABLE_UPLOAD_SIZE_MB = env.int("MAX_RESUMABLE_UPLOAD_SIZE_MB", default=500)
+UPLOAD_SESSION_CHUNK_SIZE = env.int("UPLOAD_SESSION_CHUNK_SIZE_MB", default=4) * 1024 * 1024
+UPLOAD_SESSION_TTL_HOURS = env.int("UPLOAD_SESSION_TTL_HOURS", default=24)
 ALLOWED_UPLOAD_TYPES = [
     "application/pdf",
     "image/jpeg",
@@ -267,8 +276,46 @@ ALLOWED_UPLOAD_TYPES = [
     "text/csv",
 ]
 
+# Batch uploads (documents/batch/): files and total (uncompressed) MB per request,
+# and files encrypted in parallel.
+BATCH_UPLOAD_MAX_FILES = env.int("BATCH_UPLOAD_MAX_FILES", default=200)
+BATCH_UPLOAD_MAX_TOTAL_MB = env.int("BATCH_UPLOAD_MAX_TOTAL_MB", default=500)
+BATCH_UPLOAD_WORKERS = env.int("BATCH_UPLOAD_WORKERS", default=4)
+
+# Largest number of documents one evidence pack export may contain.
+EVIDENCE_PACK_MAX_DOCUMENTS = env.int("EVIDENCE_PACK_MAX_DOCUMENTS", default=5000)
+
+# ─── OCR ──────────────────────────────────────────────────────────────────────
+# Concurrent tesseract processes per OCR task, and the render resolution range
+# for scanned pages (each page is rendered near the resolution of its scan).
+OCR_MAX_WORKERS = env.int("OCR_MAX_WORKERS", default=4)
+OCR_DPI = env.int("OCR_DPI", default=150)
+OCR_MIN_DPI = env.int("OCR_MIN_DPI", default=100)
+OCR_LANG = env("OCR_LANG", default="eng")
+# Downscale, deskew, binarize and crop page images before OCR (apps/documents/preprocess.py).
+OCR_PREPROCESS = env.bool("OCR_PREPROCESS", default=True)
+# Size cap of the OCR page-text cache (least recently used pages are evicted; 0 disables it).
+OCR_CACHE_MAX_MB = env.int("OCR_CACHE_MAX_MB", default=256)
+
 # ─── File Encryption ──────────────────────────────────────────────────────────
 FILE_ENCRYPTION_KEY = env("FILE_ENCRYPTION_KEY", default="")
+# Master keyring wrapping the per-company vault data keys, newest first
+# (defaults to FILE_ENCRYPTION_KEY). Add a new key in front to rotate, then
+# run `manage.py rotate_encryption_keys`.
+FILE_ENCRYPTION_KEYS = env.list("FILE_ENCRYPTION_KEYS", default=[])
+# Types compressed before encryption ("zlib", or "zstd" with the zstandard
+# package installed; empty disables). Already-compressed formats gain nothing.
+VAULT_COMPRESSION = env("VAULT_COMPRESSION", default="zlib")
+VAULT_COMPRESS_TYPES = env.list("VAULT_COMPRESS_TYPES", default=[
+    "text/csv",
+    "text/plain",
+    "application/vnd.ms-excel",
+])
+# Vault files are segmented AES-GCM containers (core.utils.encryption): uploads
+# and downloads hold one segment of plaintext at a time.
+VAULT_CHUNK_SIZE = env.int("VAULT_CHUNK_SIZE_KB", default=64) * 1024
+# Ciphertext above this size spills from memory to a temporary file while uploading.
+VAULT_SPOOL_MAX_MEMORY = env.int("VAULT_SPOOL_MAX_MEMORY_MB", default=2) * 1024 * 1024
 
 # ─── Brute-force Protection (django-axes) ─────────────────────────────────────
 AXES_FAILURE_LIMIT = 5
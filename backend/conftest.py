@@ -7,6 +7,29 @@ from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# Fixed so test runs are reproducible; never used outside tests.
+TEST_FILE_ENCRYPTION_KEY = "n0yJzLJ8k3mCzJbq4I7o0Hn0fT1rGCV6y0o6OJc4Rk8="
+
+
+# ── Environment ────────────────────────────────────────────────────────────────
+
+@pytest.fixture(autouse=True)
+def local_services(settings, tmp_path, monkeypatch):
+    """
+    Stand-ins for the services a deployment provides: an in-memory cache
+    instead of Redis, Celery tasks run inline, media under a temporary
+    directory and a vault encryption key.
+    """
+    from auditshield.celery import app
+
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    settings.FILE_ENCRYPTION_KEY = TEST_FILE_ENCRYPTION_KEY
+    settings.FILE_ENCRYPTION_KEYS = []
+    settings.EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+    monkeypatch.setitem(app.conf, "task_always_eager", True)
+    monkeypatch.setitem(app.conf, "task_eager_propagates", True)
+
 
 # ── Database factories ─────────────────────────────────────────────────────────
 
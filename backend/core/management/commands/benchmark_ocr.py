@@ -0,0 +1,183 @@
+"""
+Benchmark OCR with and without page image preprocessing.
+
+OCRs a corpus twice, once with preprocessing off (images go to Tesseract as
+they are) and once with it on, and reports seconds per page and word recall
+for each. By default the corpus is synthetic — pages of known text rendered
+as a skewed 600 dpi scan with a dark border, a multi-page 300 dpi TIFF and a
+tilted 72 dpi "phone photo" — so recall can be measured; pass --path to time
+a directory of real PDFs and images instead (recall is then not reported).
+
+Needs the tesseract binary. The OCR page cache is bypassed.
+
+Usage:
+    python manage.py benchmark_ocr
+    python manage.py benchmark_ocr --workers 1 --pages 4
+    python manage.py benchmark_ocr --path /srv/samples
+"""
+import io
+import mimetypes
+import random
+import re
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.documents.ocr import OCREngine
+
+WORDS = (
+    "employer employee agreement salary contract annual leave notice period termination "
+    "probation benefits pension insurance payroll deduction overtime schedule compliance "
+    "declaration registration certificate authority inspection penalty records statutory"
+).split()
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def _page_text(rng: random.Random, lines: int) -> list[str]:
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 9))) for _ in range(lines)]
+
+
+def _render_page(lines: list[str], dpi: int, skew: float, border: bool):
+    """A letter-size page of 11 pt text at `dpi`, rotated by `skew` degrees."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    width, height = int(8.5 * dpi), int(11 * dpi)
+    page = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=round(11 * dpi / 72))
+    y = dpi
+    for line in lines:
+        draw.text((dpi, y), line, fill=0, font=font)
+        y += round(18 * dpi / 72)
+    page = page.rotate(skew, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    if border:
+        framed = Image.new("L", (page.width + dpi // 3, page.height + dpi // 3), 30)
+        framed.paste(page, (dpi // 6, dpi // 6))
+        page = framed
+    return page
+
+
+def synthetic_corpus(pages: int, seed: int) -> list[tuple[str, bytes, str, str]]:
+    """(name, data, mime, expected text) samples."""
+    from PIL import Image
+
+    rng = random.Random(seed)
+    corpus = []
+
+    lines = _page_text(rng, 30)
+    scan = _render_page(lines, 600, rng.uniform(1.5, 3), border=True)
+    buf = io.BytesIO()
+    scan.save(buf, format="TIFF", dpi=(600, 600), compression="tiff_lzw")
+    corpus.append(("600dpi skewed scan (TIFF)", buf.getvalue(), "image/tiff", " ".join(lines)))
+
+    texts = [_page_text(rng, 30) for _ in range(pages)]
+    frames = [_render_page(t, 300, rng.uniform(-2, 2), border=False) for t in texts]
+    buf = io.BytesIO()
+    frames[0].save(buf, format="TIFF", dpi=(300, 300), compression="tiff_lzw",
+                   save_all=True, append_images=frames[1:])
+    corpus.append((f"{pages}-page 300dpi TIFF", buf.getvalue(), "image/tiff",
+                   " ".join(" ".join(t) for t in texts)))
+
+    lines = _page_text(rng, 25)
+    page = _render_page(lines, 400, rng.uniform(-4, -2), border=False)
+    photo = Image.new("L", (round(page.width * 1.25), round(page.height * 1.1)), 90)
+    photo.paste(page, ((photo.width - page.width) // 2, (photo.height - page.height) // 2))
+    buf = io.BytesIO()
+    photo.convert("RGB").save(buf, format="JPEG", quality=85, dpi=(72, 72))
+    corpus.append(("phone photo (JPEG, 72dpi)", buf.getvalue(), "image/jpeg", " ".join(lines)))
+    return corpus
+
+
+def file_corpus(path: Path) -> list[tuple[str, bytes, str, str | None]]:
+    corpus = []
+    for file in sorted(p for p in path.iterdir() if p.is_file()):
+        mime = mimetypes.guess_type(file.name)[0] or ""
+        if "pdf" in mime or mime.startswith("image/"):
+            corpus.append((file.name, file.read_bytes(), mime, None))
+    return corpus
+
+
+def page_count(data: bytes, mime: str) -> int:
+    if "pdf" in mime:
+        import fitz  # PyMuPDF
+
+        with fitz.open(stream=data, filetype="pdf") as pdf:
+            return pdf.page_count
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        return getattr(img, "n_frames", 1)
+
+
+def recall(expected: str, text: str) -> float:
+    """Share of the expected words (with multiplicity) found in the OCR output."""
+    found: dict[str, int] = {}
+    for word in _WORD_RE.findall(text.lower()):
+        found[word] = found.get(word, 0) + 1
+    words = _WORD_RE.findall(expected.lower())
+    hits = 0
+    for word in words:
+        if found.get(word):
+            found[word] -= 1
+            hits += 1
+    return hits / max(len(words), 1)
+
+
+class Command(BaseCommand):
+    help = "Benchmark OCR seconds per page with and without image preprocessing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=None, help="Directory of PDFs / images to use instead")
+        parser.add_argument("--pages", type=int, default=3, help="Pages in the synthetic multi-page TIFF")
+        parser.add_argument("--workers", type=int, default=None, help="OCR threads (default OCR_MAX_WORKERS)")
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        import pytesseract
+
+        try:
+            version = pytesseract.get_tesseract_version()
+        except pytesseract.TesseractNotFoundError:
+            raise CommandError("The tesseract binary is not installed or not on PATH.")
+
+        if options["path"]:
+            path = Path(options["path"])
+            if not path.is_dir():
+                raise CommandError(f"{path} is not a directory")
+            corpus = file_corpus(path)
+        else:
+            corpus = synthetic_corpus(max(1, options["pages"]), options["seed"])
+        if not corpus:
+            raise CommandError("No PDFs or images to benchmark.")
+
+        self.stdout.write(f"Tesseract {version}, {len(corpus)} samples\n")
+        totals = {False: [0.0, 0.0, 0], True: [0.0, 0.0, 0]}   # seconds, recall sum, recall count
+        pages_total = 0
+        for name, data, mime, expected in corpus:
+            pages = page_count(data, mime)
+            pages_total += pages
+            row = [f"{name:<30} {pages:>2} p"]
+            for preprocess in (False, True):
+                engine = OCREngine(max_workers=options["workers"], use_cache=False, preprocess=preprocess)
+                started = time.perf_counter()
+                text = engine.extract(data, mime)
+                elapsed = time.perf_counter() - started
+                totals[preprocess][0] += elapsed
+                cell = f"{elapsed / pages:6.2f} s/page"
+                if expected is not None:
+                    score = recall(expected, text)
+                    totals[preprocess][1] += score
+                    totals[preprocess][2] += 1
+                    cell += f" {100 * score:5.1f}% words"
+                row.append(("after " if preprocess else "before ") + cell)
+            self.stdout.write("  ".join(row))
+
+        before, after = totals[False], totals[True]
+        summary = (
+            f"\nPer page: {before[0] / pages_total:.2f} s before, {after[0] / pages_total:.2f} s after "
+            f"({before[0] / max(after[0], 1e-9):.1f}x)"
+        )
+        if after[2]:
+            summary += f"; word recall {100 * before[1] / before[2]:.1f}% -> {100 * after[1] / after[2]:.1f}%"
+        self.stdout.write(summary)
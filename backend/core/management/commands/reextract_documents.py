@@ -0,0 +1,69 @@
+"""
+Re-run field extraction over stored OCR text after extraction rules change.
+
+Walks every OCR'd document in primary-key batches, refreshing
+metadata["ai_extracted"] / ["ai_extraction"] without re-running OCR. Progress
+is checkpointed in the job_checkpoints table after every batch, so running
+the command again after an interruption resumes where it stopped.
+
+Usage:
+    python manage.py reextract_documents
+    python manage.py reextract_documents --batch-size 2000 --force
+    python manage.py reextract_documents --async      # hand off to Celery
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.documents.extraction import RULESET_VERSION
+from apps.documents.tasks import REEXTRACT_JOB, reextract_documents, run_reextraction
+from core.models import JobCheckpoint
+
+
+class Command(BaseCommand):
+    help = "Refresh AI-extracted fields for existing documents from their stored OCR text"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many batches")
+        parser.add_argument("--force", action="store_true",
+                            help="Also re-extract documents already at the current rule set version")
+        parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start over")
+        parser.add_argument("--company", default=None, help="Only this company's documents (UUID)")
+        parser.add_argument("--async", dest="run_async", action="store_true",
+                            help="Queue the Celery job instead of running here")
+
+    def handle(self, *args, **options):
+        if options["run_async"]:
+            reextract_documents.delay(
+                batch_size=options["batch_size"],
+                force=options["force"],
+                restart=options["restart"],
+                company_id=options["company"],
+            )
+            self.stdout.write(self.style.SUCCESS("Re-extraction queued."))
+            return
+
+        params = {"ruleset_version": RULESET_VERSION, "force": options["force"], "company_id": options["company"]}
+        checkpoint = JobCheckpoint.resume(REEXTRACT_JOB, params, restart=options["restart"])
+        if checkpoint.cursor:
+            self.stdout.write(f"Resuming after {checkpoint.cursor} ({checkpoint.processed} already visited)")
+
+        started, already = time.monotonic(), checkpoint.processed
+        batches = 0
+        max_batches = options["max_batches"]
+        while max_batches is None or batches < max_batches:
+            done = run_reextraction(
+                checkpoint, options["batch_size"], max_batches=1,
+                force=options["force"], company_id=options["company"],
+            )
+            if done:
+                break
+            batches += 1
+            rate = (checkpoint.processed - already) / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f"  {checkpoint.processed} visited, {checkpoint.changed} updated ({rate:,.0f} docs/s)")
+
+        status = "complete" if checkpoint.status == JobCheckpoint.Status.COMPLETED else "paused"
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-extraction {status}: {checkpoint.processed} documents visited, {checkpoint.changed} updated."
+        ))
@@ -0,0 +1,87 @@
+"""
+Rotate vault encryption keys.
+
+By default re-wraps every company data key with the primary master key (the
+first entry of FILE_ENCRYPTION_KEYS). That touches one small row per company,
+not the files, so it is safe to run at any time:
+
+    1. FILE_ENCRYPTION_KEYS=<new>,<old>   and restart the app
+    2. python manage.py rotate_encryption_keys
+    3. FILE_ENCRYPTION_KEYS=<new>         once it reports completion
+
+--rotate-data-keys gives companies fresh data keys for new files, and
+--reencrypt-bodies moves existing files onto the current data keys, streaming
+them at a throttled rate. Both jobs checkpoint in job_checkpoints and resume
+when run again.
+
+Usage:
+    python manage.py rotate_encryption_keys
+    python manage.py rotate_encryption_keys --rotate-data-keys --company <uuid>
+    python manage.py rotate_encryption_keys --reencrypt-bodies --max-mb-per-sec 20 --async
+"""
+from django.core.management.base import BaseCommand
+
+from apps.documents.tasks import REENCRYPT_JOB, reencrypt_vault_bodies, reencryption_params, run_body_reencryption
+from core.models import DataKey, JobCheckpoint
+from core.tasks import rewrap_data_keys
+from core.utils.keyring import primary_fingerprint, rotate_data_key
+from core.utils.keyring import rewrap_data_keys as rewrap
+
+
+class Command(BaseCommand):
+    help = "Re-wrap data keys under the primary master key; optionally rotate data keys and re-encrypt files"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rotate-data-keys", action="store_true",
+                            help="Issue every company (or --company) a new active data key")
+        parser.add_argument("--reencrypt-bodies", action="store_true",
+                            help="Re-encrypt stored files (shared blobs and pre-deduplication documents) "
+                                 "not under their company's active data key")
+        parser.add_argument("--company", default=None, help="Limit data key rotation / re-encryption to one company")
+        parser.add_argument("--max-mb-per-sec", type=float, default=None, help="Re-encryption throughput cap")
+        parser.add_argument("--batch-size", type=int, default=50, help="Documents per re-encryption checkpoint")
+        parser.add_argument("--restart", action="store_true", help="Ignore checkpoints and start over")
+        parser.add_argument("--async", dest="run_async", action="store_true",
+                            help="Queue the Celery jobs instead of running here")
+
+    def handle(self, *args, **options):
+        company = options["company"]
+        if options["rotate_data_keys"]:
+            companies = DataKey.objects.filter(is_active=True).values_list("company_id", flat=True)
+            if company:
+                companies = companies.filter(company_id=company)
+            rotated = 0
+            for company_id in list(companies):
+                rotate_data_key(company_id)
+                rotated += 1
+            self.stdout.write(f"Issued new data keys for {rotated} companies.")
+
+        if options["run_async"]:
+            rewrap_data_keys.delay(restart=options["restart"])
+            if options["reencrypt_bodies"]:
+                reencrypt_vault_bodies.delay(
+                    batch_size=options["batch_size"], max_mb_per_sec=options["max_mb_per_sec"],
+                    restart=options["restart"], company_id=company,
+                )
+            self.stdout.write(self.style.SUCCESS("Key rotation queued."))
+            return
+
+        primary = primary_fingerprint()
+        checkpoint = JobCheckpoint.resume(f"rewrap_data_keys:{primary}", {"primary": primary}, restart=options["restart"])
+        rewrap(checkpoint)
+        self.stdout.write(
+            f"Data keys under master key {primary}: {checkpoint.processed} visited, {checkpoint.changed} re-wrapped."
+        )
+
+        if options["reencrypt_bodies"]:
+            checkpoint = JobCheckpoint.resume(REENCRYPT_JOB, reencryption_params(company), restart=options["restart"])
+            if checkpoint.cursor:
+                self.stdout.write(f"Resuming re-encryption after {checkpoint.cursor}")
+            run_body_reencryption(
+                checkpoint, options["batch_size"],
+                max_mb_per_sec=options["max_mb_per_sec"], company_id=company,
+            )
+            self.stdout.write(
+                f"Files: {checkpoint.processed} documents visited, {checkpoint.changed} files re-encrypted."
+            )
+        self.stdout.write(self.style.SUCCESS("Key rotation complete."))
@@ -0,0 +1,66 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:58
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("companies", "0003_company_industry_company_fiscal_year_start"),
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DataKey",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "wrapped_key",
+                    models.TextField(
+                        help_text="Fernet token of the raw key, from the master keyring"
+                    ),
+                ),
+                (
+                    "master_key_id",
+                    models.CharField(
+                        help_text="Fingerprint of the master key that wrapped it",
+                        max_length=16,
+                    ),
+                ),
+                ("is_active", models.BooleanField(default=True)),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="%(app_label)s_%(class)s_set",
+                        to="companies.company",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "vault_data_keys",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="datakey",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_active", True)),
+                fields=("company",),
+                name="one_active_data_key_per_company",
+            ),
+        ),
+    ]
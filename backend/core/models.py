@@ -1,9 +1,11 @@
 """
-Abstract base models shared across all apps.
+Abstract base models shared across all apps, plus JobCheckpoint for
+resumable background jobs and DataKey for vault envelope encryption.
 """
 import uuid
 
 from django.db import models
+from django.utils import timezone
 
 
 class TimeStampedModel(models.Model):
@@ -36,3 +38,81 @@ class TenantModel(TimeStampedModel, UUIDModel):
 
     class Meta:
         abstract = True
+
+
+class JobCheckpoint(TimeStampedModel):
+    """
+    Progress marker for a long-running, resumable job (backfills, bulk reprocessing).
+
+    Jobs walk their rows in primary-key order and store the last key they
+    finished in `cursor`, committing it together with each batch's writes, so
+    an interrupted run picks up exactly where it stopped.
+    """
+
+    class Status(models.TextChoices):
+        RUNNING = "running", "Running"
+        COMPLETED = "completed", "Completed"
+
+    name = models.CharField(max_length=100, unique=True)
+    params = models.JSONField(default=dict, blank=True, help_text="Parameters the run was started with")
+    cursor = models.CharField(max_length=255, blank=True, help_text="Last key processed")
+    processed = models.PositiveBigIntegerField(default=0)
+    changed = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.RUNNING)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "job_checkpoints"
+
+    def __str__(self):
+        return f"{self.name} ({self.status}, {self.processed} processed)"
+
+    @classmethod
+    def resume(cls, name: str, params: dict | None = None, restart: bool = False) -> "JobCheckpoint":
+        """
+        Return the checkpoint for `name`, starting over if asked to, if the
+        previous run completed, or if it was started with different params.
+        """
+        params = params or {}
+        checkpoint, created = cls.objects.get_or_create(name=name, defaults={"params": params})
+        if not created and (restart or checkpoint.status == cls.Status.COMPLETED or checkpoint.params != params):
+            checkpoint.params = params
+            checkpoint.cursor = ""
+            checkpoint.processed = checkpoint.changed = 0
+            checkpoint.status = cls.Status.RUNNING
+            checkpoint.finished_at = None
+            checkpoint.save()
+        return checkpoint
+
+    def advance(self, cursor, processed: int, changed: int = 0) -> None:
+        self.cursor = str(cursor)
+        self.processed += processed
+        self.changed += changed
+        self.save(update_fields=["cursor", "processed", "changed", "updated_at"])
+
+    def complete(self) -> None:
+        self.status = self.Status.COMPLETED
+        self.finished_at = timezone.now()
+        self.save(update_fields=["status", "finished_at", "updated_at"])
+
+
+class DataKey(TenantModel):
+    """
+    A company's AES-256 vault data key, stored wrapped by the master keyring
+    (see core.utils.keyring). Its UUID is the key id written into vault
+    container headers. Inactive keys are kept for decrypting older files.
+    """
+    wrapped_key = models.TextField(help_text="Fernet token of the raw key, from the master keyring")
+    master_key_id = models.CharField(max_length=16, help_text="Fingerprint of the master key that wrapped it")
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        db_table = "vault_data_keys"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["company"], condition=models.Q(is_active=True), name="one_active_data_key_per_company",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.company_id} {self.id} ({'active' if self.is_active else 'retired'})"
@@ -22,3 +22,22 @@ def run_backup(self):
     except Exception as exc:
         logger.error("Backup failed: %s", exc)
         raise self.retry(exc=exc, countdown=300)
+
+
+@shared_task(name="core.tasks.rewrap_data_keys")
+def rewrap_data_keys(restart: bool = False):
+    """
+    Re-wrap every company data key with the primary master key.
+
+    Run after putting a new key first in FILE_ENCRYPTION_KEYS; once it has
+    completed, the old master key can be dropped from the keyring.
+    """
+    from core.models import JobCheckpoint
+    from core.utils.keyring import primary_fingerprint
+    from core.utils.keyring import rewrap_data_keys as rewrap
+
+    primary = primary_fingerprint()
+    checkpoint = JobCheckpoint.resume(f"rewrap_data_keys:{primary}", {"primary": primary}, restart=restart)
+    rewrap(checkpoint)
+    logger.info("Data keys re-wrapped with master key %s: %d visited, %d re-wrapped",
+                primary, checkpoint.processed, checkpoint.changed)
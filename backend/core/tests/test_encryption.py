@@ -0,0 +1,196 @@
+"""
+Vault container tests: the segmented AES-GCM format, its failure modes and
+the legacy Fernet fallback. Segments are kept tiny so every case spans
+several of them.
+"""
+import io
+import os
+import uuid
+
+import pytest
+from cryptography.fernet import InvalidToken
+
+from core.utils.encryption import (
+    HEADER_SIZE,
+    TAG_SIZE,
+    StreamHeader,
+    decrypt_file,
+    decrypt_stream,
+    encrypt_file,
+    encrypt_segment,
+    encrypt_stream,
+    get_fernet,
+    get_stream_key,
+    plaintext_size,
+)
+
+CHUNK = 16
+
+
+def _seal(data: bytes, codec: str | None = None, pieces: int = 1) -> bytes:
+    step = max(1, -(-len(data) // pieces))
+    chunks = [data[i:i + step] for i in range(0, len(data), step)] or [b""]
+    return b"".join(encrypt_stream(chunks, chunk_size=CHUNK, codec=codec))
+
+
+def _open(container: bytes, start: int = 0, end: int | None = None) -> bytes:
+    return b"".join(decrypt_stream(io.BytesIO(container), start, end))
+
+
+class _ForwardOnly:
+    """A reader without seek(), like a network stream."""
+
+    def __init__(self, data: bytes):
+        self._data = io.BytesIO(data)
+
+    def read(self, size=-1):
+        return self._data.read(size)
+
+
+@pytest.mark.parametrize("size", [0, 1, CHUNK - 1, CHUNK, CHUNK + 1, 5 * CHUNK, 5 * CHUNK + 7])
+@pytest.mark.parametrize("codec", [None, "zlib"])
+def test_round_trip(size, codec):
+    data = os.urandom(size // 2) * 2 + os.urandom(size % 2)
+    container = _seal(data, codec, pieces=3)
+    assert container.startswith(b"ASVAULT\x01")
+    assert _open(container) == data
+    assert StreamHeader.from_bytes(container).codec == codec
+
+
+def test_layout_and_plaintext_size():
+    data = os.urandom(3 * CHUNK + 5)
+    container = _seal(data)
+    assert len(container) == HEADER_SIZE + 4 * TAG_SIZE + len(data)
+    assert plaintext_size(len(container), CHUNK) == len(data)
+    assert plaintext_size(len(_seal(b"")), CHUNK) == 0
+
+
+def test_each_container_gets_a_fresh_nonce_prefix():
+    data = b"same plaintext" * 4
+    first, second = _seal(data), _seal(data)
+    assert StreamHeader.from_bytes(first).nonce_prefix != StreamHeader.from_bytes(second).nonce_prefix
+    assert first[HEADER_SIZE:] != second[HEADER_SIZE:]
+
+
+@pytest.mark.parametrize("cut", [
+    1,                  # clip the final segment's tag
+    TAG_SIZE + 3,       # drop the final segment exactly
+    TAG_SIZE + 4,       # cut into the segment before it
+])
+def test_truncation_is_detected(cut):
+    container = _seal(os.urandom(4 * CHUNK + 3))
+    with pytest.raises(InvalidToken):
+        _open(container[:-cut])
+
+
+def test_dropping_whole_trailing_segments_is_detected():
+    container = _seal(os.urandom(4 * CHUNK))
+    header = StreamHeader.from_bytes(container)
+    # Cut cleanly on a segment boundary: every remaining segment is intact,
+    # but the new last one was not written with the final flag.
+    with pytest.raises(InvalidToken):
+        _open(container[:header.segment_offset(2)])
+
+
+@pytest.mark.parametrize("offset", [
+    8,                                  # flags (codec)
+    12,                                 # chunk size
+    30,                                 # nonce prefix
+    HEADER_SIZE + 3,                    # first segment ciphertext
+    HEADER_SIZE + CHUNK + TAG_SIZE - 1,  # first segment tag
+    -1,                                 # final segment tag
+])
+def test_tampering_is_detected(offset):
+    container = bytearray(_seal(os.urandom(3 * CHUNK)))
+    container[offset] ^= 0x01
+    with pytest.raises(InvalidToken):
+        _open(bytes(container))
+
+
+def test_reordered_segments_are_detected():
+    container = _seal(os.urandom(3 * CHUNK + 1))
+    header = StreamHeader.from_bytes(container)
+    first = container[header.segment_offset(0):header.segment_offset(1)]
+    second = container[header.segment_offset(1):header.segment_offset(2)]
+    swapped = container[:HEADER_SIZE] + second + first + container[header.segment_offset(2):]
+    with pytest.raises(InvalidToken):
+        _open(swapped)
+
+
+def test_final_flag_is_required_on_the_last_segment():
+    header = StreamHeader.new(chunk_size=CHUNK)
+    key = get_stream_key()
+    body = os.urandom(CHUNK)
+    unflagged = header.to_bytes() + encrypt_segment(header, key, 0, body, final=False)
+    with pytest.raises(InvalidToken):
+        _open(unflagged)
+
+    flagged = header.to_bytes() + encrypt_segment(header, key, 0, body, final=True)
+    assert _open(flagged) == body
+    # Nothing may follow a final segment.
+    extended = flagged + encrypt_segment(header, key, 1, body, final=True)
+    with pytest.raises(InvalidToken):
+        _open(extended)
+
+
+@pytest.mark.parametrize("start,end", [
+    (0, 0),
+    (0, None),
+    (5, 5),
+    (CHUNK - 1, CHUNK),           # straddles a segment boundary
+    (CHUNK, 2 * CHUNK - 1),       # exactly one segment
+    (2 * CHUNK + 3, None),        # open-ended tail
+    (3 * CHUNK + 4, 3 * CHUNK + 4),  # last byte
+    (3 * CHUNK, 100),             # end past the last byte
+])
+@pytest.mark.parametrize("codec", [None, "zlib"])
+def test_byte_ranges(start, end, codec):
+    data = bytes(range(256))[:3 * CHUNK + 5]
+    container = _seal(data, codec, pieces=4)
+    expected = data[start:None if end is None else end + 1]
+    assert _open(container, start, end) == expected
+    assert b"".join(decrypt_stream(_ForwardOnly(container), start, end)) == expected
+
+
+def test_range_reads_only_the_segments_it_needs():
+    data = os.urandom(10 * CHUNK)
+    container = bytearray(_seal(data))
+    header = StreamHeader.from_bytes(bytes(container))
+    # Corrupt segment 1: a range inside segment 5 never authenticates it.
+    container[header.segment_offset(1)] ^= 0x01
+    assert _open(bytes(container), 5 * CHUNK + 2, 5 * CHUNK + 9) == data[5 * CHUNK + 2:5 * CHUNK + 10]
+
+
+def test_legacy_fernet_token_is_still_readable():
+    data = os.urandom(100)
+    token = get_fernet().encrypt(data)
+    assert decrypt_file(token) == data
+    assert _open(token) == data
+    assert _open(token, 10, 19) == data[10:20]
+
+
+def test_legacy_token_under_another_key_is_rejected():
+    from cryptography.fernet import Fernet
+
+    with pytest.raises(InvalidToken):
+        decrypt_file(Fernet(Fernet.generate_key()).encrypt(b"secret"))
+
+
+def test_encrypt_file_round_trip():
+    data = os.urandom(1000)
+    assert decrypt_file(encrypt_file(data)) == data
+    assert decrypt_file(encrypt_file(data, codec="zlib")) == data
+
+
+@pytest.mark.django_db
+def test_company_data_key(company):
+    from core.utils.keyring import active_key_id
+
+    key_id = active_key_id(company.pk)
+    container = encrypt_file(b"payroll", key_id=key_id)
+    assert StreamHeader.from_bytes(container).key_id == key_id
+    assert decrypt_file(container) == b"payroll"
+
+    unknown = uuid.uuid4().bytes
+    with pytest.raises(InvalidToken):
+        get_stream_key(unknown)
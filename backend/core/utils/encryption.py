@@ -1,26 +1,375 @@
 """
 File Encryption Utility
-Uses Fernet (AES-128-CBC + HMAC-SHA256) to encrypt files at rest.
+Uses Fernet (AES-128-CBC + HMAC-SHA256) to encrypt fields, and a segmented
+AES-256-GCM container to encrypt vault files at rest. Container segments are
+keyed by per-company data keys from core.utils.keyring (envelope encryption).
+
+Vault container layout (all integers big-endian):
+
+    header   magic (8) | flags (1) | chunk size (4) | key id (16) | nonce prefix (7)
+    segment  AES-GCM(plaintext chunk) + 16-byte tag, repeated
+
+Every segment except the last holds exactly `chunk size` plaintext bytes, so
+segment N always starts at HEADER_SIZE + N * (chunk size + TAG_SIZE) and can be
+decrypted on its own. Each segment's nonce is the header's nonce prefix plus a
+4-byte counter and a final-segment flag, and the header is bound as associated
+data, so reordering, truncation or header tampering all fail authentication.
+
+Compressible types (VAULT_COMPRESS_TYPES) are compressed before encryption;
+the codec is recorded in the header flags and readers decompress
+transparently. Segment arithmetic then applies to the compressed stream, so
+byte ranges of compressed files are served by decompressing from the start.
+
+Files written before the container existed are single Fernet tokens;
+`decrypt_file` and `decrypt_stream` still read them.
 """
-from cryptography.fernet import Fernet
+import base64
+import functools
+import os
+import struct
+import zlib
+from collections.abc import Iterable, Iterator
+from typing import BinaryIO
+
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import InvalidToken, MultiFernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from django.conf import settings
 
+from core.utils.keyring import master_keys, multi_fernet, unwrap_data_key
+
+VAULT_MAGIC = b"ASVAULT\x01"
+HEADER_STRUCT = struct.Struct(">8sBI16s7s")
+HEADER_SIZE = HEADER_STRUCT.size  # 36 bytes
+TAG_SIZE = 16
+DEFAULT_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+NULL_KEY_ID = b"\x00" * 16  # segments keyed from FILE_ENCRYPTION_KEY (pre-envelope files)
+
+# Header flag bits naming the compression codec of the plaintext.
+CODEC_FLAGS = {"zlib": 0x01, "zstd": 0x02}
+CODEC_MASK = 0x03
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
 
-def get_fernet() -> Fernet:
+def get_fernet() -> MultiFernet:
+    """
+    Fernet for field values and legacy whole-file tokens. Encrypts with the
+    primary master key; decrypts with any key on the keyring, plus
+    FILE_ENCRYPTION_KEY so files from before the keyring stay readable.
+    """
+    keys = master_keys()
+    legacy = settings.FILE_ENCRYPTION_KEY
+    if legacy:
+        legacy = legacy.encode() if isinstance(legacy, str) else legacy
+        if legacy not in keys:
+            keys.append(legacy)
+    return multi_fernet(tuple(keys))
+
+
+@functools.lru_cache(maxsize=8)
+def _derive_stream_key(fernet_key: str) -> bytes:
+    """Derive a dedicated AES-256 key for vault segments from the Fernet key."""
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"auditshield:vault-stream:v1",
+    ).derive(base64.urlsafe_b64decode(fernet_key))
+
+
+def get_stream_key(key_id: bytes = NULL_KEY_ID) -> bytes:
+    """Return the AES-256 key that encrypts segments written under `key_id`."""
+    if key_id != NULL_KEY_ID:
+        return unwrap_data_key(key_id)
     key = settings.FILE_ENCRYPTION_KEY
     if not key:
         raise RuntimeError("FILE_ENCRYPTION_KEY is not configured")
-    return Fernet(key.encode() if isinstance(key, str) else key)
+    return _derive_stream_key(key if isinstance(key, str) else key.decode())
+
+
+# ─── Compression ──────────────────────────────────────────────────────────────
+
+def codec_for(mime_type: str | None) -> str | None:
+    """Compression codec for files of `mime_type`, or None to store them as-is."""
+    codec = getattr(settings, "VAULT_COMPRESSION", "")
+    if not codec or mime_type not in getattr(settings, "VAULT_COMPRESS_TYPES", ()):
+        return None
+    if codec not in CODEC_FLAGS:
+        raise RuntimeError(f"Unknown VAULT_COMPRESSION codec {codec!r}")
+    return codec
+
+
+def _compressor(codec: str):
+    if codec == "zstd":
+        import zstandard  # optional dependency, only needed when VAULT_COMPRESSION=zstd
+
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    return zlib.compressobj(ZLIB_LEVEL)
+
+
+def _decompressor(codec: str):
+    if codec == "zstd":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompressobj()
+    return zlib.decompressobj()
+
+
+# ─── Vault container ──────────────────────────────────────────────────────────
+
+class StreamHeader:
+    """Parsed vault container header."""
+
+    def __init__(self, chunk_size: int, key_id: bytes, nonce_prefix: bytes, flags: int = 0):
+        if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+            raise ValueError(f"Invalid vault chunk size {chunk_size}")
+        self.chunk_size = chunk_size
+        self.key_id = key_id
+        self.nonce_prefix = nonce_prefix
+        self.flags = flags
+
+    @classmethod
+    def new(cls, chunk_size: int = DEFAULT_CHUNK_SIZE, key_id: bytes = NULL_KEY_ID, flags: int = 0):
+        return cls(chunk_size, key_id, os.urandom(7), flags)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "StreamHeader":
+        if len(data) < HEADER_SIZE or not data.startswith(VAULT_MAGIC):
+            raise InvalidToken("Not a vault container")
+        _, flags, chunk_size, key_id, nonce_prefix = HEADER_STRUCT.unpack(data[:HEADER_SIZE])
+        try:
+            return cls(chunk_size, key_id, nonce_prefix, flags)
+        except ValueError as exc:
+            raise InvalidToken(str(exc)) from exc
+
+    def to_bytes(self) -> bytes:
+        return HEADER_STRUCT.pack(VAULT_MAGIC, self.flags, self.chunk_size, self.key_id, self.nonce_prefix)
+
+    @property
+    def codec(self) -> str | None:
+        flag = self.flags & CODEC_MASK
+        return next((name for name, bit in CODEC_FLAGS.items() if bit == flag), None)
+
+    @property
+    def segment_size(self) -> int:
+        return self.chunk_size + TAG_SIZE
+
+    def segment_offset(self, index: int) -> int:
+        """Byte offset of ciphertext segment `index` within the container."""
+        return HEADER_SIZE + index * self.segment_size
+
+    def nonce(self, index: int, final: bool) -> bytes:
+        return self.nonce_prefix + struct.pack(">I?", index, final)
+
+
+def is_stream_container(prefix: bytes) -> bool:
+    """True if `prefix` (the first bytes of a stored file) is a vault container."""
+    return prefix.startswith(VAULT_MAGIC)
+
 
+def encrypt_segment(header: StreamHeader, key: bytes, index: int, data: bytes, final: bool) -> bytes:
+    """Encrypt one plaintext chunk as segment `index` of the container."""
+    return AESGCM(key).encrypt(header.nonce(index, final), data, header.to_bytes())
 
-def encrypt_file(data: bytes) -> bytes:
-    return get_fernet().encrypt(data)
+
+def decrypt_segment(header: StreamHeader, key: bytes, index: int, data: bytes, final: bool) -> bytes:
+    try:
+        return AESGCM(key).decrypt(header.nonce(index, final), data, header.to_bytes())
+    except InvalidTag as exc:
+        raise InvalidToken(f"Vault segment {index} failed authentication") from exc
+
+
+class StreamEncryptor:
+    """
+    Incremental writer for the vault container.
+
+    Feed plaintext of any size to `update()`; it returns whatever ciphertext is
+    ready (the header on first call, then whole segments). `finalize()` emits
+    the last, flagged segment. Only one chunk of plaintext is ever buffered.
+    """
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, key_id: bytes = NULL_KEY_ID,
+                 key: bytes | None = None, codec: str | None = None):
+        self.header = StreamHeader.new(chunk_size=chunk_size, key_id=key_id, flags=CODEC_FLAGS[codec] if codec else 0)
+        self._key = key or get_stream_key(key_id)
+        self._compressor = _compressor(codec) if codec else None
+        self.stored_size = 0  # plaintext bytes after compression
+        self._buffer = bytearray()
+        self._index = 0
+        self._header_sent = False
+        self._finalized = False
+
+    def _take_header(self) -> bytes:
+        if self._header_sent:
+            return b""
+        self._header_sent = True
+        return self.header.to_bytes()
+
+    def _segments(self, data: bytes) -> list[bytes]:
+        """Buffer `data` and encrypt every whole segment it completes."""
+        self.stored_size += len(data)
+        self._buffer += data
+        size = self.header.chunk_size
+        out = []
+        # Keep at least one byte back so the final segment is never empty
+        # unless the whole stream is.
+        while len(self._buffer) > size:
+            chunk = bytes(self._buffer[:size])
+            del self._buffer[:size]
+            out.append(encrypt_segment(self.header, self._key, self._index, chunk, final=False))
+            self._index += 1
+        return out
+
+    def update(self, data: bytes) -> bytes:
+        if self._finalized:
+            raise RuntimeError("StreamEncryptor already finalized")
+        if self._compressor:
+            data = self._compressor.compress(data)
+        return b"".join([self._take_header(), *self._segments(data)])
+
+    def finalize(self) -> bytes:
+        if self._finalized:
+            raise RuntimeError("StreamEncryptor already finalized")
+        self._finalized = True
+        out = [self._take_header()]
+        if self._compressor:
+            out += self._segments(self._compressor.flush())
+        out.append(encrypt_segment(self.header, self._key, self._index, bytes(self._buffer), final=True))
+        self._buffer.clear()
+        return b"".join(out)
+
+
+def encrypt_stream(chunks: Iterable[bytes], chunk_size: int = DEFAULT_CHUNK_SIZE, key_id: bytes = NULL_KEY_ID,
+                   codec: str | None = None) -> Iterator[bytes]:
+    """Encrypt an iterable of plaintext chunks, yielding container bytes."""
+    encryptor = StreamEncryptor(chunk_size=chunk_size, key_id=key_id, codec=codec)
+    for chunk in chunks:
+        out = encryptor.update(chunk)
+        if out:
+            yield out
+    yield encryptor.finalize()
+
+
+def _read_exact(fileobj: BinaryIO, size: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < size:
+        part = fileobj.read(size - len(buf))
+        if not part:
+            break
+        buf += part
+    return bytes(buf)
+
+
+def decrypt_stream(fileobj: BinaryIO, start: int = 0, end: int | None = None) -> Iterator[bytes]:
+    """
+    Yield decrypted plaintext for bytes [start, end] (inclusive) of a stored file.
+
+    Vault containers are read one segment at a time; when `fileobj` is seekable
+    the reader jumps straight to the segment holding `start` (compressed
+    containers are always inflated from the beginning). Legacy Fernet
+    tokens have no internal structure, so they are decrypted whole and sliced.
+    """
+    head = _read_exact(fileobj, HEADER_SIZE)
+    if not is_stream_container(head):
+        plaintext = get_fernet().decrypt(head + fileobj.read())
+        yield plaintext[start:None if end is None else end + 1]
+        return
+
+    header = StreamHeader.from_bytes(head)
+    if header.codec:
+        yield from _decompress_range(_decrypt_segments(fileobj, header), header.codec, start, end)
+        return
+    yield from _decrypt_segments(fileobj, header, start, end)
+
+
+def _decrypt_segments(fileobj: BinaryIO, header: StreamHeader, start: int = 0, end: int | None = None) -> Iterator[bytes]:
+    """Yield decrypted container bytes [start, end] from the segments following `header`."""
+    key = get_stream_key(header.key_id)
+    index = start // header.chunk_size
+    if index and hasattr(fileobj, "seek"):
+        fileobj.seek(header.segment_offset(index))
+    else:
+        # Non-seekable source: read forward, still authenticating each segment.
+        index = 0
+
+    segment = _read_exact(fileobj, header.segment_size)
+    while True:
+        # A one-byte look-ahead tells us whether this segment is the last one.
+        lookahead = fileobj.read(1) if len(segment) == header.segment_size else b""
+        final = not lookahead
+        plaintext = decrypt_segment(header, key, index, segment, final)
+
+        segment_start = index * header.chunk_size
+        lo = max(start - segment_start, 0)
+        hi = len(plaintext) if end is None else min(len(plaintext), end + 1 - segment_start)
+        if lo < hi:
+            yield plaintext[lo:hi]
+
+        if final or (end is not None and segment_start + len(plaintext) > end):
+            return
+        segment = lookahead + _read_exact(fileobj, header.segment_size - 1)
+        index += 1
+
+
+def _decompress_range(chunks: Iterable[bytes], codec: str, start: int, end: int | None) -> Iterator[bytes]:
+    """Inflate container bytes, yielding plaintext bytes [start, end] (inclusive)."""
+    decompressor = _decompressor(codec)
+
+    def inflate() -> Iterator[bytes]:
+        for chunk in chunks:
+            yield decompressor.decompress(chunk)
+        yield decompressor.flush()
+
+    pos = 0
+    for plaintext in inflate():
+        lo = max(start - pos, 0)
+        hi = len(plaintext) if end is None else min(len(plaintext), end + 1 - pos)
+        if lo < hi:
+            yield plaintext[lo:hi]
+        pos += len(plaintext)
+        if end is not None and pos > end:
+            return
+
+
+def plaintext_size(ciphertext_size: int, chunk_size: int) -> int:
+    """Plaintext length of an uncompressed vault container of `ciphertext_size` bytes."""
+    body = ciphertext_size - HEADER_SIZE
+    segments = max(-(-body // (chunk_size + TAG_SIZE)), 1)
+    return body - segments * TAG_SIZE
+
+
+def encrypt_file(data: bytes, key_id: bytes = NULL_KEY_ID, codec: str | None = None) -> bytes:
+    chunk_size = getattr(settings, "VAULT_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+    return b"".join(encrypt_stream([data], chunk_size=chunk_size, key_id=key_id, codec=codec))
 
 
 def decrypt_file(data: bytes) -> bytes:
+    if is_stream_container(data):
+        return b"".join(decrypt_stream(_BytesReader(data)))
     return get_fernet().decrypt(data)
 
 
+class _BytesReader:
+    """Minimal seekable reader over an in-memory buffer (avoids an extra copy)."""
+
+    def __init__(self, data: bytes):
+        self._view = memoryview(data)
+        self._pos = 0
+
+    def read(self, size: int = -1) -> bytes:
+        stop = len(self._view) if size < 0 else min(self._pos + size, len(self._view))
+        out = self._view[self._pos:stop].tobytes()
+        self._pos = stop
+        return out
+
+    def seek(self, pos: int) -> None:
+        self._pos = pos
+
+
 def encrypt_field(value: str) -> str:
     """Encrypt a string field value (e.g. RRA TIN number)."""
     return get_fernet().encrypt(value.encode()).decode()
@@ -0,0 +1,56 @@
+"""
+HTTP helpers for views that stream file bodies (byte ranges, conditional GETs).
+"""
+import re
+
+from django.utils.http import parse_etags
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested byte range lies entirely outside the resource."""
+
+
+def parse_byte_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Parse a single-range `Range` header into an inclusive (start, end) pair.
+
+    Returns None when the header is absent, malformed or asks for several
+    ranges — callers then serve the full body, which RFC 9110 allows.
+    Raises RangeNotSatisfiable when the range starts past the end of the body.
+    """
+    if not header:
+        return None
+    m = _RANGE_RE.match(header.strip())
+    if not m or (not m.group(1) and not m.group(2)):
+        return None
+
+    first, last = m.group(1), m.group(2)
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        # Suffix range: the final N bytes.
+        suffix = int(last)
+        if suffix == 0:
+            raise RangeNotSatisfiable
+        start = max(size - suffix, 0)
+        end = size - 1
+
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    """True if an If-None-Match / If-Range header value matches `etag` (weak comparison)."""
+    if not header or not etag:
+        return False
+    tags = parse_etags(header)
+    if "*" in tags:
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.removeprefix("W/") == bare for tag in tags)
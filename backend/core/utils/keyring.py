@@ -0,0 +1,153 @@
+"""
+Envelope encryption for the vault.
+
+Every company gets its own random AES-256 data key (core.models.DataKey).
+The data key is stored wrapped, i.e. Fernet-encrypted, by the master keyring:
+
+    FILE_ENCRYPTION_KEYS = "new-key,old-key"    # first key wraps, all keys unwrap
+
+A vault container names its data key in the header's 16-byte key id (the
+DataKey UUID), so files never need to know which master key is current.
+Rotating the master key therefore only re-wraps one small row per company
+(`rewrap_data_keys`) instead of re-encrypting every file. Unwrapped data keys
+are cached in-process.
+
+Containers written before data keys existed carry the null key id and stay
+readable through the key derived from FILE_ENCRYPTION_KEY.
+"""
+import functools
+import hashlib
+import os
+import time
+import uuid
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+# How long a process keeps using a company's active data key before re-checking.
+ACTIVE_KEY_TTL = 300
+
+_active_keys: dict = {}
+
+
+def _as_bytes(key) -> bytes:
+    return key.encode() if isinstance(key, str) else key
+
+
+def master_keys() -> list[bytes]:
+    """The master keyring, primary (wrapping) key first."""
+    keys = [_as_bytes(k) for k in settings.FILE_ENCRYPTION_KEYS if k] or [_as_bytes(settings.FILE_ENCRYPTION_KEY)]
+    if not keys[0]:
+        raise RuntimeError("FILE_ENCRYPTION_KEY / FILE_ENCRYPTION_KEYS is not configured")
+    return keys
+
+
+@functools.lru_cache(maxsize=4)
+def multi_fernet(keys: tuple[bytes, ...]) -> MultiFernet:
+    return MultiFernet([Fernet(key) for key in keys])
+
+
+def master_keyring() -> MultiFernet:
+    return multi_fernet(tuple(master_keys()))
+
+
+def key_fingerprint(key: bytes) -> str:
+    """Short, non-secret identifier for a master key."""
+    return hashlib.sha256(_as_bytes(key)).hexdigest()[:16]
+
+
+def primary_fingerprint() -> str:
+    return key_fingerprint(master_keys()[0])
+
+
+# ─── Data keys ────────────────────────────────────────────────────────────────
+
+def create_data_key(company_id):
+    """Generate, wrap and store a new active data key for a company."""
+    from core.models import DataKey
+
+    return DataKey.objects.create(
+        company_id=company_id,
+        wrapped_key=master_keyring().encrypt(os.urandom(32)).decode(),
+        master_key_id=primary_fingerprint(),
+    )
+
+
+def active_key_id(company_id) -> bytes:
+    """Key id (for container headers) of the company's active data key, creating it on first use."""
+    from core.models import DataKey
+
+    company_id = str(company_id)
+    cached = _active_keys.get(company_id)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+
+    data_key = DataKey.objects.filter(company_id=company_id, is_active=True).first()
+    if data_key is None:
+        try:
+            with transaction.atomic():
+                data_key = create_data_key(company_id)
+        except IntegrityError:
+            # Another process created it first.
+            data_key = DataKey.objects.get(company_id=company_id, is_active=True)
+
+    _active_keys[company_id] = (data_key.id.bytes, time.monotonic() + ACTIVE_KEY_TTL)
+    return data_key.id.bytes
+
+
+@functools.lru_cache(maxsize=1024)
+def unwrap_data_key(key_id: bytes) -> bytes:
+    """Return the raw AES-256 data key named by a container header."""
+    from core.models import DataKey
+
+    wrapped = DataKey.objects.filter(pk=uuid.UUID(bytes=key_id)).values_list("wrapped_key", flat=True).first()
+    if wrapped is None:
+        raise InvalidToken(f"Unknown vault key id {key_id.hex()}")
+    return master_keyring().decrypt(wrapped.encode())
+
+
+def rotate_data_key(company_id):
+    """
+    Give a company a fresh active data key. New files use it at once; existing
+    files keep their old (still valid) key until the body re-encryption job
+    moves them.
+    """
+    from core.models import DataKey
+
+    with transaction.atomic():
+        DataKey.objects.filter(company_id=company_id, is_active=True).update(is_active=False)
+        data_key = create_data_key(company_id)
+    _active_keys.pop(str(company_id), None)
+    return data_key
+
+
+def rewrap_data_keys(checkpoint, batch_size: int = 500) -> bool:
+    """
+    Re-wrap every data key not yet wrapped by the primary master key.
+
+    Only the small wrapped-key rows change; file bodies are untouched. Walks
+    the table in primary-key order, committing the checkpoint with each
+    batch. Returns True when done.
+    """
+    from core.models import DataKey
+
+    keyring = master_keyring()
+    primary = primary_fingerprint()
+    while True:
+        qs = DataKey.objects.order_by("pk").only("id", "wrapped_key", "master_key_id")
+        if checkpoint.cursor:
+            qs = qs.filter(pk__gt=checkpoint.cursor)
+        batch = list(qs[:batch_size])
+        if not batch:
+            checkpoint.complete()
+            return True
+
+        stale = [key for key in batch if key.master_key_id != primary]
+        for key in stale:
+            key.wrapped_key = keyring.rotate(key.wrapped_key.encode()).decode()
+            key.master_key_id = primary
+        with transaction.atomic():
+            if stale:
+                DataKey.objects.bulk_update(stale, ["wrapped_key", "master_key_id"])
+            checkpoint.advance(batch[-1].pk, processed=len(batch), changed=len(stale))
@@ -1,25 +1,33 @@
 """
 File upload validators — called from document upload views.
-Validates MIME type (via python-magic, not just extension) and size.
+Validates MIME type (via python-magic, not just extension) and size; the
+vault's ingest_upload applies them while it reads the upload.
 """
 import magic
 from django.conf import settings
 from rest_framework.exceptions import ValidationError
 
+# python-magic only needs the first couple of KB to identify a file.
+SNIFF_BYTES = 2048
 
-def validate_upload(file) -> None:
-    """Validate size and MIME type of an uploaded file."""
-    max_bytes = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
-    if file.size > max_bytes:
+
+def validate_upload_size(size: int, max_mb: int | None = None) -> None:
+    """Reject uploads larger than `max_mb` (defaults to MAX_UPLOAD_SIZE_MB)."""
+    max_mb = max_mb or settings.MAX_UPLOAD_SIZE_MB
+    if size > max_mb * 1024 * 1024:
         raise ValidationError(
-            f"File too large. Maximum allowed size is {settings.MAX_UPLOAD_SIZE_MB} MB."
+            f"File too large. Maximum allowed size is {max_mb} MB."
         )
 
-    mime = magic.from_buffer(file.read(2048), mime=True)
-    file.seek(0)
+
+def validate_upload_mime(head: bytes) -> str:
+    """Sniff the MIME type from the first bytes of a file and return it if allowed."""
+    mime = magic.from_buffer(head[:SNIFF_BYTES], mime=True)
 
     if mime not in settings.ALLOWED_UPLOAD_TYPES:
         raise ValidationError(
             f"Unsupported file type '{mime}'. "
             f"Allowed: PDF, JPEG, PNG, TIFF, XLSX, XLS, CSV."
         )
+    return mime
+